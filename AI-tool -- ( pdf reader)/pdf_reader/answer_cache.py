@@ -0,0 +1,174 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional, Sequence
+import numpy as np
+from extraction_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase a question, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r'\s+', ' ', question.lower()).strip().rstrip('?!.').strip()
+
+
+class AnswerCache:
+    def __init__(self, cache_dir: Optional[str] = None, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Persistent cache of model answers in an SQLite database.
+
+        Args:
+            cache_dir: Directory of the database (default: the extraction cache directory)
+            ttl: Seconds after which an answer is no longer served
+            max_entries: Entry count above which least recently used answers are evicted
+        """
+        cache_dir = cache_dir or os.getenv("PDF_READER_CACHE_DIR") or DEFAULT_CACHE_DIR
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "answers.sqlite3")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+        # One connection shared by worker threads, serialized by the lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                document_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                embedding BLOB,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS answers_document ON answers (document_hash, model);
+            CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used);
+        """)
+
+    @staticmethod
+    def make_key(document_hash: str, model: str, question: str, chunk_ids: Sequence[int],
+                 strategy: str = "", settings: str = "") -> str:
+        """
+        Build the key of an answer from everything that determines it.
+
+        Args:
+            document_hash: Hash of the document the question is about
+            model: Model answering the question
+            question: The question, normalized before hashing
+            chunk_ids: Chunks the answer is generated from
+            strategy: How the chunks are asked about
+            settings: Anything else that changes the text behind the chunk
+                ids or the prompt, e.g. extractor, chunking and context length
+        """
+        ids = ",".join(str(chunk_id) for chunk_id in chunk_ids)
+        raw = f"{document_hash}\0{model}\0{normalize_question(question)}\0{ids}\0{strategy}\0{settings}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up an answer by exact key.
+
+        Returns:
+            The cached answer, or None if missing or older than the TTL
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT answer, created FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._db.execute("DELETE FROM answers WHERE key = ?", (key,))
+                    self._db.commit()
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def find_similar(self, document_hash: str, model: str, query_vector: np.ndarray,
+                     threshold: float) -> Optional[str]:
+        """
+        Look up the answer to a near-duplicate question about the same document.
+
+        Args:
+            document_hash: Hash of the document the question is about
+            model: Model that produced the answers
+            query_vector: Normalized embedding of the question
+            threshold: Minimum cosine similarity to count as the same question
+
+        Returns:
+            The answer of the most similar cached question, or None
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, answer, embedding FROM answers "
+                "WHERE document_hash = ? AND model = ? AND embedding IS NOT NULL AND created >= ?",
+                (document_hash, model, now - self.ttl)).fetchall()
+            vectors = [np.frombuffer(row[2], dtype=np.float32) for row in rows]
+            candidates = [(row, vector) for row, vector in zip(rows, vectors)
+                          if vector.shape == query_vector.shape]
+            if not candidates:
+                return None
+
+            scores = np.stack([vector for _, vector in candidates]) @ query_vector
+            best = int(np.argmax(scores))
+            if scores[best] < threshold:
+                return None
+
+            key, answer = candidates[best][0][:2]
+            self._db.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.near_hits += 1
+            return answer
+
+    def put(self, key: str, document_hash: str, model: str, question: str, answer: str,
+            question_vector: Optional[np.ndarray] = None) -> None:
+        """Store an answer and evict the least recently used ones beyond max_entries."""
+        now = time.time()
+        embedding = None
+        if question_vector is not None:
+            embedding = np.asarray(question_vector, dtype=np.float32).tobytes()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers "
+                "(key, document_hash, model, question, answer, embedding, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, document_hash, model, normalize_question(question), answer, embedding, now, now))
+            self._db.execute(
+                "DELETE FROM answers WHERE created < ? OR key IN ("
+                "SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (now - self.ttl, self.max_entries))
+            self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counters of this process plus the number of stored answers.
+
+        "misses" counts exact-key misses; "near_hits" counts how many of
+        those were then served by a near-duplicate question.
+        """
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "entries": entries,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
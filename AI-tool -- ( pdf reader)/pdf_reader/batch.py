@@ -0,0 +1,155 @@
+import os
+import csv
+import json
+import time
+import asyncio
+from itertools import chain
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+
+def _jsonl_records(f: TextIO) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, parsed JSON) of every non-empty line, or the parse error of bad lines."""
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"invalid JSON ({e})")
+
+
+def read_questions(path: str) -> Iterator[Dict]:
+    """
+    Read the questions of a batch file.
+
+    JSONL files hold one object per line with a "question" key (or a bare
+    JSON string); CSV files need a "question" column, or have the question
+    in their first column. An "id" field/column is kept, otherwise questions
+    are numbered from 1.
+
+    A line that cannot be read does not stop the batch: it is yielded as
+    {"id": ..., "line": ..., "error": ...} and the following lines are read.
+
+    Yields:
+        {"id": ..., "question": ...} for every non-empty question, or an
+        error record for every malformed line
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            rows = csv.reader(f)
+            header = next(rows, [])
+            if "question" in header:
+                records = ((rows.line_num, dict(zip(header, row))) for row in rows)
+            else:
+                # No header row: the first line is a question too
+                records = ((max(rows.line_num, 1), {"question": row[0]}) for row in chain([header], rows) if row)
+        else:
+            records = _jsonl_records(f)
+
+        for number, (line_number, record) in enumerate(records, 1):
+            if isinstance(record, str):
+                record = {"question": record}
+            if isinstance(record, dict) and not isinstance(record.get("question") or "", str):
+                record = ValueError("\"question\" must be a string")
+            elif not isinstance(record, (dict, Exception)):
+                record = ValueError("expected a JSON object or string")
+            if isinstance(record, Exception):
+                yield {"id": number, "line": line_number, "error": f"Line {line_number}: {record}"}
+                continue
+
+            question = (record.get("question") or "").strip()
+            if question:
+                yield {"id": record["id"] if "id" in record else number, "question": question}
+
+
+async def run_batch(reader, questions: Iterable[Dict], output: TextIO, in_flight: int = 4,
+                    strategy: str = "sequential", max_chunks: Optional[int] = None) -> Dict:
+    """
+    Answer questions concurrently about the document already loaded in a reader.
+
+    Questions are read lazily into a bounded queue, at most in_flight of
+    them are being answered at once, and each result is written to output
+    as a JSON line as soon as it is ready (so in completion order).
+
+    Args:
+        reader: PDFReaderAI with a loaded PDF; its index is shared by all questions
+        questions: {"id", "question"} records, e.g. from read_questions()
+        output: Text stream receiving one JSON object per answer
+        in_flight: Maximum questions being answered at the same time
+        strategy: ask_question() strategy used for every question
+        max_chunks: Maximum chunks per question (strategy default if None)
+
+    Returns:
+        Summary with the number of questions, errors and the elapsed time
+    """
+    in_flight = max(1, in_flight)
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=in_flight * 2)
+    summary = {"questions": 0, "errors": 0}
+    started = time.perf_counter()
+
+    async def produce():
+        for record in questions:
+            await queue.put((record, time.perf_counter()))
+        for _ in range(in_flight):
+            await queue.put(None)
+
+    async def consume(executor: ThreadPoolExecutor):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            record, queued = item
+            start = time.perf_counter()
+            if "error" in record:
+                # A malformed line of the questions file, reported in its place
+                result = dict(record)
+                summary["errors"] += 1
+            else:
+                result = {"id": record["id"], "question": record["question"]}
+                try:
+                    result["answer"] = await loop.run_in_executor(
+                        executor, partial(reader.ask_question, record["question"],
+                                          max_chunks=max_chunks, strategy=strategy))
+                except Exception as e:
+                    result["error"] = str(e)
+                    summary["errors"] += 1
+            result["queued_seconds"] = round(start - queued, 4)
+            result["seconds"] = round(time.perf_counter() - start, 4)
+
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            summary["questions"] += 1
+
+    # ask_question() blocks on the model, so each in-flight question gets a thread
+    with ThreadPoolExecutor(max_workers=in_flight, thread_name_prefix="pdf-reader-batch") as executor:
+        await asyncio.gather(produce(), *(consume(executor) for _ in range(in_flight)))
+
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def answer_file(reader, questions_path: str, output_path: Optional[str] = None, in_flight: int = 4,
+                strategy: str = "sequential", max_chunks: Optional[int] = None) -> Dict:
+    """
+    Answer every question of a JSONL/CSV file and write the results to JSONL.
+
+    Args:
+        reader: PDFReaderAI with a loaded PDF
+        questions_path: JSONL or CSV file of questions (see read_questions())
+        output_path: Result file (default: <questions file>.answers.jsonl)
+        in_flight: Maximum questions being answered at the same time
+        strategy: ask_question() strategy used for every question
+        max_chunks: Maximum chunks per question (strategy default if None)
+
+    Returns:
+        The summary from run_batch(), plus the output path
+    """
+    output_path = output_path or os.path.splitext(questions_path)[0] + ".answers.jsonl"
+    with open(output_path, 'w', encoding='utf-8') as output:
+        summary = asyncio.run(run_batch(reader, read_questions(questions_path), output,
+                                        in_flight, strategy, max_chunks))
+    summary["output"] = output_path
+    return summary
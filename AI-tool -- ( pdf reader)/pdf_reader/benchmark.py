@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Sequence
+from pdf_reader import extract_pages
+from extractors import available_extractors, make_extractor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def benchmark_extraction(pdf_path: str, max_workers: int, repeat: int = 1) -> List[Dict]:
+    """
+    Measure page extraction throughput for 1..max_workers processes.
+
+    Args:
+        pdf_path: Path to the PDF file to extract
+        max_workers: Highest number of worker processes to try
+        repeat: Number of runs per worker count; the fastest run is kept
+
+    Returns:
+        One result dict per worker count
+    """
+    results = []
+    for workers in range(1, max_workers + 1):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pages = extract_pages(pdf_path, workers)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        results.append({
+            "workers": workers,
+            "pages": len(pages),
+            "seconds": best,
+            "pages_per_sec": len(pages) / best if best else 0.0,
+        })
+
+    baseline = results[0]["seconds"]
+    for result in results:
+        result["speedup"] = baseline / result["seconds"] if result["seconds"] else 0.0
+    return results
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB (None where it cannot be measured)."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_extractor(extractor: str, pdf_paths: Sequence[str], repeat: int) -> Dict:
+    """Extract every PDF with one backend; runs in a fresh process so its memory use is its own."""
+    backend = make_extractor(extractor)
+    best = None
+    for _ in range(repeat):
+        pages = words = 0
+        start = time.perf_counter()
+        for pdf_path in pdf_paths:
+            for text in backend.iter_pages(pdf_path):
+                pages += 1
+                words += len(text.split())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {"pages": pages, "words": words, "seconds": best, "peak_rss_mb": _peak_rss_mb()}
+
+
+def benchmark_extractors(pdf_paths: Sequence[str], extractors: Optional[Sequence[str]] = None,
+                         repeat: int = 1) -> List[Dict]:
+    """
+    Compare the extraction backends on a set of PDFs.
+
+    Each backend runs in its own freshly started process, so the reported
+    peak memory is not inflated by the backends measured before it.
+
+    Args:
+        pdf_paths: PDF files to extract
+        extractors: Backends to compare (default: every installed one)
+        repeat: Number of runs per backend; the fastest run is kept
+
+    Returns:
+        One result dict per backend
+    """
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for extractor in extractors or available_extractors():
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                result = executor.submit(_run_extractor, extractor, list(pdf_paths), repeat).result()
+            except Exception as e:
+                print(f"Warning: {extractor} failed ({str(e)})")
+                continue
+        result["extractor"] = extractor
+        result["pages_per_sec"] = result["pages"] / result["seconds"] if result["seconds"] else 0.0
+        results.append(result)
+    return results
+
+
+def _find_pdfs(paths: Sequence[str]) -> List[str]:
+    """Expand directories into the PDF files below them."""
+    pdf_paths = []
+    for path in paths:
+        if not os.path.isdir(path):
+            pdf_paths.append(path)
+            continue
+        for root, _, files in os.walk(path):
+            pdf_paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith('.pdf'))
+    return pdf_paths
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "suite":
+        from benchmark_suite import suite_main
+        return suite_main(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description="Benchmark PDF page extraction throughput",
+                                     epilog="`benchmark.py suite` benchmarks every stage of the reader on "
+                                            "generated PDFs instead (see `benchmark.py suite -h`)")
+    parser.add_argument("paths", nargs="+", help="PDF file, or PDF files and folders with -e")
+    parser.add_argument("-n", "--max-workers", type=int, default=os.cpu_count() or 1,
+                       help="Highest number of worker processes to try (default: CPU count)")
+    parser.add_argument("-r", "--repeat", type=int, default=1,
+                       help="Runs per worker count or backend, fastest is reported (default: 1)")
+    parser.add_argument("-e", "--extractors", nargs="*", metavar="NAME",
+                       help="Compare extraction backends instead of worker counts "
+                            "(default with no names: every installed backend)")
+
+    args = parser.parse_args()
+    pdf_paths = _find_pdfs(args.paths)
+
+    if args.extractors is not None:
+        print(f"Benchmarking extraction backends on {len(pdf_paths)} PDF(s)")
+        print(f"{'extractor':>11} {'pages':>7} {'words':>9} {'seconds':>9} {'pages/sec':>10} {'peak MB':>8}")
+        for result in benchmark_extractors(pdf_paths, args.extractors, args.repeat):
+            peak = f"{result['peak_rss_mb']:>8.1f}" if result["peak_rss_mb"] is not None else f"{'n/a':>8}"
+            print(f"{result['extractor']:>11} {result['pages']:>7} {result['words']:>9} "
+                  f"{result['seconds']:>9.2f} {result['pages_per_sec']:>10.1f} {peak}")
+        return 0
+
+    if len(pdf_paths) != 1:
+        parser.error("worker scaling is measured on a single PDF file")
+    pdf_path = pdf_paths[0]
+    print(f"Benchmarking extraction of: {pdf_path}")
+    print(f"{'workers':>8} {'pages':>7} {'seconds':>9} {'pages/sec':>10} {'speedup':>8}")
+    for result in benchmark_extraction(pdf_path, args.max_workers, args.repeat):
+        print(f"{result['workers']:>8} {result['pages']:>7} {result['seconds']:>9.2f} "
+              f"{result['pages_per_sec']:>10.1f} {result['speedup']:>7.2f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import itertools
+import subprocess
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from benchmark import _peak_rss_mb
+from chunking import CHUNKERS, make_chunker
+from extractors import make_extractor, select_extractor
+from fake_ollama import DEFAULT_ANSWER_TOKENS, DEFAULT_FIRST_TOKEN_SECONDS, DEFAULT_TOKENS_PER_SECOND, FakeOllama
+from ollama_transport import OllamaTransport
+from pdf_reader import DEFAULT_MAX_CHUNKS, STRATEGIES, STREAMING_STRATEGIES, PDFReaderAI
+from retrieval import BM25Index
+from synthetic_pdf import WORDS, generate_pdf
+
+# Bump when results change meaning, so old result files are not compared with new ones
+SUITE_VERSION = 1
+
+# Metrics compared between runs: (section, key, True if higher is better)
+COMPARED_METRICS = (
+    ("extract", "pages_per_sec", True),
+    ("chunk", "seconds", False),
+    ("index", "seconds", False),
+    ("retrieve", "p50_ms", False),
+    ("ask", "p50_ms", False),
+    ("ask", "overhead_p50_ms", False),
+    ("stream", "ttft_p50_ms", False),
+    ("memory", "peak_rss_mb", False),
+)
+
+
+def _latencies(seconds: Sequence[float]) -> Dict:
+    values = np.asarray(seconds, dtype=np.float64) * 1000
+    return {"p50_ms": float(np.percentile(values, 50)), "p95_ms": float(np.percentile(values, 95)),
+            "mean_ms": float(values.mean()), "max_ms": float(values.max())}
+
+
+def _questions(count: int, seed: int) -> List[str]:
+    """Questions made of document words, so retrieval has something to rank."""
+    rnd = random.Random(seed)
+    # Skip the most frequent words, which every chunk contains
+    content_words = WORDS[30:]
+    return [f"What is the {' '.join(rnd.sample(content_words, rnd.randint(2, 4)))}?" for _ in range(count)]
+
+
+def run_case(case: Dict) -> Dict:
+    """
+    Benchmark every stage on one generated PDF.
+
+    Runs in a fresh process, so the reported peak memory is the case's own.
+
+    Args:
+        case: Settings of the case (see benchmark_suite()); "directory" is
+            where the PDF is written
+
+    Returns:
+        The settings and the measurements of every stage
+    """
+    pdf_path = os.path.join(case["directory"], f"synthetic-{case['pages']}p-{case['words_per_page']}w.pdf")
+    started = time.perf_counter()
+    document = generate_pdf(pdf_path, case["pages"], case["words_per_page"], case["seed"])
+    result = {key: value for key, value in case.items() if key != "directory"}
+    result["document"] = dict(document, seconds=time.perf_counter() - started)
+
+    extractor = case["extractor"]
+    if extractor == "auto":
+        extractor = select_extractor(pdf_path)
+    result["extractor"] = extractor
+
+    # Extraction, best of case["repeat"] runs
+    backend = make_extractor(extractor)
+    best = None
+    for _ in range(case["repeat"]):
+        started = time.perf_counter()
+        pages = list(backend.iter_pages(pdf_path))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    result["extract"] = {"pages": len(pages), "words": sum(len(text.split()) for text in pages),
+                         "seconds": best, "pages_per_sec": len(pages) / best if best else 0.0}
+
+    # Chunking and keyword indexing of the extracted pages, best of case["repeat"] runs
+    chunker = make_chunker(case["chunker"])
+    chunk_seconds, index_seconds = [], []
+    for _ in range(case["repeat"]):
+        started = time.perf_counter()
+        chunks = [chunk.text for chunk in chunker.iter_chunks(pages)]
+        chunk_seconds.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        index = BM25Index(chunks)
+        index_seconds.append(time.perf_counter() - started)
+    result["chunk"] = {"chunks": len(chunks), "seconds": min(chunk_seconds)}
+    result["index"] = {"seconds": min(index_seconds)}
+
+    queries = _questions(case["queries"], case["seed"])
+    seconds = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, DEFAULT_MAX_CHUNKS)
+        seconds.append(time.perf_counter() - started)
+    result["retrieve"] = dict(_latencies(seconds), queries=len(queries), k=DEFAULT_MAX_CHUNKS)
+
+    # Whole questions against the local stand-in for Ollama
+    model_seconds = case["first_token_seconds"] + (case["answer_tokens"] - 1) / case["tokens_per_second"]
+    with FakeOllama(case["tokens_per_second"], case["first_token_seconds"], case["answer_tokens"]) as server:
+        reader = PDFReaderAI(model_name="benchmark", client=OllamaTransport(host=server.url, retries=0),
+                             use_cache=False, use_answer_cache=False, warm_up=False,
+                             extractor=extractor, chunker=case["chunker"])
+        started = time.perf_counter()
+        reader.extract_text_from_pdf(pdf_path)
+        result["load"] = {"seconds": time.perf_counter() - started, "chunks": len(reader.text_chunks)}
+
+        questions = _questions(case["questions"], case["seed"] + 1)
+        seconds = []
+        for question in questions:
+            started = time.perf_counter()
+            reader.ask_question(question, strategy=case["strategy"])
+            seconds.append(time.perf_counter() - started)
+        ask = _latencies(seconds)
+        ask["overhead_p50_ms"] = ask["p50_ms"] - model_seconds * 1000
+        result["ask"] = dict(ask, questions=len(questions), model_seconds=model_seconds)
+
+        if case["strategy"] in STREAMING_STRATEGIES:
+            seconds, first_tokens = [], []
+            for question in questions:
+                started = time.perf_counter()
+                for _ in reader.stream_answer(question, strategy=case["strategy"]):
+                    pass
+                seconds.append(time.perf_counter() - started)
+                first_tokens.append(reader.last_time_to_first_token)
+            stream = _latencies(seconds)
+            ttft = _latencies(first_tokens)
+            result["stream"] = dict(stream, ttft_p50_ms=ttft["p50_ms"], ttft_p95_ms=ttft["p95_ms"])
+        result["requests"] = server.requests
+        result["spans"] = reader.metrics.summary()
+
+    result["memory"] = {"peak_rss_mb": _peak_rss_mb()}
+    return result
+
+
+def benchmark_suite(pages: Sequence[int] = (10, 100), words_per_page: Sequence[int] = (400,),
+                    extractor: str = "auto", chunker: str = "sentence", strategy: str = "packed",
+                    questions: int = 5, queries: int = 200, repeat: int = 1,
+                    tokens_per_second: float = DEFAULT_TOKENS_PER_SECOND,
+                    first_token_seconds: float = DEFAULT_FIRST_TOKEN_SECONDS,
+                    answer_tokens: int = DEFAULT_ANSWER_TOKENS, seed: int = 0,
+                    directory: Optional[str] = None) -> Dict:
+    """
+    Measure the reader on generated PDFs of every page count and density.
+
+    Each case measures page extraction throughput, chunking, keyword
+    indexing, retrieval latency, and whole questions answered through a
+    local fake Ollama server with a fixed token rate, so results depend on
+    the reader's code rather than on a model. Every case runs in its own
+    freshly started process, so its peak memory is its own.
+
+    Args:
+        pages: Page counts of the generated PDFs
+        words_per_page: Densities (approximate words per page) of the generated PDFs
+        extractor: Extraction backend, or "auto" for the one the reader would pick
+        chunker: Chunker name (see chunking.CHUNKERS)
+        strategy: Strategy of the questions (see pdf_reader.STRATEGIES)
+        questions: Questions asked per case
+        queries: Retrieval queries timed per case
+        repeat: Extraction, chunking and indexing runs per case; the fastest is kept
+        tokens_per_second: Token rate of the fake model
+        first_token_seconds: Delay of the fake model before its first token
+        answer_tokens: Tokens of every fake answer
+        seed: Seed of the generated text and questions
+        directory: Where the PDFs are written (default: a temporary directory)
+
+    Returns:
+        Run description ("machine", "settings") and one result per case in "cases"
+    """
+    settings = {"extractor": extractor, "chunker": chunker, "strategy": strategy, "questions": questions,
+                "queries": queries, "repeat": repeat, "tokens_per_second": tokens_per_second,
+                "first_token_seconds": first_token_seconds, "answer_tokens": answer_tokens, "seed": seed}
+    run = {"suite_version": SUITE_VERSION, "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+           "machine": _machine(), "settings": settings, "cases": []}
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="pdf-reader-bench-") as scratch:
+        for page_count, density in itertools.product(pages, words_per_page):
+            case = dict(settings, pages=page_count, words_per_page=density, directory=directory or scratch)
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                run["cases"].append(executor.submit(run_case, case).result())
+    return run
+
+
+def _machine() -> Dict:
+    """Describe where the benchmark ran, so results of different machines are not mixed up."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"platform": platform.platform(), "python": platform.python_version(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count(),
+            "commit": commit}
+
+
+def _case_name(case: Dict) -> str:
+    return f"{case['pages']}p x {case['words_per_page']}w"
+
+
+def compare_results(baseline: Dict, current: Dict) -> List[Dict]:
+    """
+    Compare the metrics of the cases two runs have in common.
+
+    Returns:
+        One row per case and metric, with the relative change and whether it
+        is a regression (positive "change" is always a slowdown or growth)
+    """
+    def key(case: Dict):
+        return (case["pages"], case["words_per_page"], case["extractor"], case["chunker"], case["strategy"])
+
+    rows = []
+    baseline_cases = {key(case): case for case in baseline.get("cases", [])}
+    for case in current["cases"]:
+        previous = baseline_cases.get(key(case))
+        if previous is None:
+            continue
+        for section, metric, higher_is_better in COMPARED_METRICS:
+            old = previous.get(section, {}).get(metric)
+            new = case.get(section, {}).get(metric)
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / abs(old)
+            rows.append({"case": _case_name(case), "metric": f"{section}.{metric}", "baseline": old,
+                         "current": new, "change": -change if higher_is_better else change})
+    return rows
+
+
+def _print_run(run: Dict) -> None:
+    print(f"{'case':>14} {'pages/sec':>10} {'chunk ms':>9} {'index ms':>9} {'retrieve':>9} "
+          f"{'ask p50':>9} {'overhead':>9} {'ttft p50':>9} {'peak MB':>8}")
+    for case in run["cases"]:
+        # Strategies that cannot stream have no time to first token
+        ttft = f"{case['stream']['ttft_p50_ms']:>9.1f}" if "stream" in case else f"{'n/a':>9}"
+        peak = case["memory"]["peak_rss_mb"]
+        peak = f"{peak:>8.1f}" if peak is not None else f"{'n/a':>8}"
+        print(f"{_case_name(case):>14} {case['extract']['pages_per_sec']:>10.1f} "
+              f"{case['chunk']['seconds'] * 1000:>9.1f} {case['index']['seconds'] * 1000:>9.1f} "
+              f"{case['retrieve']['p50_ms']:>9.3f} {case['ask']['p50_ms']:>9.1f} "
+              f"{case['ask']['overhead_p50_ms']:>9.1f} {ttft} {peak}")
+    print("(milliseconds; overhead is the ask p50 minus the time of one fake model answer)")
+
+
+def _print_comparison(rows: List[Dict], threshold: float) -> int:
+    """Print the change of every metric and return the number of regressions beyond the threshold."""
+    if not rows:
+        print("No cases in common (same pages, density, extractor, chunker and strategy)")
+        return 0
+    regressions = 0
+    print(f"{'case':>14} {'metric':>22} {'baseline':>11} {'current':>11} {'change':>8}")
+    for row in rows:
+        flag = ""
+        if row["change"] > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{row['case']:>14} {row['metric']:>22} {row['baseline']:>11.4g} {row['current']:>11.4g} "
+              f"{row['change'] * 100:>+7.1f}%{flag}")
+    return regressions
+
+
+def suite_main(argv: List[str]) -> int:
+    """Run `benchmark.py suite`: benchmark every stage on generated PDFs and save the results."""
+    parser = argparse.ArgumentParser(prog="benchmark.py suite",
+                                     description="Benchmark extraction, chunking, indexing, retrieval and "
+                                                 "whole questions on generated PDFs, against a fake Ollama")
+    parser.add_argument("-p", "--pages", type=int, nargs="+", default=[10, 100],
+                       help="Page counts of the generated PDFs (default: 10 100)")
+    parser.add_argument("-d", "--words-per-page", type=int, nargs="+", default=[400],
+                       help="Approximate words per page of the generated PDFs (default: 400)")
+    parser.add_argument("-e", "--extractor", default="auto",
+                       help="Extraction backend, or auto for the one the reader picks (default: auto)")
+    parser.add_argument("--chunker", choices=list(CHUNKERS), default="sentence",
+                       help="Chunker to measure (default: sentence)")
+    parser.add_argument("-s", "--strategy", choices=STRATEGIES, default="packed",
+                       help="Strategy of the timed questions (default: packed)")
+    parser.add_argument("-q", "--questions", type=int, default=5,
+                       help="Questions asked per PDF (default: 5)")
+    parser.add_argument("--queries", type=int, default=200,
+                       help="Retrieval queries timed per PDF (default: 200)")
+    parser.add_argument("-r", "--repeat", type=int, default=1,
+                       help="Extraction, chunking and indexing runs per PDF, fastest is reported "
+                            "(default: 1)")
+    parser.add_argument("-t", "--tokens-per-second", type=float, default=DEFAULT_TOKENS_PER_SECOND,
+                       help=f"Token rate of the fake model (default: {DEFAULT_TOKENS_PER_SECOND:g})")
+    parser.add_argument("--first-token-ms", type=float, default=DEFAULT_FIRST_TOKEN_SECONDS * 1000,
+                       help=f"Delay of the fake model before its first token "
+                            f"(default: {DEFAULT_FIRST_TOKEN_SECONDS * 1000:g})")
+    parser.add_argument("--answer-tokens", type=int, default=DEFAULT_ANSWER_TOKENS,
+                       help=f"Tokens of every fake answer (default: {DEFAULT_ANSWER_TOKENS})")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated text (default: 0)")
+    parser.add_argument("--keep-pdfs", metavar="DIR", help="Write the generated PDFs to DIR and keep them")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                       help="JSON file receiving the results (default: benchmark_results/<time>.json)")
+    parser.add_argument("--compare", metavar="FILE",
+                       help="Results of an earlier run to compare with; exits with 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                       help="Relative slowdown reported as a regression by --compare (default: 0.1)")
+
+    args = parser.parse_args(argv)
+    if args.keep_pdfs:
+        os.makedirs(args.keep_pdfs, exist_ok=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("suite_version") != SUITE_VERSION:
+            parser.error(f"{args.compare} was written by another version of the suite")
+
+    print(f"Benchmarking {len(args.pages) * len(args.words_per_page)} generated PDF(s) "
+          f"against a fake model at {args.tokens_per_second:g} tokens/s")
+    run = benchmark_suite(args.pages, args.words_per_page, args.extractor, args.chunker, args.strategy,
+                          args.questions, args.queries, args.repeat, args.tokens_per_second,
+                          args.first_token_ms / 1000, args.answer_tokens, args.seed, args.keep_pdfs)
+    _print_run(run)
+
+    output = args.output or os.path.join(
+        "benchmark_results", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if baseline is not None:
+        print(f"\nCompared with {args.compare} (started {baseline.get('started')}):")
+        regressions = _print_comparison(compare_results(baseline, run), args.threshold)
+        if regressions:
+            print(f"{regressions} metric(s) regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(suite_main(sys.argv[1:]))
@@ -0,0 +1,306 @@
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import deque
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Words and single punctuation marks; close enough to BPE token counts for budgeting
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# One pass over a page finds every place a segment may end: after sentence
+# punctuation followed by a line break (paragraph end) or by spaces and a
+# capitalized word (sentence end), or at a blank line.
+_BOUNDARY_RE = re.compile(
+    r"[.!?]+[\"')\]]*(?:(?P<para>[ \t]*\n(?:[ \t]*\n)*)|(?P<sent>[ \t]+(?=[A-Z0-9\"'(\[])))"
+    r"|(?P<blank>\n[ \t]*\n\s*)"
+)
+
+_WORD_RE = re.compile(r"\s*\S+\s*")
+
+DEFAULT_CHUNK_SIZES = {"fixed": 1000, "sentence": 1000, "paragraph": 1000, "tokens": 250}
+
+# Bump when the same settings cut the same pages differently, so cached chunks are not reused
+CHUNKING_VERSION = 2
+
+
+def approx_token_count(text: str) -> int:
+    """Approximate the number of model tokens in a text."""
+    return len(_TOKEN_RE.findall(text))
+
+
+class Chunk(NamedTuple):
+    """A chunk of document text and where it came from."""
+    text: str
+    page_start: int  # 1-based number of the first page the chunk covers
+    page_end: int  # 1-based number of the last page the chunk covers
+    char_start: int  # Offset of the chunk in the document text
+    char_end: int
+
+
+class _Document:
+    """
+    Streaming view of the document text: normalized non-empty pages, each
+    followed by a blank line. Only text not yet emitted is kept in memory.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.buffer_start = 0
+        self.length = 0
+        self.page_offsets: List[int] = []
+        self.page_numbers: List[int] = []
+
+    def add_page(self, page_number: int, text: str) -> int:
+        """Append a page and return its offset in the document."""
+        offset = self.length
+        self.page_offsets.append(offset)
+        self.page_numbers.append(page_number)
+        self.buffer += text + "\n\n"
+        self.length += len(text) + 2
+        return offset
+
+    def page_at(self, offset: int) -> int:
+        return self.page_numbers[max(0, bisect_right(self.page_offsets, offset) - 1)]
+
+    def chunk(self, start: int, end: int) -> Chunk:
+        text = self.buffer[start - self.buffer_start:end - self.buffer_start]
+        return Chunk(text, self.page_at(start), self.page_at(max(start, end - 1)), start, end)
+
+    def discard_before(self, offset: int) -> None:
+        """Drop text that no future chunk can include."""
+        if offset > self.buffer_start:
+            self.buffer = self.buffer[offset - self.buffer_start:]
+            self.buffer_start = offset
+
+
+class Chunker(ABC):
+    name = ""
+
+    def __init__(self, chunk_size: Optional[int] = None, overlap: int = 0):
+        """
+        Split document text into chunks.
+
+        Args:
+            chunk_size: Maximum chunk size (characters, or tokens for the token chunker)
+            overlap: How much of the end of each chunk is repeated at the start of the next
+        """
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZES[self.name]
+        if not 0 <= overlap < self.chunk_size:
+            raise ValueError("Chunk overlap must be at least 0 and smaller than the chunk size")
+        self.overlap = overlap
+
+    def signature(self) -> str:
+        """Identify the chunking settings, e.g. for cache keys."""
+        return f"{self.name}:{self.chunk_size}:{self.overlap}:v{CHUNKING_VERSION}"
+
+    def normalize_page(self, text: str) -> str:
+        """Clean a page of extracted text, keeping line and paragraph breaks."""
+        lines = [re.sub(r"[ \t\f\v]+", " ", line).strip() for line in text.splitlines()]
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+    @abstractmethod
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[Chunk]:
+        """
+        Chunk pages as they arrive.
+
+        Every page starts a new chunk, so the chunks of a page depend on
+        that page only and survive edits to other pages unchanged.
+
+        Args:
+            pages: Extracted text of every page, in order
+
+        Yields:
+            Chunks in document order
+        """
+
+
+class FixedChunker(Chunker):
+    """Fixed-size character windows over the whitespace-collapsed text of each page."""
+    name = "fixed"
+
+    def normalize_page(self, text: str) -> str:
+        return re.sub(r"\s+", " ", text).strip()
+
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[Chunk]:
+        document = _Document()
+        step = self.chunk_size - self.overlap
+        for page_number, text in enumerate(pages, 1):
+            text = self.normalize_page(text or "")
+            if not text:
+                continue
+            pos = document.add_page(page_number, text)
+            end = pos + len(text)
+
+            # Emit every complete window, then the rest of the page if no window covered it
+            emitted_end = pos
+            while end - pos >= self.chunk_size:
+                yield document.chunk(pos, pos + self.chunk_size)
+                emitted_end = pos + self.chunk_size
+                pos += step
+            if end > emitted_end:
+                yield document.chunk(pos, end)
+            document.discard_before(document.length)
+
+
+class _Unit(NamedTuple):
+    start: int
+    end: int
+    size: int
+
+
+class _PackingChunker(Chunker):
+    """
+    Packs whole sentences of a page into chunks of at most chunk_size. Each
+    page is scanned once for boundaries; a sentence longer than a chunk is split.
+    """
+    group_paragraphs = False
+
+    def measure(self, text: str) -> int:
+        return len(text)
+
+    def _scan(self, text: str, offset: int) -> Iterator[Tuple[int, int, bool]]:
+        """Yield (start, end, ends_paragraph) of every sentence of a page."""
+        start = 0
+        for match in _BOUNDARY_RE.finditer(text):
+            yield offset + start, offset + match.end(), match.lastgroup != "sent"
+            start = match.end()
+        # The blank line appended after the page belongs to its last sentence
+        if start < len(text) + 2:
+            yield offset + start, offset + len(text) + 2, True
+
+    def _units(self, document: _Document, sentences: List[Tuple[int, int]]) -> List[_Unit]:
+        units = []
+        for start, end in sentences:
+            size = self.measure(document.buffer[start - document.buffer_start:end - document.buffer_start])
+            units.append(_Unit(start, end, size))
+        return units
+
+    def _split(self, document: _Document, unit: _Unit) -> List[_Unit]:
+        """Cut a unit that is larger than a chunk into chunk-sized pieces at word boundaries."""
+        text = document.buffer[unit.start - document.buffer_start:unit.end - document.buffer_start]
+        pieces = []
+        piece_start = 0
+        piece_size = 0
+        for match in _WORD_RE.finditer(text):
+            size = self.measure(match.group())
+            if piece_size and piece_size + size > self.chunk_size:
+                pieces.append(_Unit(unit.start + piece_start, unit.start + match.start(), piece_size))
+                piece_start = match.start()
+                piece_size = 0
+
+            if size > self.chunk_size:
+                # A single "word" larger than a chunk: cut it into equal parts
+                parts = -(-size // self.chunk_size)
+                length = match.end() - match.start()
+                bounds = [match.start() + length * i // parts for i in range(parts + 1)]
+                pieces.extend(_Unit(unit.start + start, unit.start + end, -(-size // parts))
+                              for start, end in zip(bounds, bounds[1:]))
+                piece_start = match.end()
+                continue
+            piece_size += size
+
+        if piece_start < len(text):
+            pieces.append(_Unit(unit.start + piece_start, unit.end, piece_size))
+        return pieces
+
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[Chunk]:
+        document = _Document()
+        pending = deque()
+        pending_size = 0
+        has_new_text = False  # Whether pending holds more than text carried over as overlap
+
+        def flush(keep_overlap: bool) -> Iterator[Chunk]:
+            nonlocal pending_size, has_new_text
+            yield document.chunk(pending[0].start, pending[-1].end)
+            has_new_text = False
+
+            # Carry trailing whole units that fit in the overlap into the next chunk
+            carried = deque()
+            carried_size = 0
+            while keep_overlap and pending and carried_size + pending[-1].size <= self.overlap:
+                unit = pending.pop()
+                carried.appendleft(unit)
+                carried_size += unit.size
+            pending.clear()
+            pending.extend(carried)
+            pending_size = carried_size
+
+        for page_number, text in enumerate(pages, 1):
+            text = self.normalize_page(text or "")
+            if not text:
+                continue
+            offset = document.add_page(page_number, text)
+
+            paragraph = []
+            for start, end, ends_paragraph in self._scan(text, offset):
+                paragraph.append((start, end))
+                if self.group_paragraphs and not ends_paragraph:
+                    continue
+
+                units = self._units(document, paragraph)
+                if self.group_paragraphs and sum(unit.size for unit in units) <= self.chunk_size:
+                    units = [_Unit(units[0].start, units[-1].end, sum(unit.size for unit in units))]
+                paragraph = []
+
+                for unit in units:
+                    for piece in (self._split(document, unit) if unit.size > self.chunk_size else [unit]):
+                        if pending and pending_size + piece.size > self.chunk_size:
+                            yield from flush(keep_overlap=True)
+                            # Drop overlap units that would not leave room for the new one
+                            while pending and pending_size + piece.size > self.chunk_size:
+                                pending_size -= pending.popleft().size
+                        pending.append(piece)
+                        pending_size += piece.size
+                        has_new_text = True
+
+            # The rest of the page is a chunk of its own; overlap is not carried into the next page
+            if has_new_text:
+                yield from flush(keep_overlap=False)
+            pending.clear()
+            pending_size = 0
+            document.discard_before(document.length)
+
+
+class SentenceChunker(_PackingChunker):
+    """Packs whole sentences into chunks of at most chunk_size characters."""
+    name = "sentence"
+
+
+class ParagraphChunker(_PackingChunker):
+    """Packs whole paragraphs, falling back to sentences for long paragraphs."""
+    name = "paragraph"
+    group_paragraphs = True
+
+
+class TokenChunker(_PackingChunker):
+    """Packs whole sentences into chunks of at most chunk_size approximate tokens."""
+    name = "tokens"
+
+    def measure(self, text: str) -> int:
+        return approx_token_count(text)
+
+
+CHUNKERS = {chunker.name: chunker for chunker in (FixedChunker, SentenceChunker, ParagraphChunker, TokenChunker)}
+
+
+def make_chunker(name: str, chunk_size: Optional[int] = None, overlap: int = 0) -> Chunker:
+    """
+    Create a chunker by name.
+
+    Args:
+        name: One of CHUNKERS ("fixed", "sentence", "paragraph", "tokens")
+        chunk_size: Maximum chunk size, or None for the chunker's default
+        overlap: Overlap between consecutive chunks, in the chunker's size unit
+    """
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker: {name}")
+    return CHUNKERS[name](chunk_size, overlap)
+
+
+def chunks_from_spans(pages: Sequence[str], spans: Sequence[Tuple[int, int]]) -> List[Chunk]:
+    """Rebuild chunks from normalized page texts and the chunks' character spans."""
+    document = _Document()
+    for page_number, text in enumerate(pages, 1):
+        if text:
+            document.add_page(page_number, text)
+    return [document.chunk(start, end) for start, end in spans]
@@ -0,0 +1,617 @@
+import os
+import json
+import math
+import time
+import uuid
+import hashlib
+import zlib
+import struct
+import logging
+import argparse
+from collections import Counter, OrderedDict
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from chunking import CHUNKERS, Chunk, chunks_from_spans, make_chunker
+from extraction_cache import DEFAULT_CACHE_DIR, atomic_write, decode_extraction, encode_extraction, file_sha256
+from extractors import make_extractor, select_extractor
+from retrieval import tokenize
+from pdf_reader import PDFReaderAI, STRATEGIES, _add_extractor_argument, _print_answer, iter_pages
+from instrumentation import add_logging_argument, setup_logging
+
+log = logging.getLogger(__name__)
+
+# Segment file layout: header, then uint32 arrays (chunk -> document id,
+# chunk -> position in its document, chunk token counts, term -> first
+# posting, posting -> chunk), uint16 term frequencies, and the
+# zlib-compressed, NUL-separated sorted term list.
+_SEGMENT_MAGIC = b"PDFS"
+_SEGMENT_VERSION = 1
+_SEGMENT_HEADER = struct.Struct("<4sBIIII")
+_SEGMENT_SUFFIX = ".seg"
+_MANIFEST = "manifest.json"
+
+# Documents ingested before a segment is written, bounding ingest memory
+DEFAULT_SEGMENT_DOCUMENTS = 256
+
+# Decoded documents kept in memory for reading chunk text
+_DOCUMENT_CACHE_SIZE = 64
+
+
+def _ingest_document(pdf_path: str, chunker_name: str, chunk_size: int, overlap: int,
+                     extractor: str = "auto") -> Dict:
+    """
+    Extract, chunk and tokenize one PDF.
+
+    This runs inside worker processes, so only plain data is returned.
+    """
+    if extractor == "auto":
+        extractor = select_extractor(pdf_path)
+    chunker = make_chunker(chunker_name, chunk_size, overlap)
+    pages = []
+
+    def record_pages():
+        for text in iter_pages(pdf_path, extractor=extractor):
+            pages.append(chunker.normalize_page(text))
+            yield text
+
+    chunks = list(chunker.iter_chunks(record_pages()))
+    return {
+        "path": pdf_path,
+        "hash": file_sha256(pdf_path),
+        "extractor": extractor,
+        "pages": pages,
+        "spans": [(chunk.char_start, chunk.char_end) for chunk in chunks],
+        "terms": [Counter(tokenize(chunk.text)) for chunk in chunks],
+    }
+
+
+class _Segment:
+    """One immutable slice of the inverted index, loaded from a segment file."""
+
+    def __init__(self, name: str, chunk_docs: np.ndarray, chunk_positions: np.ndarray,
+                 chunk_lengths: np.ndarray, term_offsets: np.ndarray, posting_chunks: np.ndarray,
+                 posting_tfs: np.ndarray, terms: List[str]):
+        self.name = name
+        self.chunk_docs = chunk_docs
+        self.chunk_positions = chunk_positions
+        self.chunk_lengths = chunk_lengths
+        self.term_offsets = term_offsets
+        self.posting_chunks = posting_chunks
+        self.posting_tfs = posting_tfs
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.live = np.ones(len(chunk_docs), dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.chunk_docs)
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (chunk, tf) postings of a term in this segment."""
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return self.posting_chunks[:0], self.posting_tfs[:0]
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return self.posting_chunks[start:end], self.posting_tfs[start:end]
+
+    @classmethod
+    def build(cls, name: str, documents: Iterable[Tuple[int, List[Counter]]]) -> "_Segment":
+        """Build a segment from (document id, per-chunk term counts) pairs."""
+        chunk_docs, chunk_positions, chunk_lengths = [], [], []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, chunk_terms in documents:
+            for position, terms in enumerate(chunk_terms):
+                chunk = len(chunk_docs)
+                chunk_docs.append(doc_id)
+                chunk_positions.append(position)
+                chunk_lengths.append(sum(terms.values()))
+                for term, tf in terms.items():
+                    postings.setdefault(term, []).append((chunk, tf))
+
+        terms = sorted(postings)
+        term_offsets = [0]
+        posting_chunks, posting_tfs = [], []
+        for term in terms:
+            for chunk, tf in postings[term]:
+                posting_chunks.append(chunk)
+                posting_tfs.append(min(tf, 0xFFFF))
+            term_offsets.append(len(posting_chunks))
+
+        return cls(name, np.array(chunk_docs, dtype=np.uint32), np.array(chunk_positions, dtype=np.uint32),
+                   np.array(chunk_lengths, dtype=np.uint32), np.array(term_offsets, dtype=np.uint32),
+                   np.array(posting_chunks, dtype=np.uint32), np.array(posting_tfs, dtype=np.uint16), terms)
+
+    def terms(self) -> List[str]:
+        terms = [""] * len(self.term_ids)
+        for term, term_id in self.term_ids.items():
+            terms[term_id] = term
+        return terms
+
+    def encode(self) -> bytes:
+        terms = zlib.compress("\0".join(self.terms()).encode('utf-8'), 6)
+        header = _SEGMENT_HEADER.pack(_SEGMENT_MAGIC, _SEGMENT_VERSION, len(self.chunk_docs),
+                                      len(self.term_ids), len(self.posting_chunks), len(terms))
+        arrays = (self.chunk_docs, self.chunk_positions, self.chunk_lengths, self.term_offsets,
+                  self.posting_chunks, self.posting_tfs)
+        return header + b"".join(array.tobytes() for array in arrays) + terms
+
+    @classmethod
+    def decode(cls, name: str, data: bytes) -> "_Segment":
+        magic, version, num_chunks, num_terms, num_postings, terms_len = _SEGMENT_HEADER.unpack_from(data)
+        if magic != _SEGMENT_MAGIC or version != _SEGMENT_VERSION:
+            raise ValueError(f"Unsupported index segment: {name}")
+
+        offset = _SEGMENT_HEADER.size
+        arrays = []
+        for dtype, count in ((np.uint32, num_chunks), (np.uint32, num_chunks), (np.uint32, num_chunks),
+                             (np.uint32, num_terms + 1), (np.uint32, num_postings), (np.uint16, num_postings)):
+            arrays.append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+            offset += count * np.dtype(dtype).itemsize
+
+        text = zlib.decompress(data[offset:offset + terms_len]).decode('utf-8')
+        terms = text.split("\0") if num_terms else []
+        return cls(name, *arrays, terms)
+
+
+class Corpus:
+    def __init__(self, index_dir: str, chunker: str = "sentence", chunk_size: Optional[int] = None,
+                 chunk_overlap: int = 0, k1: float = 1.5, b: float = 0.75, extractor: str = "auto"):
+        """
+        Persistent BM25 index over the chunks of many PDFs.
+
+        The index is a set of immutable segment files plus a manifest of the
+        documents they hold. Adding documents writes a new segment; removing
+        one only drops it from the manifest until compact() rewrites the segments.
+
+        Args:
+            index_dir: Directory holding the index
+            chunker: Chunker used to split documents (see chunking.CHUNKERS)
+            chunk_size: Maximum chunk size in the chunker's unit
+            chunk_overlap: Overlap between consecutive chunks
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            extractor: Text extraction backend of new documents, or "auto" to
+                pick the fastest one that extracts each PDF well
+        """
+        if extractor != "auto":
+            make_extractor(extractor)
+        self.index_dir = index_dir
+        self.documents_dir = os.path.join(index_dir, "documents")
+        os.makedirs(self.documents_dir, exist_ok=True)
+        self.chunker = make_chunker(chunker, chunk_size, chunk_overlap)
+        self.extractor = extractor
+        self.k1 = k1
+        self.b = b
+
+        self.manifest = {
+            "id": uuid.uuid4().hex,
+            "revision": 0,
+            "chunker": self.chunker.signature(),
+            "next_doc_id": 0,
+            "next_segment": 0,
+            "segments": [],
+            "documents": {},
+        }
+        path = os.path.join(index_dir, _MANIFEST)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            if self.manifest["chunker"] != self.chunker.signature():
+                raise ValueError(f"Index at {index_dir} was built with chunker {self.manifest['chunker']}, "
+                                 f"not {self.chunker.signature()}")
+
+        self.segments: List[_Segment] = []
+        for name in self.manifest["segments"]:
+            with open(os.path.join(index_dir, name), 'rb') as f:
+                self.segments.append(_Segment.decode(name, f.read()))
+        self._update_live()
+        self._documents: "OrderedDict[int, List[Chunk]]" = OrderedDict()
+        # Whether the manifest has changes not saved yet that do not change the index (timestamps)
+        self._touched = False
+
+    def __len__(self) -> int:
+        """Number of chunks in the live documents."""
+        return self._live_chunks
+
+    @property
+    def documents(self) -> Dict[str, Dict]:
+        """Document id (as a string) -> path, hash, extraction backend and chunk count."""
+        return self.manifest["documents"]
+
+    @property
+    def revision_id(self) -> str:
+        """Changes whenever documents are added or removed, e.g. to key cached answers."""
+        return f"corpus:{self.manifest['id']}:{self.manifest['revision']}"
+
+    def _update_live(self) -> None:
+        """Recompute which indexed chunks belong to documents still in the corpus."""
+        live_ids = np.array([int(doc_id) for doc_id in self.documents], dtype=np.uint32)
+        self._live_chunks = 0
+        self._live_length = 0
+        for segment in self.segments:
+            segment.live = np.isin(segment.chunk_docs, live_ids)
+            self._live_chunks += int(segment.live.sum())
+            self._live_length += int(segment.chunk_lengths[segment.live].sum())
+
+    def _save_manifest(self, changed: bool = True) -> None:
+        """Write the manifest; a new revision is only started when the indexed content changed."""
+        if changed:
+            self.manifest["revision"] += 1
+        data = json.dumps(self.manifest, indent=1).encode('utf-8')
+        with atomic_write(os.path.join(self.index_dir, _MANIFEST)) as f:
+            f.write(data)
+        self._touched = False
+
+    def _document_path(self, doc_id: int) -> str:
+        return os.path.join(self.documents_dir, f"{doc_id}.pdfc")
+
+    def _find(self, pdf_path: str) -> Optional[str]:
+        pdf_path = os.path.abspath(pdf_path)
+        for doc_id, document in self.documents.items():
+            if document["path"] == pdf_path:
+                return doc_id
+        return None
+
+    def _is_current(self, pdf_path: str) -> bool:
+        """Tell whether a PDF is indexed and unchanged since."""
+        doc_id = self._find(pdf_path)
+        if doc_id is None:
+            return False
+        document = self.documents[doc_id]
+        stat = os.stat(pdf_path)
+        if (stat.st_size, stat.st_mtime_ns) == (document["size"], document["mtime_ns"]):
+            return True
+        if file_sha256(pdf_path) != document["hash"]:
+            return False
+
+        # Touched but identical: remember the new timestamp to skip hashing next time
+        document["mtime_ns"] = stat.st_mtime_ns
+        self._touched = True
+        return True
+
+    def add(self, pdf_paths: Iterable[str], workers: int = 1,
+            segment_documents: int = DEFAULT_SEGMENT_DOCUMENTS) -> int:
+        """
+        Index PDFs, re-indexing those that changed and skipping unchanged ones.
+
+        A changed PDF keeps its previous version in the corpus until the new
+        one is indexed, so a PDF that can no longer be read is not lost.
+
+        Args:
+            pdf_paths: PDFs to add
+            workers: Number of processes extracting documents in parallel
+            segment_documents: Documents per segment file written
+
+        Returns:
+            Number of documents indexed
+        """
+        pending = [os.path.abspath(path) for path in pdf_paths if not self._is_current(path)]
+        if self._touched:
+            self._save_manifest(changed=False)
+        if not pending:
+            return 0
+
+        log.debug("Indexing %d documents with %d workers", len(pending), workers)
+        started = time.perf_counter()
+        indexed = 0
+        batch = []
+        chunker = (self.chunker.name, self.chunker.chunk_size, self.chunker.overlap)
+        # Only a small window of documents is in flight, and each result is
+        # dropped once consumed, so memory is bounded by the segment batch
+        paths = iter(pending)
+        max_in_flight = max(1, workers) * 2
+        in_flight = {}
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+            while True:
+                for path in islice(paths, max_in_flight - len(in_flight)):
+                    in_flight[executor.submit(_ingest_document, path, *chunker, self.extractor)] = path
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    try:
+                        batch.append(future.result())
+                    except Exception as e:
+                        log.warning("Could not index %s (%s)", path, e)
+                        continue
+                    if len(batch) >= segment_documents:
+                        indexed += self._write_segment(batch)
+                        batch = []
+        if batch:
+            indexed += self._write_segment(batch)
+
+        log.debug("Indexed %d documents in %.2fs", indexed, time.perf_counter() - started)
+        return indexed
+
+    def _write_segment(self, batch: List[Dict]) -> int:
+        """
+        Store the documents of a batch and index them in a new segment.
+
+        Previous versions of the documents are dropped by the same manifest
+        update that adds the new ones.
+        """
+        entries = []
+        replaced = []
+        for result in batch:
+            previous = self._find(result["path"])
+            if previous is not None:
+                replaced.append(previous)
+            doc_id = self.manifest["next_doc_id"]
+            self.manifest["next_doc_id"] += 1
+            with atomic_write(self._document_path(doc_id)) as f:
+                f.write(encode_extraction(result["pages"], result["spans"]))
+            stat = os.stat(result["path"])
+            self.documents[str(doc_id)] = {
+                "path": result["path"],
+                "hash": result["hash"],
+                "extractor": result["extractor"],
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "chunks": len(result["spans"]),
+            }
+            entries.append((doc_id, result["terms"]))
+
+        name = f"{self.manifest['next_segment']:06d}{_SEGMENT_SUFFIX}"
+        self.manifest["next_segment"] += 1
+        segment = _Segment.build(name, entries)
+        with atomic_write(os.path.join(self.index_dir, name)) as f:
+            f.write(segment.encode())
+        self.segments.append(segment)
+        self.manifest["segments"].append(name)
+
+        for doc_id in replaced:
+            del self.documents[doc_id]
+            self._documents.pop(int(doc_id), None)
+
+        # The manifest is written last: a crash before it leaves only unreferenced files
+        self._save_manifest()
+        self._update_live()
+        self._delete_documents(replaced)
+        return len(batch)
+
+    def _delete_documents(self, doc_ids: List[str]) -> None:
+        """Delete the stored text of documents no longer in the manifest, compacting if needed."""
+        for doc_id in doc_ids:
+            try:
+                os.remove(self._document_path(int(doc_id)))
+            except OSError:
+                pass
+
+        # Rewrite the index once most of it belongs to removed documents
+        total = sum(len(segment) for segment in self.segments)
+        if doc_ids and total - self._live_chunks > self._live_chunks:
+            self.compact()
+
+    def remove(self, pdf_paths: Iterable[str]) -> int:
+        """
+        Drop PDFs from the corpus.
+
+        Their postings stay in the segment files, ignored, until enough of
+        the index is dead for compact() to rewrite it.
+
+        Returns:
+            Number of documents removed
+        """
+        removed = []
+        for pdf_path in pdf_paths:
+            doc_id = self._find(pdf_path)
+            if doc_id is None:
+                continue
+            del self.documents[doc_id]
+            self._documents.pop(int(doc_id), None)
+            removed.append(doc_id)
+
+        if removed:
+            self._save_manifest()
+            self._update_live()
+            self._delete_documents(removed)
+        return len(removed)
+
+    def sync(self, directory: str, workers: int = 1) -> Tuple[int, int]:
+        """
+        Make the corpus mirror the PDFs under a directory.
+
+        Returns:
+            Number of documents indexed and removed
+        """
+        pdf_paths = []
+        for root, _, files in os.walk(directory):
+            pdf_paths.extend(os.path.abspath(os.path.join(root, name))
+                             for name in sorted(files) if name.lower().endswith('.pdf'))
+
+        present = set(pdf_paths)
+        removed = self.remove([document["path"] for document in list(self.documents.values())
+                               if document["path"] not in present])
+        return self.add(pdf_paths, workers), removed
+
+    def compact(self) -> None:
+        """Rewrite all segments as one, dropping the postings of removed documents."""
+        entries = []
+        for segment in self.segments:
+            chunk_terms = [Counter() for _ in range(len(segment))]
+            for term, term_id in segment.term_ids.items():
+                start, end = segment.term_offsets[term_id], segment.term_offsets[term_id + 1]
+                for chunk, tf in zip(segment.posting_chunks[start:end], segment.posting_tfs[start:end]):
+                    if segment.live[chunk]:
+                        chunk_terms[chunk][term] = int(tf)
+
+            documents: "OrderedDict[int, List[Counter]]" = OrderedDict()
+            for chunk in np.flatnonzero(segment.live):
+                documents.setdefault(int(segment.chunk_docs[chunk]), []).append(chunk_terms[chunk])
+            entries.extend(documents.items())
+
+        old_names = list(self.manifest["segments"])
+        name = f"{self.manifest['next_segment']:06d}{_SEGMENT_SUFFIX}"
+        self.manifest["next_segment"] += 1
+        segment = _Segment.build(name, entries)
+        with atomic_write(os.path.join(self.index_dir, name)) as f:
+            f.write(segment.encode())
+        self.segments = [segment]
+        self.manifest["segments"] = [name]
+        self._save_manifest()
+        self._update_live()
+
+        for old_name in old_names:
+            try:
+                os.remove(os.path.join(self.index_dir, old_name))
+            except OSError:
+                pass
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, int, float]]:
+        """
+        Rank the chunks of every document against a query with BM25.
+
+        Args:
+            query: Free-text query, usually the user's question
+            k: Maximum number of results
+
+        Returns:
+            Up to k (document id, chunk position, score) triples, best first
+        """
+        if not self._live_chunks or k <= 0:
+            return []
+
+        terms = set(tokenize(query))
+        postings = {term: [segment.postings(term) for segment in self.segments] for term in terms}
+        avg_length = self._live_length / self._live_chunks or 1.0
+
+        # Document frequencies over live chunks of all segments
+        idf = {}
+        for term, per_segment in postings.items():
+            df = sum(int(segment.live[chunks].sum()) for segment, (chunks, _) in zip(self.segments, per_segment))
+            if df:
+                idf[term] = math.log(1 + (self._live_chunks - df + 0.5) / (df + 0.5))
+
+        candidates = []
+        for i, segment in enumerate(self.segments):
+            scores = np.zeros(len(segment), dtype=np.float32)
+            for term, weight in idf.items():
+                chunks, tfs = postings[term][i]
+                if not len(chunks):
+                    continue
+                tfs = tfs.astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * segment.chunk_lengths[chunks] / avg_length)
+                scores[chunks] += weight * tfs * (self.k1 + 1) / (tfs + norm)
+            scores[~segment.live] = 0.0
+
+            top = np.flatnonzero(scores)
+            if len(top) > k:
+                top = top[np.argpartition(-scores[top], k - 1)[:k]]
+            candidates.extend((float(scores[chunk]), int(segment.chunk_docs[chunk]),
+                               int(segment.chunk_positions[chunk])) for chunk in top)
+
+        candidates.sort(reverse=True)
+        return [(doc_id, position, score) for score, doc_id, position in candidates[:k]]
+
+    def chunk(self, doc_id: int, position: int) -> Chunk:
+        """Return a chunk of an indexed document, with its pages and offsets."""
+        chunks = self._documents.get(doc_id)
+        if chunks is None:
+            with open(self._document_path(doc_id), 'rb') as f:
+                entry = decode_extraction(f.read())
+            chunks = chunks_from_spans(entry.pages, entry.chunk_spans)
+            self._documents[doc_id] = chunks
+            while len(self._documents) > _DOCUMENT_CACHE_SIZE:
+                self._documents.popitem(last=False)
+        else:
+            self._documents.move_to_end(doc_id)
+        return chunks[position]
+
+
+class CorpusReader(PDFReaderAI):
+    def __init__(self, corpus: Corpus, **kwargs):
+        """
+        Answer questions from every document of a corpus.
+
+        Args:
+            corpus: The indexed documents
+            **kwargs: PDFReaderAI options (model, strategy settings, answer cache...)
+        """
+        super().__init__(**kwargs)
+        self.corpus = corpus
+        self.current_pdf = corpus.index_dir
+        self.chunk_documents: List[str] = []
+
+    def _check_loaded(self) -> None:
+        if not len(self.corpus):
+            raise ValueError("The corpus is empty. Please add PDFs first.")
+
+    def retrieve(self, question: str, k: int = 3) -> List[int]:
+        """
+        Select the chunks of the corpus most relevant to a question.
+
+        The selected chunks become self.text_chunks, so the ids returned
+        index into them like for a single PDF. No ids are returned when no
+        document contains a word of the question; the question is then
+        answered without asking the model.
+        """
+        hits = self.corpus.search(question, k)
+        self.chunks = [self.corpus.chunk(doc_id, position) for doc_id, position, _ in hits]
+        self.text_chunks = [chunk.text for chunk in self.chunks]
+        self.chunk_documents = [self.corpus.documents[str(doc_id)]["path"] for doc_id, _, _ in hits]
+        self.document_hash = self.corpus.revision_id
+        return list(range(len(hits)))
+
+    def _chunk_source(self, chunk_id: int) -> str:
+        return f"{os.path.basename(self.chunk_documents[chunk_id])}, {super()._chunk_source(chunk_id)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF Reader AI - Ask questions about a folder of PDFs")
+    parser.add_argument("directory", help="Directory of PDF files (searched recursively)")
+    parser.add_argument("-q", "--question", help="Question to ask about the documents")
+    parser.add_argument("-m", "--model", default="tinyllama:1.1b",
+                       help="Ollama model to use (default: tinyllama:1.1b)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                       help="Number of processes indexing documents (default: CPU count)")
+    parser.add_argument("-k", "--max-chunks", type=int,
+                       help="Number of most relevant chunks to consider per question")
+    parser.add_argument("-s", "--strategy", choices=STRATEGIES, default="packed",
+                       help="How the retrieved chunks are sent to the model (default: packed)")
+    parser.add_argument("--chunker", choices=list(CHUNKERS), default="sentence",
+                       help="How documents are cut into chunks (default: sentence)")
+    _add_extractor_argument(parser)
+    parser.add_argument("--index-dir",
+                       help="Directory of the index (default: one per directory in the cache directory)")
+    parser.add_argument("--no-stream", dest="stream", action="store_false",
+                       help="Print answers only once they are complete")
+    add_logging_argument(parser)
+
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+
+    try:
+        directory = os.path.abspath(args.directory)
+        index_dir = args.index_dir or os.path.join(
+            os.getenv("PDF_READER_CACHE_DIR") or DEFAULT_CACHE_DIR, "corpus",
+            hashlib.sha256(directory.encode('utf-8')).hexdigest()[:16])
+        corpus = Corpus(index_dir, chunker=args.chunker, extractor=args.extractor)
+
+        print(f"Indexing PDFs in: {directory}")
+        added, removed = corpus.sync(directory, args.workers)
+        print(f"Corpus ready: {len(corpus.documents)} documents, {len(corpus)} chunks "
+              f"({added} indexed, {removed} removed)")
+
+        reader = CorpusReader(corpus, model_name=args.model)
+        if args.question:
+            print(f"\nQuestion: {args.question}")
+            _print_answer(reader, args.question, args)
+        else:
+            print("\nEnter your questions about the documents (type 'exit' to quit):")
+            while True:
+                question = input("\nQuestion: ").strip()
+                if question.lower() in ['exit', 'quit']:
+                    break
+                if not question:
+                    continue
+                _print_answer(reader, question, args)
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from extraction_cache import atomic_write
+
+DEFAULT_EMBEDDING_MODEL = "nomic-embed-text"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so a dot product is a cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+def embed_texts(client, model: str, texts: Sequence[str], batch_size: int = 64) -> np.ndarray:
+    """
+    Embed texts through the Ollama embeddings endpoint, batch_size texts per request.
+
+    Args:
+        client: ollama.Client used for the requests
+        model: Ollama embedding model
+        texts: Texts to embed
+        batch_size: Number of texts sent per request
+
+    Returns:
+        Normalized float32 matrix with one row per text
+    """
+    rows = []
+    for start in range(0, len(texts), batch_size):
+        response = client.embed(model=model, input=list(texts[start:start + batch_size]))
+        rows.extend(response['embeddings'])
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    return _normalize(np.asarray(rows, dtype=np.float32))
+
+
+class EmbeddingIndex:
+    def __init__(self, matrix: np.ndarray):
+        """
+        Semantic search over chunk embeddings.
+
+        Args:
+            matrix: Normalized float32 matrix, row i is the embedding of chunk i
+        """
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @classmethod
+    def build(cls, client, model: str, chunks: Sequence[str], batch_size: int = 64) -> "EmbeddingIndex":
+        """Embed every chunk once and index the result."""
+        return cls(embed_texts(client, model, chunks, batch_size))
+
+    @classmethod
+    def update(cls, client, model: str, chunks: Sequence[str], previous: "EmbeddingIndex",
+               previous_chunks: Sequence[str], batch_size: int = 64) -> "EmbeddingIndex":
+        """
+        Index the chunks of a new version of a document, embedding only the
+        chunks whose text is not in the previous version.
+
+        Args:
+            client: ollama.Client used for the requests
+            model: Ollama embedding model, the one that built previous
+            chunks: Chunks of the new version
+            previous: Index of the previous version
+            previous_chunks: Chunks of the previous version, row i of previous is chunk i
+            batch_size: Number of texts sent per request
+        """
+        if not len(previous):
+            return cls.build(client, model, chunks, batch_size)
+
+        rows = {text: i for i, text in enumerate(previous_chunks)}
+        matrix = np.empty((len(chunks), previous.matrix.shape[1]), dtype=np.float32)
+        missing = []
+        for i, text in enumerate(chunks):
+            if text in rows:
+                matrix[i] = previous.matrix[rows[text]]
+            else:
+                missing.append(i)
+        if missing:
+            matrix[missing] = embed_texts(client, model, [chunks[i] for i in missing], batch_size)
+        return cls(matrix)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["EmbeddingIndex"]:
+        """Memory-map a matrix previously written by save(), or return None if missing."""
+        try:
+            return cls(np.load(path, mmap_mode='r'))
+        except (OSError, ValueError):
+            return None
+
+    def save(self, path: str) -> None:
+        """Write the matrix with np.save, atomically replacing any existing file."""
+        with atomic_write(path) as f:
+            np.save(f, np.ascontiguousarray(self.matrix, dtype=np.float32))
+
+    def search(self, query_vector: np.ndarray, k: int = 3) -> List[Tuple[int, float]]:
+        """
+        Find the chunks most similar to a query embedding.
+
+        Args:
+            query_vector: Normalized query embedding
+            k: Maximum number of results
+
+        Returns:
+            Up to k (chunk_id, cosine similarity) pairs, best first
+        """
+        if not len(self) or k <= 0:
+            return []
+
+        scores = self.matrix @ query_vector
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
@@ -0,0 +1,98 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List
+import tkinter as tk
+
+log = logging.getLogger(__name__)
+
+# Virtual Tk event telling the main loop that events are waiting
+WAKE_EVENT = "<<EventBus>>"
+
+# Events are handled at most once per frame (60 per second)
+FRAME_SECONDS = 1 / 60
+
+
+def coalesce(events: Iterable) -> List:
+    """
+    Merge runs of consecutive events of the same type.
+
+    Event types that can be merged define merge(later), returning one event
+    standing for both (e.g. the concatenation of two streamed tokens, or
+    the later of two progress reports). Other events are kept as they are.
+    """
+    merged = []
+    for event in events:
+        if merged and type(merged[-1]) is type(event) and hasattr(event, "merge"):
+            merged[-1] = merged[-1].merge(event)
+        else:
+            merged.append(event)
+    return merged
+
+
+class EventBus:
+    def __init__(self, root: tk.Misc, frame_seconds: float = FRAME_SECONDS):
+        """
+        Deliver events from background threads to handlers on the Tk main loop.
+
+        Posting an event wakes the main loop with a virtual event; nothing
+        runs while no events are posted. Events posted within one frame are
+        handled together, after merging runs of mergeable events, so a fast
+        stream of tokens or progress reports leads to one redraw per frame.
+
+        Args:
+            root: Tk widget whose main loop runs the handlers
+            frame_seconds: Minimum time between two rounds of handling
+        """
+        self.root = root
+        self.frame_seconds = frame_seconds
+        self.handlers: Dict[type, Callable] = {}
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._wake_pending = False
+        self._last_drain = 0.0
+        root.bind(WAKE_EVENT, self._on_wake)
+
+    def subscribe(self, event_type: type, handler: Callable) -> None:
+        """Call handler(event) on the main loop for every event of the given type."""
+        self.handlers[event_type] = handler
+
+    def post(self, event) -> None:
+        """Queue an event for its handler. Safe to call from any thread."""
+        with self._lock:
+            self._events.append(event)
+            if self._wake_pending:
+                return
+            self._wake_pending = True
+        try:
+            self.root.event_generate(WAKE_EVENT, when="tail")
+        except (RuntimeError, tk.TclError):
+            # The window is gone or its main loop is not running: let a later post try again,
+            # which also delivers the events queued meanwhile
+            with self._lock:
+                self._wake_pending = False
+
+    def _on_wake(self, _event=None) -> None:
+        delay = self._last_drain + self.frame_seconds - time.perf_counter()
+        if delay > 0:
+            # Events posted until the next frame are handled in the same round
+            self.root.after(int(delay * 1000) + 1, self._drain)
+        else:
+            self._drain()
+
+    def _drain(self) -> None:
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+            self._wake_pending = False
+        self._last_drain = time.perf_counter()
+
+        for event in coalesce(events):
+            handler = self.handlers.get(type(event))
+            if handler is None:
+                continue
+            try:
+                handler(event)
+            except Exception:
+                log.exception("Error handling %s", type(event).__name__)
@@ -0,0 +1,276 @@
+import os
+import json
+import zlib
+import struct
+import hashlib
+import tempfile
+from array import array
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+# File layout: header, page lengths (uint32), chunk spans (uint32 start/end
+# pairs), then the zlib-compressed UTF-8 text of all pages back to back.
+_MAGIC = b"PDFC"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sBIII")
+_SUFFIX = ".pdfc"
+_ARRAY_SUFFIX = ".npy"
+_PAGE_INDEX_SUFFIX = ".pages"
+_TABLES_SUFFIX = ".tables.npz"
+_EXTRACTOR_SUFFIX = ".extractor"
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdf_reader_ai")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CachedExtraction:
+    """Per-page text and chunk boundaries restored from the cache."""
+
+    def __init__(self, pages: List[str], chunk_spans: List[Tuple[int, int]]):
+        self.pages = pages
+        self.chunk_spans = chunk_spans
+
+    def chunks(self) -> List[str]:
+        """Rebuild the text chunks from the page text and chunk boundaries."""
+        document = "".join(text + "\n\n" for text in self.pages if text)
+        return [document[start:end] for start, end in self.chunk_spans]
+
+
+def encode_extraction(pages: List[str], chunk_spans: List[Tuple[int, int]]) -> bytes:
+    """Serialize page texts and chunk spans in the cache file format."""
+    page_lengths = array('I', (len(text) for text in pages))
+    spans = array('I')
+    for start, end in chunk_spans:
+        spans.append(start)
+        spans.append(end)
+    body = zlib.compress("".join(pages).encode('utf-8'), 6)
+    header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, len(pages), len(chunk_spans), len(body))
+    return header + page_lengths.tobytes() + spans.tobytes() + body
+
+
+def decode_extraction(data: bytes) -> CachedExtraction:
+    """Parse data written by encode_extraction()."""
+    magic, version, num_pages, num_chunks, body_len = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _FORMAT_VERSION:
+        raise ValueError("Unsupported cache entry")
+
+    offset = _HEADER.size
+    page_lengths = array('I')
+    page_lengths.frombytes(data[offset:offset + num_pages * page_lengths.itemsize])
+    offset += num_pages * page_lengths.itemsize
+
+    spans = array('I')
+    spans.frombytes(data[offset:offset + 2 * num_chunks * spans.itemsize])
+    offset += 2 * num_chunks * spans.itemsize
+
+    text = zlib.decompress(data[offset:offset + body_len]).decode('utf-8')
+    pages = []
+    pos = 0
+    for length in page_lengths:
+        pages.append(text[pos:pos + length])
+        pos += length
+
+    chunk_spans = [(spans[i], spans[i + 1]) for i in range(0, len(spans), 2)]
+    return CachedExtraction(pages, chunk_spans)
+
+
+@contextmanager
+def atomic_write(path: str) -> Iterator[BinaryIO]:
+    """
+    Open a temporary file that replaces path once the block completes, so
+    readers never see a partial file. The temporary file is removed on error.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ExtractionCache:
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Content-addressed on-disk cache of extracted PDF text.
+
+        Args:
+            cache_dir: Directory for cache files (default: $PDF_READER_CACHE_DIR
+                or ~/.cache/pdf_reader_ai)
+            max_bytes: Total size above which least recently used entries are evicted
+        """
+        self.cache_dir = cache_dir or os.getenv("PDF_READER_CACHE_DIR") or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # (path, size, mtime) -> file hash, so re-opening the same unchanged
+        # file in this process does not hash it again
+        self._hash_memo: Dict[Tuple[str, int, int], str] = {}
+
+    def document_hash(self, pdf_path: str) -> str:
+        """Return the SHA-256 of a PDF, memoized on its path, size and mtime."""
+        stat = os.stat(pdf_path)
+        memo_key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._hash_memo:
+            self._hash_memo[memo_key] = file_sha256(pdf_path)
+        return self._hash_memo[memo_key]
+
+    @staticmethod
+    def make_key(document_hash: str, extractor: str, chunking: str) -> str:
+        """Build the cache key for one document / extractor / chunking combination."""
+        return hashlib.sha256(f"{document_hash}:{extractor}:{chunking}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + _SUFFIX)
+
+    def _page_index_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + _PAGE_INDEX_SUFFIX)
+
+    def array_path(self, key: str) -> str:
+        """Path of a NumPy array stored alongside the extractions (e.g. chunk embeddings)."""
+        return os.path.join(self.cache_dir, key + _ARRAY_SUFFIX)
+
+    def tables_path(self, key: str) -> str:
+        """Path of the tables extracted from a document (see tables.TableIndex)."""
+        return os.path.join(self.cache_dir, key + _TABLES_SUFFIX)
+
+    @staticmethod
+    def touch(path: str) -> None:
+        """Mark a cache file as recently used for LRU eviction."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def load(self, key: str) -> Optional[CachedExtraction]:
+        """
+        Load a cached extraction.
+
+        Args:
+            key: Key returned by make_key()
+
+        Returns:
+            The cached extraction, or None on a miss or unreadable entry
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            entry = decode_extraction(data)
+        except (OSError, ValueError, struct.error, zlib.error, UnicodeDecodeError):
+            return None
+
+        self.touch(path)
+        return entry
+
+    def store(self, key: str, pages: List[str], chunk_spans: List[Tuple[int, int]]) -> None:
+        """
+        Store an extraction and evict old entries if the cache is over its size limit.
+
+        Args:
+            key: Key returned by make_key()
+            pages: Text of every page, in order
+            chunk_spans: (start, end) character offsets of every chunk
+        """
+        data = encode_extraction(pages, chunk_spans)
+
+        with atomic_write(self._path(key)) as f:
+            f.write(data)
+
+        self.evict(keep=key)
+
+    def load_page_index(self, key: str) -> Optional[Dict]:
+        """
+        Load the page fingerprints recorded for the last version of a document.
+
+        Returns:
+            {"document_hash": ..., "fingerprints": [...]}, or None if missing
+        """
+        path = self._page_index_path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        except (OSError, ValueError, zlib.error):
+            return None
+
+        self.touch(path)
+        return entry
+
+    def store_page_index(self, key: str, document_hash: str, fingerprints: List[str]) -> None:
+        """
+        Record the page fingerprints of the version of a document just extracted.
+
+        Args:
+            key: Key identifying the document independently of its content,
+                e.g. built from its path
+            document_hash: Hash of this version, i.e. of its extraction entry
+            fingerprints: Content hash of every page
+        """
+        data = zlib.compress(json.dumps({"document_hash": document_hash,
+                                         "fingerprints": fingerprints}).encode('utf-8'))
+        with atomic_write(self._page_index_path(key)) as f:
+            f.write(data)
+
+    def _extractor_path(self, document_hash: str) -> str:
+        key = hashlib.sha256(f"{document_hash}:extractor".encode()).hexdigest()
+        return os.path.join(self.cache_dir, key + _EXTRACTOR_SUFFIX)
+
+    def load_extractor_choice(self, document_hash: str) -> Optional[str]:
+        """Return the backend selected earlier for a document, or None."""
+        path = self._extractor_path(document_hash)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                name = f.read().strip()
+        except OSError:
+            return None
+
+        self.touch(path)
+        return name or None
+
+    def store_extractor_choice(self, document_hash: str, name: str) -> None:
+        """Remember the backend selected for a document, so it is not probed again."""
+        path = self._extractor_path(document_hash)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(name)
+        except OSError:
+            pass
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith((_SUFFIX, _ARRAY_SUFFIX, _PAGE_INDEX_SUFFIX, _TABLES_SUFFIX, _EXTRACTOR_SUFFIX)):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        keep_paths = (self._path(keep), self.array_path(keep), self.tables_path(keep)) if keep else ()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path in keep_paths:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,211 @@
+import re
+import math
+import time
+import logging
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+# Control characters some engines emit (e.g. soft hyphen markers), line breaks and tabs excepted
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _clean(text: Optional[str]) -> str:
+    """Give every backend's page text the same line break and character conventions."""
+    if not text:
+        return ""
+    return _CONTROL_RE.sub("", text.replace("\r\n", "\n").replace("\r", "\n"))
+
+
+def split_page_ranges(page_numbers: Sequence[int], workers: int) -> List[Tuple[int, int]]:
+    """Split sorted page indexes into contiguous ranges, a few per worker for load balancing."""
+    pages_per_task = max(1, math.ceil(len(page_numbers) / (workers * 4)))
+    ranges = []
+    for page_number in page_numbers:
+        if ranges and ranges[-1][1] == page_number and ranges[-1][1] - ranges[-1][0] < pages_per_task:
+            ranges[-1] = (ranges[-1][0], page_number + 1)
+        else:
+            ranges.append((page_number, page_number + 1))
+    return ranges
+
+
+class Extractor(ABC):
+    """
+    Text extraction engine. Every backend returns one string per page, with
+    the page's line breaks, so the chunkers see the same kind of input.
+    """
+    name = ""
+    module = ""  # Module the backend needs, imported only when it is used
+
+    @classmethod
+    def available(cls) -> bool:
+        return importlib.util.find_spec(cls.module) is not None
+
+    @abstractmethod
+    def page_count(self, pdf_path: str) -> int:
+        """Return the number of pages of a PDF."""
+
+    @abstractmethod
+    def iter_pages(self, pdf_path: str, page_numbers: Optional[Sequence[int]] = None) -> Iterator[str]:
+        """
+        Yield the text of pages of a PDF, opening the document once.
+
+        Args:
+            pdf_path: Path to the PDF file
+            page_numbers: 0-based indexes of the pages to extract, in order (default: all)
+        """
+
+
+class PdfplumberExtractor(Extractor):
+    """pdfminer layout analysis: slowest, but keeps the reading order of complex layouts best."""
+    name = "pdfplumber"
+    module = "pdfplumber"
+
+    def page_count(self, pdf_path: str) -> int:
+        import pdfplumber
+        with pdfplumber.open(pdf_path) as pdf:
+            return len(pdf.pages)
+
+    def iter_pages(self, pdf_path: str, page_numbers: Optional[Sequence[int]] = None) -> Iterator[str]:
+        import pdfplumber
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_number in range(len(pdf.pages)) if page_numbers is None else page_numbers:
+                page = pdf.pages[page_number]
+                try:
+                    yield _clean(page.extract_text())
+                finally:
+                    # Drop pdfplumber's cached layout objects for the page
+                    page.close()
+
+
+class PypdfExtractor(Extractor):
+    """Pure Python, no layout analysis."""
+    name = "pypdf"
+    module = "pypdf"
+
+    def page_count(self, pdf_path: str) -> int:
+        from pypdf import PdfReader
+        return len(PdfReader(pdf_path).pages)
+
+    def iter_pages(self, pdf_path: str, page_numbers: Optional[Sequence[int]] = None) -> Iterator[str]:
+        from pypdf import PdfReader
+        reader = PdfReader(pdf_path)
+        for page_number in range(len(reader.pages)) if page_numbers is None else page_numbers:
+            yield _clean(reader.pages[page_number].extract_text())
+
+
+class PdfiumExtractor(Extractor):
+    """PDFium, the engine of Chrome, through pypdfium2."""
+    name = "pdfium"
+    module = "pypdfium2"
+
+    def page_count(self, pdf_path: str) -> int:
+        import pypdfium2
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def iter_pages(self, pdf_path: str, page_numbers: Optional[Sequence[int]] = None) -> Iterator[str]:
+        import pypdfium2
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            for page_number in range(len(pdf)) if page_numbers is None else page_numbers:
+                page = pdf[page_number]
+                text_page = page.get_textpage()
+                try:
+                    yield _clean(text_page.get_text_bounded())
+                finally:
+                    text_page.close()
+                    page.close()
+        finally:
+            pdf.close()
+
+
+class PyMuPDFExtractor(Extractor):
+    """MuPDF through PyMuPDF."""
+    name = "pymupdf"
+    module = "fitz"
+
+    def page_count(self, pdf_path: str) -> int:
+        import fitz
+        with fitz.open(pdf_path) as pdf:
+            return pdf.page_count
+
+    def iter_pages(self, pdf_path: str, page_numbers: Optional[Sequence[int]] = None) -> Iterator[str]:
+        import fitz
+        with fitz.open(pdf_path) as pdf:
+            for page_number in range(pdf.page_count) if page_numbers is None else page_numbers:
+                yield _clean(pdf[page_number].get_text())
+
+
+# Usually fastest first; auto-selection measures them on the document itself
+EXTRACTORS: Dict[str, type] = {extractor.name: extractor for extractor in (
+    PyMuPDFExtractor, PdfiumExtractor, PypdfExtractor, PdfplumberExtractor)}
+
+DEFAULT_EXTRACTOR = "pdfplumber"
+
+# A backend must find at least this share of the words the best backend
+# finds on the probe pages to be selected
+_PROBE_MIN_WORD_SHARE = 0.9
+
+
+def available_extractors() -> List[str]:
+    """Names of the backends whose library is installed, fastest first."""
+    return [name for name, extractor in EXTRACTORS.items() if extractor.available()]
+
+
+def make_extractor(name: str) -> Extractor:
+    """
+    Create an extraction backend by name.
+
+    Raises:
+        ValueError: If the name is unknown or its library is not installed
+    """
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor: {name}")
+    if not EXTRACTORS[name].available():
+        raise ValueError(f"Extractor {name} needs the {EXTRACTORS[name].module} package")
+    return EXTRACTORS[name]()
+
+
+def select_extractor(pdf_path: str, probe_pages: int = 3) -> str:
+    """
+    Pick the fastest installed backend that extracts a document well.
+
+    Every backend extracts the first few pages. Of those finding nearly as
+    many words as the best one, the one that extracted them fastest is
+    selected. Backends that fail on the document are skipped. Opening the
+    document is not timed, so the import of a backend's library on first
+    use does not count against it.
+
+    Args:
+        pdf_path: Path to the PDF file
+        probe_pages: Number of pages extracted by each backend
+
+    Returns:
+        Name of the selected backend
+    """
+    # Name -> (words, seconds) on the probe pages
+    results = {}
+    for name in available_extractors():
+        extractor = EXTRACTORS[name]()
+        try:
+            page_numbers = range(min(probe_pages, extractor.page_count(pdf_path)))
+            started = time.perf_counter()
+            words = sum(len(text.split()) for text in extractor.iter_pages(pdf_path, page_numbers))
+            seconds = time.perf_counter() - started
+        except Exception as e:
+            log.debug("Extractor %s failed on the probe pages (%s)", name, e)
+            continue
+        results[name] = (words, seconds)
+        log.debug("Extractor %s: %d words in %.3fs", name, words, seconds)
+
+    if not results:
+        return DEFAULT_EXTRACTOR
+    best = max(words for words, _ in results.values())
+    good = [name for name, (words, _) in results.items() if words >= best * _PROBE_MIN_WORD_SHARE]
+    return min(good, key=lambda name: results[name][1])
@@ -0,0 +1,219 @@
+import json
+import time
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+
+DEFAULT_TOKENS_PER_SECOND = 50.0
+DEFAULT_FIRST_TOKEN_SECONDS = 0.05
+DEFAULT_ANSWER_TOKENS = 20
+DEFAULT_CONTEXT_LENGTH = 4096
+EMBEDDING_DIMENSIONS = 64
+
+_ANSWER_WORDS = "The rated operating temperature of the module is given in the specification table".split()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle's algorithm the body waits for a delayed ACK
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        if self.path == "/api/version":
+            self._json({"version": "0.0.0-fake"})
+        else:
+            self._json({"models": [{"name": name, "model": name} for name in sorted(self.server.models)]})
+
+    def do_POST(self) -> None:
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self._json({"error": "invalid JSON"}, 400)
+            return
+        self.server.models.add(body.get("model", ""))
+        try:
+            if self.path == "/api/chat":
+                self._generate(body, lambda text: {"message": {"role": "assistant", "content": text}})
+            elif self.path == "/api/generate":
+                self._generate(body, lambda text: {"response": text})
+            elif self.path == "/api/embed":
+                inputs = body.get("input", [])
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                self._json({"model": body.get("model"), "embeddings": [_embedding(text) for text in inputs]})
+            elif self.path == "/api/embeddings":
+                self._json({"embedding": _embedding(body.get("prompt", ""))})
+            elif self.path == "/api/show":
+                self._json({"modelfile": "", "parameters": "", "template": "",
+                            "model_info": {"general.architecture": "llama",
+                                           "llama.context_length": self.server.context_length}})
+            else:
+                self._json({"error": f"unknown endpoint {self.path}"}, 404)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client abandoned a streamed answer
+            self.close_connection = True
+
+    def _json(self, result: Dict, status: int = 200) -> None:
+        data = json.dumps(result).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _generate(self, body: Dict, payload) -> None:
+        """Answer a chat or generate request at the server's token rate."""
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if body.get("prompt") == "" and not body.get("messages"):
+            # Loading the model only
+            self._json({"model": body.get("model"), "response": "", "done": True})
+            return
+
+        prompt = body.get("prompt") or " ".join(message.get("content", "") for message in body.get("messages", []))
+        final = {"done": True, "done_reason": "stop", "eval_count": server.answer_tokens,
+                 "prompt_eval_count": len(prompt.split()),
+                 "eval_duration": int(server.answer_tokens / server.tokens_per_second * 1e9)}
+        if not body.get("stream", True):
+            time.sleep(server.first_token_seconds + (server.answer_tokens - 1) / server.tokens_per_second)
+            self._json({"model": body.get("model"), **payload(" ".join(server.tokens())), **final})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(server.first_token_seconds)
+        for i, token in enumerate(server.tokens()):
+            if i:
+                time.sleep(1 / server.tokens_per_second)
+            self._chunk({"model": body.get("model"), **payload(token if i == 0 else " " + token), "done": False})
+        self._chunk({"model": body.get("model"), **payload(""), **final})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, part: Dict) -> None:
+        line = json.dumps(part).encode('utf-8') + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+def _embedding(text: str):
+    """Deterministic unit vector built from the words of a text."""
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    for word in text.lower().split():
+        vector[zlib.crc32(word.encode('utf-8')) % EMBEDDING_DIMENSIONS] += 1.0
+    norm = sum(value * value for value in vector) ** 0.5 or 1.0
+    return [value / norm for value in vector]
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, tokens_per_second: float, first_token_seconds: float,
+                 answer_tokens: int, context_length: int):
+        super().__init__(address, _Handler)
+        self.tokens_per_second = tokens_per_second
+        self.first_token_seconds = first_token_seconds
+        self.answer_tokens = answer_tokens
+        self.context_length = context_length
+        self.models = set()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def tokens(self) -> Iterator[str]:
+        for i in range(self.answer_tokens):
+            yield _ANSWER_WORDS[i % len(_ANSWER_WORDS)]
+
+
+class FakeOllama:
+    def __init__(self, tokens_per_second: float = DEFAULT_TOKENS_PER_SECOND,
+                 first_token_seconds: float = DEFAULT_FIRST_TOKEN_SECONDS,
+                 answer_tokens: int = DEFAULT_ANSWER_TOKENS,
+                 context_length: int = DEFAULT_CONTEXT_LENGTH,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        Local stand-in for the Ollama HTTP API, for benchmarks without a model.
+
+        Chat and generate requests are answered with a fixed text, streamed
+        or not, at a set token rate after a set delay to the first token, so
+        measured latencies are the reader's own plus a known model time.
+        Embeddings are word hashes, and /api/show reports a context length.
+
+        Args:
+            tokens_per_second: Rate at which answer tokens are sent
+            first_token_seconds: Delay before the first token, like prompt processing
+            answer_tokens: Tokens of every answer
+            context_length: Context window reported for every model
+            host: Interface to listen on
+            port: TCP port; 0 picks a free one (see self.url)
+        """
+        self._server = _Server((host, port), max(tokens_per_second, 1e-3), max(first_token_seconds, 0.0),
+                               max(answer_tokens, 1), context_length)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        """Number of chat and generate requests received."""
+        return self._server.requests
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama API with a fixed token rate")
+    parser.add_argument("-p", "--port", type=int, default=11434, help="Port to listen on (default: 11434)")
+    parser.add_argument("-t", "--tokens-per-second", type=float, default=DEFAULT_TOKENS_PER_SECOND,
+                       help=f"Answer token rate (default: {DEFAULT_TOKENS_PER_SECOND:g})")
+    parser.add_argument("--first-token-ms", type=float, default=DEFAULT_FIRST_TOKEN_SECONDS * 1000,
+                       help=f"Delay to the first token (default: {DEFAULT_FIRST_TOKEN_SECONDS * 1000:g})")
+    parser.add_argument("--answer-tokens", type=int, default=DEFAULT_ANSWER_TOKENS,
+                       help=f"Tokens of every answer (default: {DEFAULT_ANSWER_TOKENS})")
+
+    args = parser.parse_args()
+    server = FakeOllama(args.tokens_per_second, args.first_token_ms / 1000, args.answer_tokens, port=args.port)
+    print(f"Fake Ollama on {server.url} ({args.tokens_per_second:g} tokens/s)")
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, font as tkfont
-import threading
 import os
-import queue
 import webbrowser
+from bisect import bisect_right
 from datetime import datetime
+from typing import NamedTuple
 from PIL import Image, ImageTk
-from pdf_reader import PDFReaderAI
+from concurrent.futures import CancelledError
+from pdf_reader import STREAMING_STRATEGIES, PDFReaderAI
+from event_bus import EventBus
+from jobs import JobManager
+from instrumentation import setup_logging
 
 # Constants
 PRIMARY_COLOR = "#2563eb"  # Blue-600
@@ -24,6 +28,261 @@ BORDER_COLOR = "#e2e8f0"  # Slate-200
 CHAT_INPUT_BG = "#f8fafc"  # Slate-50
 SUGGESTION_BG = "#f1f5f9"  # Slate-100
 
+# Pages indexed before questions are accepted while the rest keeps loading
+FIRST_PAGES = 3
+# Pages added to the preview each time it is scrolled near its end
+PREVIEW_PAGES_PER_STEP = 2
+
+# Width at which message text wraps
+MESSAGE_WRAP = 600
+
+# Events sent by the background workers to the main loop (see EventBus)
+
+class Status(NamedTuple):
+    text: str
+    
+    def merge(self, later):
+        return later
+
+class StreamStart(NamedTuple):
+    pass
+
+class Token(NamedTuple):
+    text: str
+    
+    def merge(self, later):
+        return Token(self.text + later.text)
+
+class StreamEnd(NamedTuple):
+    pass
+
+class Response(NamedTuple):
+    text: str
+
+class Progress(NamedTuple):
+    done: int
+    total: int
+    
+    def merge(self, later):
+        return later
+
+class Ready(NamedTuple):
+    pass
+
+class Loaded(NamedTuple):
+    pages: int
+
+class LoadFailed(NamedTuple):
+    pass
+
+class Failure(NamedTuple):
+    message: str
+
+class ChatTranscript:
+    """
+    Scrollable chat transcript that only creates widgets for the messages
+    in view.
+    
+    Messages are kept as plain records with their height computed from the
+    font, so the layout is known without rendering. Scrolling moves a small
+    pool of bubble widgets to the messages coming into view, so appending a
+    message costs the same however long the conversation is.
+    """
+    
+    def __init__(self, parent, font=('Segoe UI', 10)):
+        self.canvas = tk.Canvas(parent, bg='white', highlightthickness=0, yscrollincrement=20)
+        self.scrollbar = ttk.Scrollbar(parent, orient='vertical', command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+        
+        self.font = tkfont.Font(font=font)
+        self.time_font = tkfont.Font(family='Segoe UI', size=8)
+        
+        # (sender, text, is_user, timestamp) per message, with its height and top
+        self.messages = []
+        self.heights = []
+        self.tops = []
+        self.total_height = 0
+        
+        # Bubbles showing messages (message index -> bubble) and spare bubbles
+        self.visible = {}
+        self.pool = []
+        self._render_pending = False
+        
+        self.canvas.bind('<Configure>', lambda e: self._schedule_render())
+        self.canvas.bind('<MouseWheel>', self._on_mousewheel)
+        self.canvas.bind('<Button-4>', self._on_mousewheel)
+        self.canvas.bind('<Button-5>', self._on_mousewheel)
+    
+    def __len__(self):
+        return len(self.messages)
+    
+    def _measure(self, text):
+        """Height of a bubble, wrapping the text the way a Tk label does"""
+        lines = 0
+        space = self.font.measure(' ')
+        for paragraph in text.split('\n'):
+            lines += 1
+            width = 0
+            for word in paragraph.split(' '):
+                word_width = self.font.measure(word)
+                if width and width + space + word_width > MESSAGE_WRAP:
+                    lines += 1
+                    width = word_width
+                else:
+                    width += (space if width else 0) + word_width
+                # Words longer than a line are broken across lines
+                if width > MESSAGE_WRAP:
+                    lines += width // MESSAGE_WRAP
+                    width %= MESSAGE_WRAP
+        # Label padding, timestamp line and the gaps around the bubble
+        return (lines * self.font.metrics('linespace') + 2 * 8 + 2 * 2
+                + self.time_font.metrics('linespace') + 5 + 2 * 4)
+    
+    def append(self, sender, text, is_user=False):
+        """
+        Add a message at the end of the transcript and scroll to it.
+        
+        Returns:
+            Index of the message, to update it while it streams in
+        """
+        height = self._measure(text)
+        self.messages.append((sender, text, is_user, datetime.now().strftime("%H:%M")))
+        self.heights.append(height)
+        self.tops.append(self.total_height)
+        self.total_height += height
+        self._update_scrollregion()
+        self.canvas.yview_moveto(1.0)
+        self._schedule_render()
+        return len(self.messages) - 1
+    
+    def update(self, index, text):
+        """Replace the text of a message, e.g. the answer being streamed"""
+        sender, _, is_user, timestamp = self.messages[index]
+        self.messages[index] = (sender, text, is_user, timestamp)
+        
+        height = self._measure(text)
+        delta = height - self.heights[index]
+        if delta:
+            # Only the messages below move; for the last message there are none
+            self.heights[index] = height
+            for i in range(index + 1, len(self.tops)):
+                self.tops[i] += delta
+            self.total_height += delta
+            self._update_scrollregion()
+            for i in self.visible:
+                if i > index:
+                    self._place(i)
+        
+        bubble = self.visible.get(index)
+        if bubble is not None:
+            bubble.msg_label.config(text=text)
+            self._place(index)
+        
+        if index == len(self.messages) - 1:
+            self.canvas.yview_moveto(1.0)
+            self._schedule_render()
+    
+    def clear(self):
+        """Remove every message, keeping the bubble widgets for reuse"""
+        for index in list(self.visible):
+            self._release(index)
+        self.messages.clear()
+        self.heights.clear()
+        self.tops.clear()
+        self.total_height = 0
+        self._update_scrollregion()
+    
+    def _update_scrollregion(self):
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), self.total_height))
+    
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_render()
+    
+    def _on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.canvas.yview_scroll(-3, 'units')
+        else:
+            self.canvas.yview_scroll(3, 'units')
+        return 'break'
+    
+    def _schedule_render(self):
+        # Many scroll and append events in a row lead to one render
+        if not self._render_pending:
+            self._render_pending = True
+            self.canvas.after_idle(self._render)
+    
+    def _render(self):
+        """Show the messages in the viewport and recycle the bubbles of the others"""
+        self._render_pending = False
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first = max(0, bisect_right(self.tops, top) - 1)
+        wanted = set()
+        for index in range(first, len(self.messages)):
+            if self.tops[index] > bottom:
+                break
+            wanted.add(index)
+        
+        for index in list(self.visible):
+            if index not in wanted:
+                self._release(index)
+        for index in wanted:
+            if index in self.visible:
+                # Follows changes of the canvas width
+                self._place(index)
+            else:
+                self._show(index)
+    
+    def _show(self, index):
+        bubble = self.pool.pop() if self.pool else self._create_bubble()
+        sender, text, is_user, timestamp = self.messages[index]
+        bg_color = USER_MSG_BG if is_user else AI_MSG_BG
+        anchor = 'e' if is_user else 'w'
+        padx = (150, 20) if is_user else (20, 150)
+        bubble.msg_label.config(text=text, bg=bg_color, anchor=anchor)
+        bubble.msg_label.pack_configure(padx=padx)
+        bubble.time_label.config(text=timestamp, background=bg_color)
+        bubble.time_label.pack_configure(anchor=anchor, padx=padx)
+        self.visible[index] = bubble
+        self._place(index)
+    
+    def _place(self, index):
+        bubble = self.visible[index]
+        self.canvas.coords(bubble.item, 0, self.tops[index])
+        self.canvas.itemconfigure(bubble.item, state='normal', width=self.canvas.winfo_width(),
+                                  height=self.heights[index])
+    
+    def _release(self, index):
+        bubble = self.visible.pop(index)
+        self.canvas.itemconfigure(bubble.item, state='hidden')
+        self.pool.append(bubble)
+    
+    def _create_bubble(self):
+        frame = tk.Frame(self.canvas, bg='white')
+        frame.msg_label = tk.Label(
+            frame,
+            wraplength=MESSAGE_WRAP,
+            justify='left',
+            fg=TEXT_COLOR,
+            font=self.font,
+            padx=12,
+            pady=8,
+            relief='flat',
+            bd=0
+        )
+        frame.msg_label.pack(fill='x', pady=2)
+        frame.time_label = ttk.Label(frame, font=self.time_font, foreground='#94a3b8')
+        frame.time_label.pack(side='bottom', pady=(0, 5))
+        for widget in (frame, frame.msg_label, frame.time_label):
+            widget.bind('<MouseWheel>', self._on_mousewheel)
+            widget.bind('<Button-4>', self._on_mousewheel)
+            widget.bind('<Button-5>', self._on_mousewheel)
+        frame.item = self.canvas.create_window(0, 0, window=frame, anchor='nw', state='hidden')
+        return frame
+
 class PDFReaderApp:
     def __init__(self, root):
         self.root = root
@@ -42,9 +301,17 @@ class PDFReaderApp:
         self.pdf_reader = None
         self.current_file = ""
         self.model_name = "tinyllama:1.1b"  # Using tinyllama as it requires less memory
+        self.answer_strategy = "packed"  # Streams; "concurrent"/"map_reduce" answer in one piece
+        self.max_chunks = None  # Strategy default: as many chunks as the context window holds
         
-        # Queue for thread-safe GUI updates
-        self.queue = queue.Queue()
+        # Loads and questions run as cancellable background jobs: a load runs
+        # beside the questions answered from the pages indexed so far, and
+        # loading another PDF cancels the previous load and its questions
+        self.jobs = JobManager(max_workers=2)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Pages of the loaded PDF shown in the preview (None: no pages to show yet)
+        self.preview_pages = None
         
         # Status variable
         self.status_var = tk.StringVar()
@@ -57,15 +324,24 @@ class PDFReaderApp:
         self.text_font = tkfont.Font(family="Segoe UI", size=10)
         self.chat_font = tkfont.Font(family="Segoe UI", size=11)
         
-        # Track messages for UI updates
-        self.messages = []
-        
         # Configure styles
         self.setup_styles()
         
         # Setup UI
         self.setup_ui()
-        self.check_queue()
+        
+        # Background workers update the UI through events handled on the main loop
+        self.bus = EventBus(self.root)
+        self.bus.subscribe(Status, lambda event: self.update_status(event.text))
+        self.bus.subscribe(StreamStart, lambda event: self._start_stream())
+        self.bus.subscribe(Token, lambda event: self._append_stream_token(event.text))
+        self.bus.subscribe(StreamEnd, lambda event: self._end_stream())
+        self.bus.subscribe(Response, lambda event: self._send_response(event.text))
+        self.bus.subscribe(Progress, lambda event: self._update_progress(event.done, event.total))
+        self.bus.subscribe(Ready, lambda event: self._on_first_pages_ready())
+        self.bus.subscribe(Loaded, lambda event: self._finish_pdf_loading(event.pages))
+        self.bus.subscribe(LoadFailed, lambda event: self._on_load_failed())
+        self.bus.subscribe(Failure, lambda event: self._on_failure(event.message))
         
     def setup_ui(self):
         """Set up the main user interface components"""
@@ -179,57 +455,9 @@ content and get AI-powered answers based on the document.
         
         # Chat display area (initially hidden)
         self.chat_display = tk.Frame(chat_container, bg='white')
-        
-        # Canvas and scrollbar for chat
-        self.chat_canvas = tk.Canvas(
-            self.chat_display, 
-            bg='white', 
-            highlightthickness=0
-        )
-        
-        # Create scrollbar
-        scrollbar = ttk.Scrollbar(
-            self.chat_display,
-            orient='vertical',
-            command=self.chat_canvas.yview
-        )
-        
-        # Create scrollable frame
-        self.chat_scrollable_frame = ttk.Frame(self.chat_canvas)
-        
-        # Configure scrollbar style
-        style = ttk.Style()
-        style.configure('Custom.Vertical.TScrollbar',
-                      background='#e2e8f0',
-                      troughcolor='#f1f5f9',
-                      arrowcolor=TEXT_COLOR,
-                      bordercolor='#e2e8f0',
-                      lightcolor='#e2e8f0',
-                      darkcolor='#e2e8f0')
-        
-        # Configure canvas scrolling
-        self.chat_scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.chat_canvas.configure(
-                scrollregion=self.chat_canvas.bbox("all")
-            )
-        )
-        
-        # Add scrollable frame to canvas
-        self.chat_canvas.create_window((0, 0), 
-                                     window=self.chat_scrollable_frame, 
-                                     anchor='nw', 
-                                     width=self.root.winfo_width() - 350)  # Adjust for sidebar
-        
-        self.chat_canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Pack the canvas and scrollbar
-        self.chat_canvas.pack(side='left', fill='both', expand=True)
-        scrollbar.pack(side='right', fill='y')
-        
-        # Configure grid weights
-        self.chat_display.columnconfigure(0, weight=1)
-        self.chat_scrollable_frame.columnconfigure(0, weight=1)
+        self.transcript = ChatTranscript(self.chat_display)
+        self.chat_canvas = self.transcript.canvas
+        self.messages = self.transcript.messages
         
         # Input area with card-like appearance
         input_container = tk.Frame(main_frame, bg='#f1f5f9', pady=8, padx=8)
@@ -284,34 +512,8 @@ content and get AI-powered answers based on the document.
         self.send_button.pack(side='right')
         self.send_button.config(state=tk.DISABLED)
         
-        # Create chat display area
-        chat_display = tk.Frame(chat_container, bg='white')
-        
-        # Create canvas and scrollbar for chat
-        chat_canvas = tk.Canvas(chat_display, bg='white', highlightthickness=0)
-        scrollbar = ttk.Scrollbar(chat_display, orient='vertical', command=chat_canvas.yview)
-        self.chat_scrollable_frame = ttk.Frame(chat_canvas)
-        
-        # Configure canvas scrolling
-        self.chat_scrollable_frame.bind(
-            "<Configure>",
-            lambda e: chat_canvas.configure(
-                scrollregion=chat_canvas.bbox("all")
-            )
-        )
-        
-        # Create window in canvas for the scrollable frame
-        chat_canvas.create_window((0, 0), window=self.chat_scrollable_frame, anchor="nw")
-        chat_canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Pack the scrollbar and canvas
-        scrollbar.pack(side='right', fill='y')
-        chat_canvas.pack(side='left', fill='both', expand=True)
-        
         # Store references
         self.main_frame = main_frame
-        self.chat_display = chat_display
-        self.chat_canvas = chat_canvas
         
         # Configure grid weights
         self.root.grid_rowconfigure(1, weight=1)
@@ -419,14 +621,21 @@ content and get AI-powered answers based on the document.
         # Initially hide the status bar - it will be shown when needed
         self.status_bar.grid_remove()
     
+    def on_close(self):
+        """Stop the background jobs and close the window"""
+        self.jobs.shutdown()
+        self.root.destroy()
+    
     def new_chat(self):
         """Start a new chat session"""
-        # Clear chat messages
-        for widget in self.chat_scrollable_frame.winfo_children():
-            widget.destroy()
+        # Stop loading and answering for the previous session
+        self.jobs.cancel()
+        self._stream_index = None
+        if hasattr(self, 'progress_frame'):
+            self.progress_frame.pack_forget()
         
-        # Reset chat state
-        self.messages = []
+        # Clear chat messages; the transcript keeps its widgets for reuse
+        self.transcript.clear()
         
         # Show welcome message again
         if hasattr(self, 'welcome_frame'):
@@ -441,10 +650,7 @@ content and get AI-powered answers based on the document.
         
         # Clear PDF preview if any
         if hasattr(self, 'preview_text'):
-            self.preview_text.config(state='normal')
-            self.preview_text.delete('1.0', tk.END)
-            self.preview_text.insert('1.0', 'Load a PDF to see the preview here...')
-            self.preview_text.config(state='disabled')
+            self._update_preview('Load a PDF to see the preview here...')
         
         # Reset file selection
         if hasattr(self, 'current_file'):
@@ -553,6 +759,20 @@ content and get AI-powered answers based on the document.
         )
         self.load_btn.pack(fill='x', pady=(12, 0))
         
+        # Indexing progress, shown while a document loads
+        self.progress_frame = tk.Frame(upload_section, bg='#f1f5f9')
+        self.progress_var = tk.StringVar()
+        tk.Label(
+            self.progress_frame,
+            textvariable=self.progress_var,
+            bg='#f1f5f9',
+            fg='#475569',
+            font=('Segoe UI', 9),
+            anchor='w'
+        ).pack(fill='x')
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode='determinate')
+        self.progress_bar.pack(fill='x', pady=(4, 0))
+        
         # Document preview section
         preview_frame = tk.Frame(sidebar, bg='white', padx=16, pady=16)
         preview_frame.pack(fill='both', expand=True, padx=1, pady=(0, 1))
@@ -579,34 +799,31 @@ content and get AI-powered answers based on the document.
             padx=8,
             pady=8,
             bd=0,
-            highlightthickness=0
+            highlightthickness=0,
+            yscrollcommand=self._on_preview_scroll
         )
         self.preview_text.pack(fill='both', expand=True)
         self.preview_text.insert('1.0', 'Load a PDF to see the preview here...')
         self.preview_text.config(state='disabled')
         
-    def check_queue(self):
-        try:
-            while True:
-                msg_type, *args = self.queue.get_nowait()
-                if msg_type == "status":
-                    self.status_var.set(args[0])
-                    if hasattr(self, 'status_bar'):
-                        self.status_bar.grid()
-                        if hasattr(self, '_status_timer'):
-                            self.root.after_cancel(self._status_timer)
-                        self._status_timer = self.root.after(3000, self._hide_status_bar)
-                elif msg_type == "message":
-                    sender, message = args
-                    self.add_message(sender, message)
-                elif msg_type == "error":
-                    self.show_error(args[0])
-                    if hasattr(self, 'status_bar'):
-                        self.status_bar.grid_remove()
-        except queue.Empty:
-            pass
-        finally:
-            self.root.after(100, self.check_queue)
+    def _start_stream(self):
+        """Open an empty assistant message that streamed tokens are appended to"""
+        self._stream_text = ""
+        self._stream_index = self.add_message("assistant", "")
+    
+    def _end_stream(self):
+        self._stream_index = None
+        self.update_status("Ready")
+    
+    def _on_load_failed(self):
+        self.progress_frame.pack_forget()
+        if hasattr(self, 'load_btn'):
+            self.load_btn.config(state=tk.NORMAL)
+    
+    def _on_failure(self, message):
+        self.show_error(message)
+        if hasattr(self, 'status_bar'):
+            self.status_bar.grid_remove()
     
     def update_status(self, message):
         if not hasattr(self, 'status_var') or not hasattr(self, 'status_bar'):
@@ -629,87 +846,25 @@ content and get AI-powered answers based on the document.
             self.status_bar.grid_remove()
     
     def add_message(self, sender, message, is_user=False):
-        if not hasattr(self, 'messages'):
-            self.messages = []
-        self.messages.append((sender, message, is_user))
-        
-        # Make sure the chat display is visible
-        if not hasattr(self, 'chat_display'):
-            return
-            
+        """Add a message to the chat transcript and return its index"""
         # Hide welcome frame if it's visible
         if hasattr(self, 'welcome_frame') and self.welcome_frame.winfo_ismapped():
             self.welcome_frame.pack_forget()
-            self.chat_display.pack(fill='both', expand=True)
         
         # Make sure the chat display is packed
         if not self.chat_display.winfo_ismapped():
             self.chat_display.pack(fill='both', expand=True)
         
-        # Create and add message bubble
-        if hasattr(self, 'chat_scrollable_frame'):
-            bubble = self._create_message_bubble(self.chat_scrollable_frame, message, is_user)
-            if bubble:
-                bubble.pack(fill='x', pady=2, anchor='e' if is_user else 'w')
+        return self.transcript.append(sender, message, is_user)
             
-            # Update the canvas scroll region
-            self.chat_scrollable_frame.update_idletasks()
-            self.chat_canvas.configure(scrollregion=self.chat_canvas.bbox("all"))
-            
-            # Scroll to bottom
-            self.chat_canvas.yview_moveto(1.0)
-            
-    def _create_message_bubble(self, parent, message, is_user=False):
-        try:
-            frame = ttk.Frame(parent, style='Message.TFrame')
-            frame.pack(fill='x', pady=4)
-            
-            # Configure style based on sender
-            if is_user:
-                bg_color = USER_MSG_BG
-                fg_color = TEXT_COLOR
-                anchor = 'e'
-                padx = (150, 20)  # Right-aligned with less right padding
-            else:
-                bg_color = AI_MSG_BG
-                fg_color = TEXT_COLOR
-                anchor = 'w'
-                padx = (20, 150)  # Left-aligned with less left padding
-                
-            # Create message label with increased wraplength
-            msg_label = tk.Label(
-                frame,
-                text=message,
-                wraplength=600,  # Increased wraplength for wider messages
-                justify='left',
-                bg=bg_color,
-                fg=fg_color,
-                font=('Segoe UI', 10),
-                padx=12,
-                pady=8,
-                relief='flat',
-                anchor=anchor,
-                bd=0
-            )
-            # Make message bubble expand to fill available width
-            msg_label.pack(fill='x', padx=padx, pady=2)
-            
-            # Add timestamp
-            timestamp = datetime.now().strftime("%H:%M")
-            time_label = ttk.Label(
-                frame,
-                text=timestamp,
-                font=('Segoe UI', 8),
-                foreground='#94a3b8',
-                background=bg_color
-            )
-            time_label.pack(side='bottom', anchor='e' if is_user else 'w', padx=padx, pady=(0, 5))
-            
-            return frame
-            
-        except Exception as e:
-            print(f"Error creating message bubble: {e}")
-            return None
+    def _append_stream_token(self, token):
+        """Append a streamed token to the live assistant message"""
+        index = getattr(self, '_stream_index', None)
+        if index is None:
+            return
+        
+        self._stream_text += token
+        self.transcript.update(index, self._stream_text)
     
     def show_error(self, error):
         messagebox.showerror("Error", error)
@@ -742,52 +897,37 @@ content and get AI-powered answers based on the document.
             self.show_error("No file selected")
             return
             
-        def process_pdf():
+        def process_pdf(stop_event, pdf_path):
+            def post(event):
+                # A superseded load no longer updates the UI
+                if not stop_event.is_set():
+                    self.bus.post(event)
+            
             try:
-                import PyPDF2
-                from PyPDF2 import PdfReader
+                # Same engine as the CLI: extraction cache, chunking and retrieval index
+                if self.pdf_reader is None:
+                    self.pdf_reader = PDFReaderAI(model_name=self.model_name)
+                reader = self.pdf_reader
+                ready = False
                 
-                # Initialize PDF reader and extract text
-                with open(self.current_file, 'rb') as file:
-                    pdf_reader = PdfReader(file)
-                    self.pdf_text = ""
-                    preview_text = ""
-                    
-                    # Extract text from first few pages for preview
-                    num_pages = len(pdf_reader.pages)
-                    preview_pages = min(5, num_pages)  # Show first 5 pages in preview
-                    
-                    for i in range(preview_pages):
-                        page_text = pdf_reader.pages[i].extract_text()
-                        preview_text += f"--- Page {i+1} ---\n{page_text}\n\n"
-                        self.pdf_text += page_text + "\n\n"
-                    
-                    # Add page count info
-                    page_info = f"\n\n[Document contains {num_pages} pages in total]"
-                    preview_text += page_info
-                    
-                    # Update preview in the UI
-                    def update_preview():
-                        self.preview_text.config(state='normal')
-                        self.preview_text.delete('1.0', tk.END)
-                        self.preview_text.insert('1.0', preview_text)
-                        self.preview_text.config(state='disabled')
-                        
-                    self.root.after(0, update_preview)
-                    
-                    # Extract remaining pages in background
-                    if num_pages > preview_pages:
-                        for i in range(preview_pages, num_pages):
-                            self.pdf_text += pdf_reader.pages[i].extract_text() + "\n\n"
-                    
-                    # Update UI on the main thread
-                    self.root.after(0, self._finish_pdf_loading)
+                def progress(done, total):
+                    nonlocal ready
+                    post(Progress(done, total))
+                    # Questions can be asked once the first pages are indexed
+                    if not ready and reader.text_chunks and done >= min(total, FIRST_PAGES):
+                        ready = True
+                        post(Ready())
+                
+                reader.extract_text_from_pdf(pdf_path, progress=progress, stop_event=stop_event)
+                if not ready:
+                    post(Ready())
+                post(Loaded(len(reader.page_texts)))
                     
+            except CancelledError:
+                pass
             except Exception as e:
-                error_msg = f"Error processing PDF: {str(e)}"
-                self.root.after(0, lambda: self.show_error(error_msg))
-                if hasattr(self, 'load_btn'):
-                    self.root.after(0, lambda: self.load_btn.config(state=tk.NORMAL))
+                post(Failure(f"Error processing PDF: {str(e)}"))
+                post(LoadFailed())
         
         try:
             self.update_status("Loading and processing PDF...")
@@ -796,16 +936,65 @@ content and get AI-powered answers based on the document.
             if hasattr(self, 'load_btn'):
                 self.load_btn.config(state=tk.DISABLED)
             
-            # Process PDF in a separate thread
-            threading.Thread(target=process_pdf, daemon=True).start()
+            # Show indexing progress; the preview fills in as pages arrive
+            self._update_preview("")
+            self.progress_var.set("Opening document...")
+            self.progress_bar.config(value=0, maximum=1)
+            self.progress_frame.pack(fill='x', pady=(12, 0))
+            
+            # A new load cancels the previous one and the questions about it
+            self.jobs.submit("load", process_pdf, self.current_file, supersede=("load", "question"))
             
         except Exception as e:
             self.show_error(f"Error loading PDF: {str(e)}")
             if hasattr(self, 'load_btn'):
                 self.load_btn.config(state=tk.NORMAL)
     
-    def _finish_pdf_loading(self):
-        """Finish up after PDF is loaded"""
+    def _update_preview(self, preview_text):
+        """Replace the document preview text"""
+        self.preview_pages = None
+        self.preview_text.config(state='normal')
+        self.preview_text.delete('1.0', tk.END)
+        self.preview_text.insert('1.0', preview_text)
+        self.preview_text.config(state='disabled')
+    
+    def _on_preview_scroll(self, first, last):
+        """Add pages to the preview when it is scrolled near its end"""
+        if float(last) > 0.9 and not getattr(self, '_preview_pending', False):
+            self._preview_pending = True
+            self.root.after_idle(self._show_more_preview)
+    
+    def _show_more_preview(self):
+        """Append the next loaded pages to the preview"""
+        self._preview_pending = False
+        if self.preview_pages is None:
+            return
+        page_texts = self.pdf_reader.page_texts
+        end = min(len(page_texts), self.preview_pages + PREVIEW_PAGES_PER_STEP)
+        if end <= self.preview_pages:
+            return
+        
+        self.preview_text.config(state='normal')
+        for i in range(self.preview_pages, end):
+            self.preview_text.insert(tk.END, f"--- Page {i+1} ---\n{page_texts[i]}\n\n")
+        self.preview_text.config(state='disabled')
+        self.preview_pages = end
+    
+    def _update_progress(self, done, total):
+        """Show how many pages are indexed"""
+        self.progress_bar.config(maximum=max(total, 1), value=done)
+        self.progress_var.set(f"Indexed {done} of {total} pages")
+        
+        # The reader holds the new document's pages from its first progress report on
+        if self.preview_pages is None:
+            self.preview_pages = 0
+        
+        # Pages that arrive while the end of the preview is visible are shown right away
+        if self.preview_text.yview()[1] > 0.9:
+            self._on_preview_scroll(*self.preview_text.yview())
+    
+    def _on_first_pages_ready(self):
+        """Accept questions once the first pages are indexed"""
         try:
             file_name = os.path.basename(self.current_file)
             self.update_status(f"Ready: {file_name}")
@@ -817,81 +1006,62 @@ content and get AI-powered answers based on the document.
                 
             # Add a welcome message
             welcome_msg = f"I've loaded '{file_name}'. Ask me anything about this document!"
+            if self.progress_bar['value'] < self.progress_bar['maximum']:
+                welcome_msg += " The rest of it is still being indexed, so answers may not cover every page yet."
             self.add_message("assistant", welcome_msg)
             
         except Exception as e:
             self.show_error(f"Error finalizing PDF load: {str(e)}")
-        finally:
-            if hasattr(self, 'load_btn'):
-                self.load_btn.config(state=tk.NORMAL)
+    
+    def _finish_pdf_loading(self, num_pages):
+        """Finish up after every page of the PDF is indexed"""
+        self.progress_frame.pack_forget()
+        self.update_status(f"Ready: {os.path.basename(self.current_file)} ({num_pages} pages indexed)")
+        if hasattr(self, 'load_btn'):
+            self.load_btn.config(state=tk.NORMAL)
                 
     def process_question(self, question):
-        """Process the user's question using TinyLlama model"""
+        """Process the user's question with the PDF reader engine"""
         try:
-            if not hasattr(self, 'current_file') or not self.current_file:
+            if not self.current_file or self.pdf_reader is None or not self.pdf_reader.text_chunks:
                 self.show_error("Please load a PDF file first")
                 return
                 
             # Show typing indicator
-            self.queue.put(('status', 'Thinking...'))
+            self.bus.post(Status('Thinking...'))
             
-            # Process the question in a separate thread to keep the UI responsive
-            threading.Thread(
-                target=self._process_question_async,
-                args=(question,),
-                daemon=True
-            ).start()
+            # Answer in the background to keep the UI responsive; questions are answered in turn
+            self.jobs.submit("question", self._process_question_async, question)
             
         except Exception as e:
             self.show_error(f"Error processing question: {str(e)}")
             
-    def _process_question_async(self, question):
-        """Process the question asynchronously using TinyLlama"""
+    def _process_question_async(self, stop_event, question):
+        """Answer the question from the most relevant chunks of the loaded PDF"""
         try:
-            import requests
-            import json
-            
-            # Get PDF context (first 2000 chars to avoid context window issues)
-            pdf_context = getattr(self, 'pdf_text', 'No PDF content available.')
-            pdf_context = pdf_context[:2000]  # Limit context size
-            
-            # Prepare the prompt with context from the PDF
-            prompt = f"""Please answer the question based on the following PDF content. If the answer cannot be found, say so.
-            
-PDF Content:
-{pdf_context}
-
-Question: {question}
-
-Answer:"""
-            
-            # Call Ollama API with TinyLlama
-            response = requests.post(
-                'http://localhost:11434/api/generate',
-                json={
-                    'model': 'tinyllama:1.1b',
-                    'prompt': prompt,
-                    'stream': False
-                }
-            )
+            if self.answer_strategy not in STREAMING_STRATEGIES:
+                answer = self.pdf_reader.ask_question(question, max_chunks=self.max_chunks,
+                                                      strategy=self.answer_strategy,
+                                                      stop_event=stop_event)
+                self.bus.post(Response(answer))
+                return
             
-            if response.status_code == 200:
-                result = response.json()
-                answer = result.get('response', 'No response from model')
-                self.root.after(0, lambda: self._send_response(answer))
-            else:
-                error_msg = f"Error from Ollama API: {response.text}"
-                self.root.after(0, lambda: self.show_error(error_msg))
+            # Stream tokens into the chat as the model produces them
+            self.bus.post(StreamStart())
+            try:
+                for token in self.pdf_reader.stream_answer(question, max_chunks=self.max_chunks,
+                                                           strategy=self.answer_strategy,
+                                                           stop_event=stop_event):
+                    self.bus.post(Token(token))
+            finally:
+                self.bus.post(StreamEnd())
                 
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Failed to connect to Ollama. Make sure Ollama is running.\nError: {str(e)}"
-            self.root.after(0, lambda: self.show_error(error_msg))
-        except Exception as e:
-            error_msg = f"Error processing question: {str(e)}"
-            self.root.after(0, lambda: self.show_error(error_msg))
-            
+        except CancelledError:
+            pass
         except Exception as e:
-            self.show_error(f"Error processing question: {str(e)}")
+            # A question cancelled by a new load may fail on the replaced document
+            if not stop_event.is_set():
+                self.bus.post(Failure(f"Error processing question: {str(e)}\nMake sure Ollama is running."))
             
     def _send_response(self, response):
         """Send the AI response to the chat"""
@@ -909,6 +1079,8 @@ def main():
     except:
         pass
     
+    setup_logging(os.getenv("PDF_READER_LOG_LEVEL", "WARNING"))
+    
     root = tk.Tk()
     
     # Set window icon if available
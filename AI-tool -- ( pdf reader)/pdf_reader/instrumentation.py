@@ -0,0 +1,124 @@
+import json
+import time
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import IO, Dict, Iterator, List, Optional
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+DEFAULT_LOG_LEVEL = "WARNING"
+
+# Libraries whose debug output would drown the reader's own
+_QUIET_LOGGERS = ("httpx", "httpcore", "pdfminer", "PIL")
+
+
+def setup_logging(level: str = DEFAULT_LOG_LEVEL) -> None:
+    """Print the log records of every module on stderr, e.g. "DEBUG: Retrieved chunks: [3, 1]"."""
+    level = getattr(logging, level.upper(), logging.WARNING)
+    logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
+    for name in _QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(level, logging.WARNING))
+
+
+def add_logging_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default=DEFAULT_LOG_LEVEL,
+                        help=f"Show log messages from this level up; DEBUG traces every step "
+                             f"(default: {DEFAULT_LOG_LEVEL})")
+
+
+class Metrics:
+    def __init__(self, sink: Optional[IO[str]] = None):
+        """
+        In-process registry of timed spans.
+
+        Every span adds to the count, total and maximum of its name, so the
+        registry stays the same size however long the process runs. Spans
+        that began before the last reset() are left out, so requests still
+        finishing in the background do not count towards the next breakdown. With a
+        sink, every span is also written to it as one JSON line, e.g.
+        {"span": "model.ttft", "seconds": 0.412, "time": 1760791234.5, "model": "tinyllama:1.1b"}.
+
+        Span names used by the reader:
+            extract.page    extraction of one page (waiting for the worker processes, if any)
+            chunk           cutting the pages of a document into chunks
+            index           adding the chunks to the keyword index
+            embed           embedding the chunks ("embedding" retrieval)
+            tables          extracting the tables of a document
+            retrieve        ranking the chunks for a question
+            prompt.build    building the prompt of one model call
+            model.ttft      from sending a model request to its first token
+            model.generate  a whole model request, first to last token
+            ask             answering a question, end to end
+
+        Args:
+            sink: Text file receiving the spans as JSON lines
+        """
+        self.sink = sink
+        # Name -> [count, total seconds, max seconds], in the order names were first seen
+        self._stats: Dict[str, List[float]] = {}
+        self._reset_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, started: Optional[float] = None, **attrs) -> None:
+        """
+        Add a span that has already been timed.
+
+        Args:
+            name: Span name
+            seconds: Duration of the span
+            started: time.perf_counter() when the span began (default: seconds ago)
+            **attrs: Attributes written to the sink
+        """
+        if started is None:
+            started = time.perf_counter() - seconds
+        with self._lock:
+            stats = self._stats.get(name)
+            if started < self._reset_at:
+                pass
+            elif stats is None:
+                self._stats[name] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = max(stats[2], seconds)
+            if self.sink is not None:
+                self.sink.write(json.dumps({"span": name, "seconds": round(seconds, 6),
+                                            "time": round(time.time(), 3), **attrs}) + "\n")
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict]:
+        """
+        Time the body of a with block as a span.
+
+        The block receives the span's attributes as a dict, and may add to
+        it, e.g. the number of tokens generated.
+        """
+        started = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record(name, time.perf_counter() - started, started, **attrs)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return the count, total, mean and maximum seconds of every span name."""
+        with self._lock:
+            return {name: {"count": int(count), "total": total, "mean": total / count, "max": longest}
+                    for name, (count, total, longest) in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._reset_at = time.perf_counter()
+
+    def format_breakdown(self) -> str:
+        """Render the summary as a table, one span name per row."""
+        summary = self.summary()
+        if not summary:
+            return "No spans recorded"
+        width = max(len("span"), *(len(name) for name in summary))
+        lines = [f"{'span':<{width}} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+        for name, stats in summary.items():
+            lines.append(f"{name:<{width}} {stats['count']:>6} {stats['total'] * 1000:>10.1f} "
+                         f"{stats['mean'] * 1000:>9.1f} {stats['max'] * 1000:>9.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,131 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, Optional
+
+log = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, kind: str, fn: Callable, args: tuple):
+        """
+        A piece of background work with its own cancellation token.
+
+        Args:
+            kind: Jobs of the same kind run one after another
+            fn: Called as fn(stop_event, *args) on a worker thread
+            args: Further arguments of fn
+        """
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        # Set on cancellation; fn is expected to check it and stop early
+        self.stop_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.stop_event.is_set()
+
+    def cancel(self) -> None:
+        """Ask the job to stop; a job that has not started yet never runs."""
+        self.stop_event.set()
+
+
+class JobManager:
+    def __init__(self, max_workers: int = 2, name: str = "pdf-reader-job"):
+        """
+        Run background jobs on a bounded thread pool.
+
+        Jobs of one kind (e.g. "load" or "question") run one at a time in
+        submission order, while jobs of different kinds run side by side.
+        Every job gets a stop event: cancelling a job sets it, and the job
+        stops at its next check.
+
+        Args:
+            max_workers: Maximum number of jobs running at once
+            name: Prefix of the worker thread names
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._queues: Dict[str, Deque[Job]] = {}
+        self._running: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, kind: str, fn: Callable, *args, supersede: Iterable[str] = ()) -> Job:
+        """
+        Queue fn(stop_event, *args) to run after the earlier jobs of its kind.
+
+        Args:
+            kind: Kind of the job
+            fn: Work to run; it should return soon after stop_event is set
+            supersede: Kinds whose running and queued jobs are cancelled first,
+                e.g. a new document load supersedes the previous load
+
+        Returns:
+            The job, which can be cancelled
+        """
+        job = Job(kind, fn, args)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The job manager was shut down")
+            for superseded in supersede:
+                self._cancel_kind(superseded)
+            self._queues.setdefault(kind, deque()).append(job)
+            if kind not in self._running:
+                self._start_next(kind)
+        return job
+
+    def cancel(self, kind: Optional[str] = None) -> None:
+        """Cancel the running and queued jobs of a kind, or of every kind."""
+        with self._lock:
+            for cancelled in self._kinds() if kind is None else [kind]:
+                self._cancel_kind(cancelled)
+
+    def shutdown(self) -> None:
+        """Cancel every job and stop the worker threads without waiting for them."""
+        with self._lock:
+            self._closed = True
+            for kind in self._kinds():
+                self._cancel_kind(kind)
+        self.executor.shutdown(wait=False)
+
+    def _kinds(self) -> set:
+        return set(self._queues) | set(self._running)
+
+    def _cancel_kind(self, kind: str) -> None:
+        # Called with self._lock held
+        running = self._running.get(kind)
+        if running is not None:
+            running.cancel()
+        for job in self._queues.get(kind, ()):
+            job.cancel()
+        self._queues.pop(kind, None)
+
+    def _start_next(self, kind: str) -> None:
+        # Called with self._lock held
+        queue = self._queues.get(kind)
+        while queue:
+            job = queue.popleft()
+            if job.cancelled:
+                continue
+            self._running[kind] = job
+            job.future = self.executor.submit(self._run, job)
+            return
+        self._queues.pop(kind, None)
+
+    def _run(self, job: Job) -> None:
+        try:
+            if not job.cancelled:
+                job.fn(job.stop_event, *job.args)
+        except CancelledError:
+            pass
+        except Exception:
+            log.exception("Error in background job %s", job.kind)
+        finally:
+            with self._lock:
+                if self._running.get(job.kind) is job:
+                    del self._running[job.kind]
+                if not self._closed:
+                    self._start_next(job.kind)
@@ -0,0 +1,158 @@
+import os
+import time
+import logging
+import threading
+from typing import Iterator, Optional, Union
+import httpx
+import ollama
+
+log = logging.getLogger(__name__)
+
+# How long Ollama keeps a model loaded after a request (Ollama's own default is 5m)
+DEFAULT_KEEP_ALIVE = "30m"
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_RETRIES = 2
+
+# Ollama answers 503 while it is busy loading or at its request limit
+_RETRY_STATUS = (502, 503, 504)
+
+
+def _is_transient(error: Exception) -> bool:
+    """Tell whether a failed request is worth sending again."""
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code in _RETRY_STATUS
+    # ConnectionError is what ollama raises when the server is unreachable;
+    # a pooled connection closed by the server shows up as a protocol error
+    return isinstance(error, (ConnectionError, httpx.ConnectError, httpx.ConnectTimeout,
+                              httpx.RemoteProtocolError, httpx.ReadError))
+
+
+class OllamaTransport:
+    def __init__(self, host: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, backoff: float = 0.5,
+                 keep_alive: Union[str, float, None] = DEFAULT_KEEP_ALIVE):
+        """
+        One pooled connection to Ollama with keep-alive, timeouts and retries.
+
+        Provides the chat/embed/show/generate calls of ollama.Client, so it
+        can be used wherever a client is expected.
+
+        Args:
+            host: Ollama URL (default: $OLLAMA_HOST or http://localhost:11434)
+            timeout: Seconds to wait for a connection or for response data
+            retries: Times a request failing with a transient error is sent again
+            backoff: Seconds before the first retry, doubled for each further one
+            keep_alive: How long Ollama keeps a model loaded after each request,
+                e.g. "30m", or -1 to keep it loaded; None uses Ollama's default
+        """
+        self.host = host or os.getenv("OLLAMA_HOST")
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.keep_alive = keep_alive
+        # ollama.Client wraps an httpx.Client, which pools connections between requests
+        self.client = ollama.Client(host=self.host, timeout=timeout)
+        self._warming = {}
+        self._lock = threading.Lock()
+
+    def _call(self, method, *args, **kwargs):
+        """Send a request, retrying transient failures with exponential backoff."""
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                return method(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.retries or not _is_transient(e):
+                    raise
+                log.warning("Ollama request failed (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+                delay *= 2
+
+    def _stream(self, method, *args, **kwargs) -> Iterator:
+        """
+        Stream a response, retrying transient failures that happen before the
+        first part arrived. Later failures are raised, since the caller has
+        already used part of the response.
+        """
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            received = False
+            stream = None
+            try:
+                stream = method(*args, **kwargs)
+                for part in stream:
+                    received = True
+                    yield part
+                return
+            except Exception as e:
+                if received or attempt == self.retries or not _is_transient(e):
+                    raise
+                log.warning("Ollama request failed (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+                delay *= 2
+            finally:
+                # Abandoning the stream closes its HTTP response
+                if stream is not None and hasattr(stream, "close"):
+                    stream.close()
+
+    def _request(self, method, *args, stream: bool = False, keep_alive=True, **kwargs):
+        if keep_alive is True:
+            keep_alive = self.keep_alive
+        if keep_alive is not None:
+            kwargs["keep_alive"] = keep_alive
+        if stream:
+            return self._stream(method, *args, stream=True, **kwargs)
+        return self._call(method, *args, **kwargs)
+
+    def chat(self, *args, **kwargs):
+        return self._request(self.client.chat, *args, **kwargs)
+
+    def generate(self, *args, **kwargs):
+        return self._request(self.client.generate, *args, **kwargs)
+
+    def embed(self, *args, **kwargs):
+        return self._request(self.client.embed, *args, **kwargs)
+
+    def show(self, *args, **kwargs):
+        return self._call(self.client.show, *args, **kwargs)
+
+    def warm_up(self, model: str) -> threading.Thread:
+        """
+        Load a model into Ollama's memory in the background, so the first
+        question does not wait for it. Does nothing while a warm-up of the
+        same model is still running.
+
+        Returns:
+            The thread doing the warm-up
+        """
+        with self._lock:
+            thread = self._warming.get(model)
+            if thread is not None and thread.is_alive():
+                return thread
+
+            def run():
+                started = time.perf_counter()
+                try:
+                    # An empty prompt only loads the model
+                    self.generate(model=model, prompt="")
+                    log.debug("Model %s ready after %.2fs", model, time.perf_counter() - started)
+                except Exception as e:
+                    log.warning("Could not load model %s (%s)", model, e)
+
+            thread = threading.Thread(target=run, name=f"ollama-warm-up-{model}", daemon=True)
+            self._warming[model] = thread
+            thread.start()
+            return thread
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def default_transport() -> OllamaTransport:
+    """Return the transport shared by every reader of this process that was given none."""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = OllamaTransport()
+        return _default_transport
@@ -1,90 +1,804 @@
 import os
-import re
+import time
+import hashlib
+import sys
+import logging
 import argparse
-from typing import List, Dict, Optional
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Iterator, Optional, Sequence, Tuple
 import pdfplumber
-import ollama
+from pdfminer.pdftypes import resolve1
 from dotenv import load_dotenv
+from extraction_cache import ExtractionCache, file_sha256
+from extractors import (DEFAULT_EXTRACTOR, EXTRACTORS, available_extractors, make_extractor, select_extractor,
+                        split_page_ranges)
+from chunking import CHUNKERS, Chunk, Chunker, chunks_from_spans, make_chunker
+from retrieval import BM25Index
+from embeddings import DEFAULT_EMBEDDING_MODEL, EmbeddingIndex, embed_texts
+from answer_cache import DEFAULT_TTL, AnswerCache
+from batch import answer_file
+from ollama_transport import DEFAULT_KEEP_ALIVE, DEFAULT_RETRIES, DEFAULT_TIMEOUT, OllamaTransport, default_transport
+from server import DEFAULT_HOST, DEFAULT_MAX_DOCUMENTS, DEFAULT_PORT, serve
+from prompt_packer import DEFAULT_ANSWER_TOKENS, DEFAULT_MAX_CONTEXT, ContextLengths, PromptPacker
+from tables import TABLES_VERSION, Table, TableIndex, extract_tables
+from instrumentation import Metrics, add_logging_argument, setup_logging
+
+log = logging.getLogger(__name__)
+
+# Bump whenever page extraction or cleaning changes, so stale cache entries are ignored
+EXTRACTOR_VERSION = "2"
+
+SYSTEM_PROMPT = "You are a helpful assistant that answers questions based on the provided document."
+
+# Ways ask_question() can spread a question over the retrieved chunks
+STRATEGIES = ("sequential", "concurrent", "map_reduce", "packed")
+
+# Strategies whose answer comes from a single model call, so it can be streamed
+STREAMING_STRATEGIES = ("sequential", "packed")
+
+# Chunks considered per question when max_chunks is not given
+DEFAULT_MAX_CHUNKS = 3
+PACKED_MAX_CHUNKS = 50
+
+# Phrases the model uses when a chunk does not contain the answer
+NO_ANSWER_PHRASES = ("could not find", "couldn't find", "cannot be found", "can't find")
+
+# Answer when retrieval finds no passage sharing a word with the question
+NO_MATCH_ANSWER = "I couldn't find any passage about that in the documents."
+
+
+def _is_no_answer(answer: str) -> bool:
+    """Tell whether a model answer says the chunk did not contain the answer."""
+    answer = answer.lower()
+    return any(phrase in answer for phrase in NO_ANSWER_PHRASES)
+
+
+class _AnyEvent:
+    """Read-only view of several events, set as soon as one of them is set."""
+    
+    def __init__(self, *events: Optional[threading.Event]):
+        self.events = [event for event in events if event is not None]
+    
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self.events)
+
+
+def _check_stopped(stop_event: Optional[threading.Event]) -> None:
+    if stop_event is not None and stop_event.is_set():
+        raise CancelledError()
+
+
+def _eval_count(response) -> Optional[int]:
+    """Number of tokens Ollama generated, reported with a response or its last streamed part."""
+    try:
+        return response['eval_count']
+    except (KeyError, TypeError):
+        return None
+
+
+def extractor_id(extractor: str) -> str:
+    """Identify the text of a backend in cache keys: pages extracted by different engines differ."""
+    return f"{extractor}-{EXTRACTOR_VERSION}"
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int, extractor: str = DEFAULT_EXTRACTOR) -> List[str]:
+    """
+    Extract the text of pages [start, end) of a PDF.
+    
+    This runs inside worker processes, so every call opens its own
+    document handle instead of sharing one across processes.
+    """
+    return list(make_extractor(extractor).iter_pages(pdf_path, range(start, end)))
+
+
+def _page_fingerprint(page) -> str:
+    """
+    Hash what a page draws, without extracting its text: the content
+    streams, the form XObjects they use, the page size and rotation.
+    """
+    page_obj = page.page_obj
+    digest = hashlib.sha256(repr((page_obj.mediabox, page_obj.rotate)).encode())
+    for stream in page_obj.contents:
+        digest.update(resolve1(stream).get_data())
+    
+    resources = resolve1(page_obj.resources) or {}
+    xobjects = resolve1(resources.get("XObject")) or {}
+    for name in sorted(xobjects):
+        xobject = resolve1(xobjects[name])
+        if getattr(xobject.get("Subtype"), "name", None) == "Form":
+            digest.update(name.encode())
+            digest.update(xobject.get_data())
+    return digest.hexdigest()
+
+
+def page_fingerprints(pdf_path: str) -> List[str]:
+    """
+    Return a content hash of every page of a PDF, in page order.
+    
+    Pages whose hash did not change since a previous version of the file
+    do not need to be extracted again.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return [_page_fingerprint(page) for page in pdf.pages]
+
+
+def iter_pages(pdf_path: str, workers: int = 1, page_numbers: Optional[Sequence[int]] = None,
+               extractor: str = DEFAULT_EXTRACTOR) -> Iterator[str]:
+    """
+    Yield the text of every page of a PDF, in page order.
+    
+    Pages are yielded as soon as they are extracted, so only a bounded
+    number of pages is held in memory at any time. Line breaks are kept;
+    the chunker decides how the text is cleaned.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        workers: Number of worker processes; 1 extracts in this process
+        page_numbers: 0-based indexes of the pages to extract (default: all)
+        extractor: Extraction backend (see extractors.EXTRACTORS)
+        
+    Yields:
+        One (possibly empty) text entry per page
+    """
+    backend = make_extractor(extractor)
+    if page_numbers is not None:
+        page_numbers = sorted(page_numbers)
+    if workers <= 1:
+        yield from backend.iter_pages(pdf_path, page_numbers)
+        return
+    if page_numbers is None:
+        page_numbers = range(backend.page_count(pdf_path))
+    if len(page_numbers) <= 1:
+        yield from backend.iter_pages(pdf_path, page_numbers)
+        return
+    
+    # Each worker re-opens the file for its own page range. Only a small
+    # window of ranges is in flight, and results are consumed in submission
+    # order, so pages come back in order without buffering the document.
+    ranges = split_page_ranges(page_numbers, workers)
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+        pending = deque()
+        try:
+            for start, end in ranges:
+                pending.append(executor.submit(_extract_page_range, pdf_path, start, end, extractor))
+                if len(pending) >= max_in_flight:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # The consumer stopped early: drop the ranges not started yet
+            for future in pending:
+                future.cancel()
+
+
+def extract_pages(pdf_path: str, workers: int = 1, extractor: str = DEFAULT_EXTRACTOR) -> List[str]:
+    """
+    Extract the text of every page of a PDF, in page order.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        workers: Number of worker processes; 1 extracts in this process
+        extractor: Extraction backend (see extractors.EXTRACTORS)
+        
+    Returns:
+        List with one (possibly empty) text entry per page
+    """
+    return list(iter_pages(pdf_path, workers, extractor=extractor))
+
+
+def _validate_pdf_path(pdf_path: str) -> None:
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+        
+    if not pdf_path.lower().endswith('.pdf'):
+        raise ValueError("File must be a PDF")
+
 
 class PDFReaderAI:
-    def __init__(self, model_name: str = "tinyllama:1.1b"):  # Using tinyllama as it requires less memory
-        """Initialize the PDF Reader AI with the specified Ollama model."""
+    def __init__(self, model_name: str = "tinyllama:1.1b", workers: int = 1,  # Using tinyllama as it requires less memory
+                 use_cache: bool = True, cache_dir: Optional[str] = None,
+                 retrieval: str = "bm25", embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+                 concurrency: int = 4, reduce_inputs: int = 5, reduce_token_budget: int = 1500,
+                 use_answer_cache: bool = True, answer_ttl: float = DEFAULT_TTL,
+                 near_duplicate_threshold: Optional[float] = None, chunker: str = "sentence",
+                 chunk_size: Optional[int] = None, chunk_overlap: int = 0,
+                 context_length: Optional[int] = None, max_context: int = DEFAULT_MAX_CONTEXT,
+                 answer_tokens: int = DEFAULT_ANSWER_TOKENS, client: Optional[OllamaTransport] = None,
+                 warm_up: bool = True, extractor: str = "auto", tables: bool = False,
+                 metrics: Optional[Metrics] = None, cache: Optional[ExtractionCache] = None,
+                 answer_cache: Optional[AnswerCache] = None):
+        """
+        Initialize the PDF Reader AI with the specified Ollama model.
+        
+        Args:
+            model_name: Ollama model used to answer questions
+            workers: Number of processes used to extract PDF pages
+            use_cache: Reuse extracted text of previously seen PDFs
+            cache_dir: Directory of the extraction cache (see ExtractionCache)
+            retrieval: How chunks are ranked: "bm25" (keywords) or "embedding" (semantic)
+            embedding_model: Ollama embedding model used by "embedding" retrieval
+            concurrency: Maximum model requests in flight for the "concurrent"
+                and "map_reduce" strategies
+            reduce_inputs: Maximum partial answers merged by the "map_reduce" strategy
+            reduce_token_budget: Approximate tokens of partial answers sent to the
+                "map_reduce" merge call
+            use_answer_cache: Serve repeated questions from the persistent answer cache
+            answer_ttl: Seconds a cached answer stays valid
+            near_duplicate_threshold: If set, also serve the cached answer of a
+                question whose embedding has at least this cosine similarity
+            chunker: How the text is split: "fixed" (character windows), "sentence",
+                "paragraph" or "tokens" (whole sentences up to a token count)
+            chunk_size: Maximum chunk size in the chunker's unit (default: the
+                chunker's own default, see chunking.DEFAULT_CHUNK_SIZES)
+            chunk_overlap: How much text consecutive chunks share, in the same unit
+            context_length: Context window (tokens) the "packed" strategy fills;
+                by default it is asked from Ollama for each model
+            max_context: Upper limit on context lengths reported by Ollama
+            answer_tokens: Tokens of the context window kept free for the answer
+            client: Ollama transport to use (default: the one shared by every
+                reader of the process, see ollama_transport.default_transport)
+            warm_up: Load the model into Ollama in the background once a PDF is
+                loaded, so the first question does not wait for it
+            extractor: Text extraction backend ("pdfplumber", "pypdf", "pdfium"
+                or "pymupdf"), or "auto" to pick the fastest one that extracts
+                each PDF well (see extractors.select_extractor)
+            tables: Also extract the tables of each PDF, and answer questions
+                about one value of a table (e.g. "max operating temperature")
+                from the table without asking the model
+            metrics: Registry receiving the timing spans of loads and questions
+                (default: a new one, available as self.metrics)
+            cache: Extraction cache to use instead of opening one in cache_dir,
+                e.g. to share it between readers (ignored without use_cache)
+            answer_cache: Answer cache to use instead of opening one, e.g. so
+                readers share one database connection (ignored without use_answer_cache)
+        """
+        if retrieval not in ("bm25", "embedding"):
+            raise ValueError(f"Unknown retrieval mode: {retrieval}")
+        if extractor != "auto":
+            make_extractor(extractor)
+        
+        # Fail on bad chunking settings now rather than at the first PDF
+        self.chunker = make_chunker(chunker, chunk_size, chunk_overlap)
+        
         self.model_name = model_name
+        self.workers = max(1, workers)
+        self.retrieval = retrieval
+        self.embedding_model = embedding_model
+        self.concurrency = max(1, concurrency)
+        self.reduce_inputs = max(1, reduce_inputs)
+        self.reduce_token_budget = max(1, reduce_token_budget)
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.answer_tokens = answer_tokens
+        self.warm_up = warm_up
+        self.extractor = extractor
+        self.extractor_name = None
+        self.chunking = self.chunker.signature()
+        self.tables = tables
+        self.table_index = None
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.last_packed_chunks = []
+        self.last_chunk_timings = []
+        self.last_time_to_first_token = None
         self.text_chunks = []
+        self.chunks: List[Chunk] = []
+        self.page_texts = []
         self.current_pdf = None
+        self.document_hash = None
+        self.index = None
+        self.embedding_index = None
+        self._question_vector = None
+        self._previous_version = None
+        self._page_fingerprints = None
+        # Guards the chunks and the keyword index while a PDF is still being indexed
+        self._index_lock = threading.Lock()
         
         # Load environment variables
         load_dotenv()
         
-        # Initialize Ollama
-        self.client = ollama.Client()
+        # On-disk cache of extracted text, keyed by the PDF's content hash
+        self.cache = None
+        if use_cache:
+            self.cache = cache if cache is not None else ExtractionCache(cache_dir)
+        
+        # Persistent cache of answers to questions already asked
+        self.answer_cache = None
+        if use_answer_cache:
+            self.answer_cache = answer_cache if answer_cache is not None else AnswerCache(cache_dir, ttl=answer_ttl)
+        
+        # Initialize Ollama; readers share one pooled connection unless given their own
+        self.client = client or default_transport()
+        
+        # Context window per model, for packing several chunks into one prompt
+        self.context_lengths = ContextLengths(self.client, context_length, max_context)
+        
+    def _get_chunker(self, chunk_size: Optional[int]) -> Chunker:
+        """Return the configured chunker, or a copy of it with another chunk size."""
+        if chunk_size is None or chunk_size == self.chunker.chunk_size:
+            return self.chunker
+        return make_chunker(self.chunker.name, chunk_size, min(self.chunker.overlap, chunk_size - 1))
+    
+    def _select_extractor(self, pdf_path: str, document_hash: Optional[str] = None) -> str:
+        """
+        Return the configured extraction backend, probing the PDF in "auto" mode.
+        
+        With the extraction cache, the backend selected for a document is
+        remembered under its hash, so the document is probed only once.
+        """
+        if self.extractor != "auto":
+            return self.extractor
+        if self.cache is not None and document_hash:
+            name = self.cache.load_extractor_choice(document_hash)
+            if name in EXTRACTORS and EXTRACTORS[name].available():
+                log.debug("Extracting with %s, selected earlier", name)
+                return name
+        
+        name = select_extractor(pdf_path)
+        log.debug("Extracting with %s", name)
+        if self.cache is not None and document_hash:
+            self.cache.store_extractor_choice(document_hash, name)
+        return name
+    
+    def iter_chunk_records(self, pdf_path: str, chunk_size: Optional[int] = None,
+                           workers: Optional[int] = None) -> Iterator[Chunk]:
+        """
+        Extract text from a PDF file and yield it chunk by chunk, with the
+        pages and character offsets each chunk covers.
+        
+        Chunks are yielded while pages are still being extracted; only the
+        current page and the unfinished chunk are kept in memory.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            chunk_size: Maximum chunk size (defaults to the reader's chunker setting)
+            workers: Number of extraction processes (defaults to self.workers)
+            
+        Yields:
+            Chunk records in document order
+        """
+        _validate_pdf_path(pdf_path)
+        document_hash = self.cache.document_hash(pdf_path) if self.cache is not None else None
+        pages = iter_pages(pdf_path, workers or self.workers,
+                           extractor=self._select_extractor(pdf_path, document_hash))
+        yield from self._get_chunker(chunk_size).iter_chunks(pages)
+    
+    def iter_chunks(self, pdf_path: str, chunk_size: Optional[int] = None,
+                    workers: Optional[int] = None) -> Iterator[str]:
+        """
+        Extract text from a PDF file and yield the text of each chunk.
         
-    def extract_text_from_pdf(self, pdf_path: str, chunk_size: int = 1000) -> List[str]:
+        See iter_chunk_records() for the arguments.
+        """
+        for chunk in self.iter_chunk_records(pdf_path, chunk_size, workers):
+            yield chunk.text
+    
+    def extract_text_from_pdf(self, pdf_path: str, chunk_size: Optional[int] = None,
+                              workers: Optional[int] = None,
+                              progress: Optional[Callable[[int, int], None]] = None,
+                              stop_event: Optional[threading.Event] = None) -> List[str]:
         """
         Extract text from a PDF file and split it into chunks.
         
+        Previously extracted PDFs are served from the extraction cache, in
+        "auto" extractor mode by whichever backend extracted them. When
+        a PDF changed since it was last loaded from the same path, only its
+        new or modified pages are extracted and only chunks whose text
+        changed are embedded again. The page range and offsets of every
+        chunk are kept in self.chunks.
+        
+        Chunks are indexed as soon as they are cut, so questions asked from
+        another thread while the PDF is loading are answered from the pages
+        indexed so far.
+        
         Args:
             pdf_path: Path to the PDF file
-            chunk_size: Maximum number of characters per chunk
+            chunk_size: Maximum chunk size (defaults to the reader's chunker setting)
+            workers: Number of extraction processes (defaults to self.workers)
+            progress: Called with (pages done, total pages) after every page
+            stop_event: Stops the extraction when set, raising CancelledError;
+                nothing is cached for a stopped extraction
             
         Returns:
             List of text chunks
         """
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-            
-        if not pdf_path.lower().endswith('.pdf'):
-            raise ValueError("File must be a PDF")
-            
-        self.current_pdf = pdf_path
-        self.text_chunks = []
-        full_text = ""
+        _validate_pdf_path(pdf_path)
+        chunker = self._get_chunker(chunk_size)
+        with self._index_lock:
+            self.text_chunks = []
+            self.chunks = []
+            self.index = BM25Index()
+        self.page_texts = []
+        self.embedding_index = None
+        self.table_index = None
+        self._previous_version = None
+        self._page_fingerprints = None
+        self.chunking = chunker.signature()
         
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        # Clean up text (remove extra whitespace, etc.)
-                        text = re.sub(r'\s+', ' ', text).strip()
-                        full_text += text + "\n\n"
+            cache_key = None
+            cached = None
+            if self.cache is None:
+                self.document_hash = file_sha256(pdf_path)
+            else:
+                self.document_hash = self.cache.document_hash(pdf_path)
+                for name in available_extractors() if self.extractor == "auto" else [self.extractor]:
+                    cache_key = self.cache.make_key(self.document_hash, extractor_id(name), chunker.signature())
+                    cached = self.cache.load(cache_key)
+                    if cached is not None:
+                        self.extractor_name = name
+                        break
             
-            # Split text into chunks
-            self.text_chunks = [full_text[i:i + chunk_size] 
-                              for i in range(0, len(full_text), chunk_size)]
-            
-            return self.text_chunks
+            if cached is None:
+                self.extractor_name = self._select_extractor(pdf_path, self.document_hash)
+                if self.cache is not None:
+                    cache_key = self.cache.make_key(self.document_hash, extractor_id(self.extractor_name),
+                                                    chunker.signature())
             
+            if cached is not None:
+                self.page_texts = cached.pages
+                with self.metrics.span("chunk", chunks=len(cached.chunk_spans), cached=True):
+                    chunks = chunks_from_spans(cached.pages, cached.chunk_spans)
+                    text_chunks = [chunk.text for chunk in chunks]
+                with self.metrics.span("index", chunks=len(text_chunks)):
+                    index = BM25Index(text_chunks)
+                with self._index_lock:
+                    self.chunks, self.text_chunks, self.index = chunks, text_chunks, index
+                if progress is not None:
+                    progress(len(self.page_texts), len(self.page_texts))
+            else:
+                fingerprints = None
+                reusable = {}
+                if cache_key is not None:
+                    path_key = self.cache.make_key("path:" + os.path.abspath(pdf_path),
+                                                   extractor_id(self.extractor_name), chunker.signature())
+                    try:
+                        fingerprints = page_fingerprints(pdf_path)
+                    except Exception as e:
+                        log.warning("Could not hash pages (%s), extracting every page", e)
+                    if fingerprints is not None:
+                        reusable = self._reusable_pages(path_key, chunker)
+                self._page_fingerprints = fingerprints
+                
+                # Only pages not seen in the previous version are extracted
+                page_numbers = None
+                if reusable:
+                    page_numbers = [i for i, fingerprint in enumerate(fingerprints) if fingerprint not in reusable]
+                    log.debug("Reusing %d of %d pages from the previous version",
+                              len(fingerprints) - len(page_numbers), len(fingerprints))
+                
+                def source_pages():
+                    extracted = iter_pages(pdf_path, workers or self.workers, page_numbers, self.extractor_name)
+                    if page_numbers is None:
+                        yield from extracted
+                        return
+                    for fingerprint in fingerprints:
+                        text = reusable.get(fingerprint)
+                        yield text if text is not None else next(extracted)
+                
+                total_pages = None
+                if progress is not None:
+                    total_pages = (len(fingerprints) if fingerprints is not None
+                                   else make_extractor(self.extractor_name).page_count(pdf_path))
+                
+                # Record the cleaned page texts on their way into the chunker;
+                # chunk offsets refer to them. Extraction is timed per page,
+                # and the rest of the loop is chunking and indexing.
+                extracting = indexing = 0.0
+                
+                def record_pages():
+                    nonlocal extracting
+                    pages = source_pages()
+                    while True:
+                        started = time.perf_counter()
+                        text = next(pages, None)
+                        if text is None:
+                            return
+                        seconds = time.perf_counter() - started
+                        extracting += seconds
+                        self.metrics.record("extract.page", seconds, page=len(self.page_texts) + 1,
+                                            extractor=self.extractor_name)
+                        _check_stopped(stop_event)
+                        self.page_texts.append(chunker.normalize_page(text))
+                        yield text
+                        if progress is not None:
+                            progress(len(self.page_texts), total_pages)
+                
+                # Index every chunk as soon as it is cut
+                loop_started = time.perf_counter()
+                for chunk in chunker.iter_chunks(record_pages()):
+                    started = time.perf_counter()
+                    with self._index_lock:
+                        self.chunks.append(chunk)
+                        self.text_chunks.append(chunk.text)
+                        self.index.add(chunk.text)
+                    indexing += time.perf_counter() - started
+                self.metrics.record("chunk", time.perf_counter() - loop_started - extracting - indexing,
+                                    chunks=len(self.chunks), cached=False)
+                self.metrics.record("index", indexing, chunks=len(self.chunks))
+                
+                if cache_key is not None:
+                    spans = [(chunk.char_start, chunk.char_end) for chunk in self.chunks]
+                    self.cache.store(cache_key, self.page_texts, spans)
+                    if fingerprints is not None and len(fingerprints) == len(self.page_texts):
+                        self.cache.store_page_index(path_key, self.document_hash, fingerprints)
+        except CancelledError:
+            log.debug("Loading of %s was cancelled", pdf_path)
+            raise
         except Exception as e:
             raise Exception(f"Error processing PDF: {str(e)}")
+        
+        if self.retrieval == "embedding":
+            self._load_embeddings(chunker.signature())
+        
+        if self.tables:
+            self._load_tables(pdf_path, workers or self.workers)
+        
+        self.current_pdf = pdf_path
+        if self.warm_up:
+            self.client.warm_up(self.model_name)
+        return self.text_chunks
     
-    def ask_question(self, question: str, max_chunks: int = 3) -> str:
+    def _reusable_pages(self, path_key: str, chunker: Chunker) -> Dict[str, str]:
         """
-        Ask a question about the PDF content.
+        Find the pages of the previous version of a PDF loaded from the same path.
+        
+        The previous version is kept in self._previous_version so its
+        chunk embeddings and tables can be reused as well.
+        
+        Returns:
+            Page fingerprint -> cleaned page text (empty if nothing can be reused)
+        """
+        previous = self.cache.load_page_index(path_key)
+        if previous is None or previous["document_hash"] == self.document_hash:
+            return {}
+        
+        entry = self.cache.load(self.cache.make_key(previous["document_hash"], extractor_id(self.extractor_name),
+                                                    chunker.signature()))
+        if entry is None or len(entry.pages) != len(previous["fingerprints"]):
+            return {}
+        
+        self._previous_version = (previous["document_hash"], entry, previous["fingerprints"])
+        return dict(zip(previous["fingerprints"], entry.pages))
+    
+    def _load_embeddings(self, chunking: str) -> None:
+        """
+        Build the embedding index, reusing the persisted matrix of a known document.
+        
+        Falls back to BM25 retrieval if the embedding model is unavailable.
+        """
+        path = None
+        if self.cache is not None and self.document_hash:
+            key = self.cache.make_key(self.document_hash,
+                                      f"{extractor_id(self.extractor_name)}:{self.embedding_model}", chunking)
+            path = self.cache.array_path(key)
+            index = EmbeddingIndex.load(path)
+            if index is not None and len(index) == len(self.text_chunks):
+                self.cache.touch(path)
+                self.embedding_index = index
+                return
+        
+        # A previous version of the PDF shares the embeddings of its unchanged chunks
+        previous = None
+        if self._previous_version is not None:
+            previous_hash, entry, _ = self._previous_version
+            previous_key = self.cache.make_key(previous_hash, f"{extractor_id(self.extractor_name)}:{self.embedding_model}", chunking)
+            previous_index = EmbeddingIndex.load(self.cache.array_path(previous_key))
+            if previous_index is not None and len(previous_index) == len(entry.chunk_spans):
+                previous = (previous_index, entry.chunks())
+        
+        try:
+            with self.metrics.span("embed", model=self.embedding_model, chunks=len(self.text_chunks)):
+                if previous is not None:
+                    changed = len(set(self.text_chunks) - set(previous[1]))
+                    log.debug("Embedding %d new or changed of %d chunks with %s",
+                              changed, len(self.text_chunks), self.embedding_model)
+                    index = EmbeddingIndex.update(self.client, self.embedding_model, self.text_chunks, *previous)
+                else:
+                    log.debug("Embedding %d chunks with %s", len(self.text_chunks), self.embedding_model)
+                    index = EmbeddingIndex.build(self.client, self.embedding_model, self.text_chunks)
+        except Exception as e:
+            log.warning("Could not embed chunks (%s), using keyword retrieval", e)
+            return
+        
+        if path is not None:
+            index.save(path)
+            self.cache.evict(keep=key)
+        self.embedding_index = index
+    
+    def _tables_key(self, document_hash: str) -> str:
+        return self.cache.make_key(document_hash, f"tables-{TABLES_VERSION}", "")
+    
+    def _reusable_tables(self) -> Dict[int, List[Table]]:
+        """
+        Take the tables of pages unchanged since the previous version of the PDF.
+        
+        Returns:
+            0-based page index -> tables of that page (possibly none), for
+            every page whose tables are known
+        """
+        if self._previous_version is None or self._page_fingerprints is None:
+            return {}
+        previous_hash, _, previous_fingerprints = self._previous_version
+        previous = TableIndex.load(self.cache.tables_path(self._tables_key(previous_hash)))
+        if previous is None:
+            return {}
+        
+        by_page: Dict[int, List[Table]] = {}
+        for table in previous.tables:
+            by_page.setdefault(table.page, []).append(table)
+        previous_pages = {fingerprint: number for number, fingerprint in enumerate(previous_fingerprints, 1)}
+        return {i: [Table(i + 1, table.header, table.cells, table.values)
+                    for table in by_page.get(previous_pages[fingerprint], [])]
+                for i, fingerprint in enumerate(self._page_fingerprints) if fingerprint in previous_pages}
+    
+    def _load_tables(self, pdf_path: str, workers: int = 1) -> None:
+        """
+        Extract the tables of the PDF, or load them from the cache.
+        
+        When the PDF changed since it was last loaded from the same path,
+        only the pages that changed are searched for tables; the search
+        runs in up to workers processes.
+        """
+        path = None
+        if self.cache is not None:
+            key = self._tables_key(self.document_hash)
+            path = self.cache.tables_path(key)
+            index = TableIndex.load(path)
+            if index is not None:
+                self.cache.touch(path)
+                self.table_index = index
+                return
+        
+        try:
+            with self.metrics.span("tables") as span:
+                reused = self._reusable_tables() if self.cache is not None else {}
+                page_numbers = None
+                if reused:
+                    page_numbers = [i for i in range(len(self._page_fingerprints)) if i not in reused]
+                    log.debug("Reusing the tables of %d of %d pages", len(reused), len(self._page_fingerprints))
+                tables = extract_tables(pdf_path, page_numbers, workers) if page_numbers != [] else []
+                tables.extend(table for page_tables in reused.values() for table in page_tables)
+                index = TableIndex(sorted(tables, key=lambda table: table.page))
+                span["tables"] = len(index)
+                span["pages_reused"] = len(reused)
+        except Exception as e:
+            log.warning("Could not extract tables (%s)", e)
+            return
+        log.debug("Found %d tables", len(index))
+        
+        if path is not None:
+            index.save(path)
+            self.cache.evict(keep=key)
+        self.table_index = index
+    
+    def _table_answer(self, question: str) -> Optional[str]:
+        """Answer a question from a single table cell, if one clearly matches."""
+        if not self.table_index:
+            return None
+        answer = self.table_index.lookup(question)
+        if answer is None:
+            return None
+        log.debug("Answered from the table on page %d", answer.page)
+        return answer.format()
+    
+    def retrieve(self, question: str, k: int = 3) -> List[int]:
+        """
+        Select the chunks most relevant to a question.
         
         Args:
-            question: The question to ask
-            max_chunks: Maximum number of chunks to process
+            question: The question to rank chunks against
+            k: Maximum number of chunks to return
             
         Returns:
-            The answer from the model
+            Ids (indexes into text_chunks) of up to k chunks, best first
         """
+        with self.metrics.span("retrieve", k=k) as span:
+            chunk_ids = []
+            if self.embedding_index is not None and len(self.embedding_index) == len(self.text_chunks):
+                try:
+                    query = self._embed_question(question)
+                    chunk_ids = [chunk_id for chunk_id, _ in self.embedding_index.search(query, k)]
+                    span["method"] = "embedding"
+                except Exception as e:
+                    log.warning("Semantic search failed (%s), using keyword retrieval", e)
+            
+            if not chunk_ids:
+                span["method"] = "bm25"
+                with self._index_lock:
+                    if self.index is None or len(self.index) != len(self.text_chunks):
+                        self.index = BM25Index(self.text_chunks)
+                    chunk_ids = [chunk_id for chunk_id, _ in self.index.search(question, k)]
+            
+            # Nothing matched any question term: fall back to the start of the document
+            if not chunk_ids:
+                chunk_ids = list(range(min(k, len(self.text_chunks))))
+            return chunk_ids
+    
+    def _check_loaded(self) -> None:
+        """Raise if there is no document to ask questions about."""
         if not self.text_chunks:
             raise ValueError("No PDF content loaded. Please load a PDF first.")
+    
+    def _chunk_source(self, chunk_id: int) -> str:
+        """Describe where a chunk comes from, e.g. "pages 3-4" (empty if unknown)."""
+        if chunk_id >= len(self.chunks):
+            return ""
+        record = self.chunks[chunk_id]
+        if record.page_start == record.page_end:
+            return f"page {record.page_start}"
+        return f"pages {record.page_start}-{record.page_end}"
+    
+    def _embed_question(self, question: str):
+        """Embed a question, reusing the vector of the last question embedded."""
+        # Read the memo once: other threads (batch, server, strategies) may replace it meanwhile
+        memo = self._question_vector
+        if memo is not None and memo[0] == question:
+            return memo[1]
+        vector = embed_texts(self.client, self.embedding_model, [question])[0]
+        self._question_vector = (question, vector)
+        return vector
+    
+    def _cached_answer(self, question: str, chunk_ids: List[int], strategy: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Look up a previous answer to the question.
         
-        print(f"\nDebug: Processing question: {question}")
-        print(f"Debug: Using model: {self.model_name}")
-        print(f"Debug: Number of text chunks: {len(self.text_chunks)}")
-            
-        # Process chunks and get answers
-        answers = []
-        for i, chunk in enumerate(self.text_chunks[:max_chunks]):
+        Returns:
+            The answer cache key (None when caching is off) and the cached answer, if any
+        """
+        if self.answer_cache is None or not self.document_hash:
+            return None, None
+        
+        key = AnswerCache.make_key(self.document_hash, self.model_name, question, chunk_ids, strategy,
+                                   self._answer_settings(strategy))
+        answer = self.answer_cache.get(key)
+        if answer is None and self.near_duplicate_threshold is not None:
             try:
-                print(f"\nDebug: Processing chunk {i+1}/{min(len(self.text_chunks), max_chunks)}")
-                print(f"Debug: Chunk size: {len(chunk)} characters")
-                
-                # Prepare the prompt with the current chunk
-                prompt = f"""You are a helpful assistant that answers questions based on the provided document.
+                answer = self.answer_cache.find_similar(self.document_hash, self.model_name,
+                                                        self._embed_question(question),
+                                                        self.near_duplicate_threshold)
+            except Exception as e:
+                log.warning("Near-duplicate lookup failed (%s)", e)
+        
+        if answer is not None and log.isEnabledFor(logging.DEBUG):
+            log.debug("Answer served from cache %s", self.answer_cache.stats())
+        return key, answer
+    
+    def _answer_settings(self, strategy: str) -> str:
+        """Describe the settings that decide the text and prompt behind the retrieved chunk ids."""
+        retrieval = "embedding" if self.embedding_index is not None else "bm25"
+        settings = f"{extractor_id(self.extractor_name or '')}|{self.chunking}|{retrieval}"
+        if strategy == "packed":
+            settings += f"|{self.context_lengths.get(self.model_name)}:{self.answer_tokens}"
+        return settings
+    
+    def _store_answer(self, key: Optional[str], question: str, answer: str) -> None:
+        """
+        Remember an answer so the same question is not sent to the model again.
+        
+        "Could not find" answers are not kept, so the question is asked again
+        once retrieval or the model can do better.
+        """
+        if key is None or _is_no_answer(answer):
+            return
+        
+        vector = None
+        if self.near_duplicate_threshold is not None:
+            try:
+                vector = self._embed_question(question)
+            except Exception:
+                pass
+        self.answer_cache.put(key, self.document_hash, self.model_name, question, answer, vector)
+    
+    def _build_prompt(self, question: str, chunk: str) -> str:
+        """Prepare the prompt asking the question about a single chunk."""
+        with self.metrics.span("prompt.build"):
+            return self._format_prompt(question, chunk)
+    
+    @staticmethod
+    def _format_prompt(question: str, chunk: str) -> str:
+        return f"""You are a helpful assistant that answers questions based on the provided document.
 Answer the following question based on the document content below.
 If the answer cannot be found in the document, say 'I could not find an answer in the document.'
 
@@ -94,62 +808,625 @@ Document content:
 {chunk}
 
 Answer:"""
+    
+    def _build_packed_prompt(self, question: str, chunk_ids: List[int]) -> Tuple[str, Dict]:
+        """
+        Prepare one prompt holding as many of the ranked chunks as the model's
+        context window fits, best-ranked first.
+        
+        The chunks used are kept in self.last_packed_chunks.
+        
+        Returns:
+            The prompt and the request options that give the model the full window
+        """
+        context_length = self.context_lengths.get(self.model_name)
+        packer = PromptPacker(context_length, self.answer_tokens)
+        
+        with self.metrics.span("prompt.build", packed=True) as span:
+            excerpts = []
+            for i, chunk_id in enumerate(chunk_ids):
+                source = self._chunk_source(chunk_id)
+                header = f"[Excerpt {i + 1}, {source}]" if source else f"[Excerpt {i + 1}]"
+                excerpts.append(f"{header}\n{self.text_chunks[chunk_id].strip()}")
+            
+            packed = packer.pack(excerpts, SYSTEM_PROMPT + self._format_prompt(question, ""))
+            self.last_packed_chunks = [chunk_ids[position] for position, _ in packed]
+            log.debug("Packed %d/%d chunks into a %d-token context: %s",
+                      len(packed), len(chunk_ids), context_length, self.last_packed_chunks)
+            span["chunks"] = len(packed)
+            
+            prompt = self._format_prompt(question, "\n\n".join(text for _, text in packed))
+        return prompt, {"num_ctx": context_length}
+    
+    def _chat(self, prompt: str, stop_event: Optional[threading.Event] = None,
+              options: Optional[Dict] = None) -> Optional[str]:
+        """
+        Send a prompt to the model and return the stripped answer.
+        
+        With a stop_event the response is streamed, and the request is
+        abandoned (closing the connection) as soon as the event is set.
+        
+        Returns:
+            The answer, or None if the request was stopped or the response was malformed
+        """
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        
+        if stop_event is None:
+            with self.metrics.span("model.generate", model=self.model_name) as span:
+                response = self.client.chat(model=self.model_name, messages=messages, options=options)
+                span["tokens"] = _eval_count(response)
+            if response and 'message' in response and 'content' in response['message']:
+                return response['message']['content'].strip()
+            log.debug("Unexpected response format: %s", response)
+            return None
+        
+        parts = []
+        started = time.perf_counter()
+        first_token = None
+        try:
+            with self.metrics.span("model.generate", model=self.model_name) as span:
+                stream = self.client.chat(model=self.model_name, messages=messages, stream=True, options=options)
+                try:
+                    for part in stream:
+                        if stop_event.is_set():
+                            span["stopped"] = True
+                            return None
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        parts.append(part['message']['content'])
+                        span["tokens"] = _eval_count(part) or len(parts)
+                finally:
+                    stream.close()
+        finally:
+            # Recorded with the whole request, so a breakdown printed while
+            # abandoned requests still run counts neither of their spans
+            if first_token is not None:
+                self.metrics.record("model.ttft", first_token, started, model=self.model_name)
+        return "".join(parts).strip()
+    
+    def _ask_concurrently(self, question: str, chunk_ids: List[int], concurrency: int,
+                          stop_at_first: bool = True, cancel: Optional[threading.Event] = None) -> List[str]:
+        """
+        Ask about several chunks at once on a bounded thread pool.
+        
+        With stop_at_first, once an answer other than "could not find"
+        arrives, queued requests are cancelled and running ones are abandoned;
+        the same happens to every request when cancel is set.
+        Per-chunk latency is kept in self.last_chunk_timings.
+        
+        Returns:
+            The first useful answer alone, or every answer received in rank order
+        """
+        answered = threading.Event()
+        stop_event = _AnyEvent(answered, cancel)
+        started = time.perf_counter()
+        timings = {chunk_id: {"chunk_id": chunk_id, "status": "cancelled", "seconds": None}
+                   for chunk_id in chunk_ids}
+        
+        def ask(chunk_id: int) -> Optional[str]:
+            if stop_event.is_set():
+                return None
+            request_start = time.perf_counter()
+            try:
+                return self._chat(self._build_prompt(question, self.text_chunks[chunk_id]), stop_event)
+            finally:
+                timings[chunk_id]["seconds"] = time.perf_counter() - request_start
+        
+        answers = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        try:
+            futures = {executor.submit(ask, chunk_id): chunk_id for chunk_id in chunk_ids}
+            for future in as_completed(futures):
+                chunk_id = futures[future]
+                try:
+                    answer = future.result()
+                except Exception as e:
+                    timings[chunk_id]["status"] = "error"
+                    log.error("Error getting response from model: %s", e)
+                    continue
+                
+                if answer is None:
+                    continue
+                answers[chunk_id] = answer
+                if answer and not _is_no_answer(answer):
+                    timings[chunk_id]["status"] = "answered"
+                    if not stop_at_first:
+                        continue
+                    log.debug("Chunk %d answered after %.2fs, cancelling the remaining requests",
+                              chunk_id, time.perf_counter() - started)
+                    answered.set()
+                    for pending in futures:
+                        pending.cancel()
+                    return [answer]
+                timings[chunk_id]["status"] = "no_answer"
+        finally:
+            executor.shutdown(wait=False)
+            self.last_chunk_timings = [timings[chunk_id] for chunk_id in chunk_ids]
+            if log.isEnabledFor(logging.DEBUG):
+                for timing in self.last_chunk_timings:
+                    seconds = "-" if timing["seconds"] is None else f"{timing['seconds']:.2f}s"
+                    log.debug("Chunk %d: %s (%s)", timing["chunk_id"], timing["status"], seconds)
+        
+        return [answers[chunk_id] for chunk_id in chunk_ids if chunk_id in answers]
+    
+    def _reduce_answers(self, question: str, answers: List[str], reduce_inputs: int,
+                        token_budget: int, stop_event: Optional[threading.Event] = None) -> Optional[str]:
+        """
+        Merge partial answers from several chunks with one final model call.
+        
+        Args:
+            question: The question being answered
+            answers: Useful per-chunk answers, best-ranked first
+            reduce_inputs: Maximum number of partial answers to merge
+            token_budget: Approximate token budget for the partial answers
+            stop_event: Abandons the merge call when set
+            
+        Returns:
+            The merged answer, or None if the model gave no usable response
+        """
+        # Keep whole answers in rank order until the budget (~4 characters
+        # per token) is spent; truncate the one that crosses it
+        char_budget = token_budget * 4
+        partials = []
+        for answer in answers[:reduce_inputs]:
+            if char_budget <= 0:
+                break
+            partials.append(answer[:char_budget])
+            char_budget -= len(partials[-1])
+        
+        if len(partials) == 1:
+            return partials[0]
+        
+        numbered = "\n\n".join(f"Partial answer {i + 1}:\n{partial}" for i, partial in enumerate(partials))
+        prompt = f"""The partial answers below were each written from a different part of the same document.
+Combine them into one complete answer to the question. Keep every relevant fact, remove repetition,
+and do not add information that is not in the partial answers.
+
+Question: {question}
+
+{numbered}
+
+Answer:"""
+        log.debug("Reducing %d partial answers", len(partials))
+        return self._chat(prompt, stop_event)
+    
+    def ask_question(self, question: str, max_chunks: Optional[int] = None, strategy: str = "sequential",
+                     concurrency: Optional[int] = None, reduce_inputs: Optional[int] = None,
+                     reduce_token_budget: Optional[int] = None,
+                     stop_event: Optional[threading.Event] = None) -> str:
+        """
+        Ask a question about the PDF content.
+        
+        Args:
+            question: The question to ask
+            max_chunks: Maximum number of chunks to process; the chunks
+                ranked most relevant to the question are used (default: 3, or
+                as many as fit in the context window for "packed")
+            strategy: "sequential" asks about one chunk at a time; "concurrent"
+                asks about all of them at once and returns the first useful answer;
+                "map_reduce" answers from every chunk in parallel and merges the
+                answers with one final call; "packed" sends as many chunks as the
+                model's context window holds in a single call
+            concurrency: Maximum requests in flight for "concurrent" and
+                "map_reduce" (defaults to self.concurrency)
+            reduce_inputs: Maximum partial answers merged by "map_reduce"
+                (defaults to self.reduce_inputs)
+            reduce_token_budget: Approximate tokens of partial answers sent to
+                the "map_reduce" merge call (defaults to self.reduce_token_budget)
+            stop_event: Cancels the question when set: model requests are
+                abandoned and CancelledError is raised
+            
+        Returns:
+            The answer from the model
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        self._check_loaded()
+        
+        with self.metrics.span("ask", strategy=strategy) as span:
+            log.debug("Processing question with %s over %d chunks: %s",
+                      self.model_name, len(self.text_chunks), question)
+            
+            table_answer = self._table_answer(question)
+            if table_answer is not None:
+                span["source"] = "table"
+                return table_answer
+            
+            chunk_ids = self.retrieve(question, max_chunks or self._default_max_chunks(strategy))
+            log.debug("Retrieved chunks: %s", chunk_ids)
+            if not chunk_ids:
+                span["source"] = "none"
+                return NO_MATCH_ANSWER
+            
+            cache_key, cached = self._cached_answer(question, chunk_ids, strategy)
+            if cached is not None:
+                span["source"] = "cache"
+                return cached
+            span["source"] = "model"
+            
+            if strategy == "concurrent":
+                answers = self._ask_concurrently(question, chunk_ids, concurrency or self.concurrency,
+                                                 cancel=stop_event)
+            elif strategy == "map_reduce":
+                answers = self._ask_concurrently(question, chunk_ids, concurrency or self.concurrency,
+                                                 stop_at_first=False, cancel=stop_event)
+                useful = [answer for answer in answers if answer and not _is_no_answer(answer)]
+                if useful:
+                    _check_stopped(stop_event)
+                    try:
+                        merged = self._reduce_answers(question, useful, reduce_inputs or self.reduce_inputs,
+                                                      reduce_token_budget or self.reduce_token_budget, stop_event)
+                    except Exception as e:
+                        log.error("Error getting response from model: %s", e)
+                        merged = None
+                    answers = [merged or useful[0]]
+            elif strategy == "packed":
+                answers = []
+                try:
+                    prompt, options = self._build_packed_prompt(question, chunk_ids)
+                    answer = self._chat(prompt, stop_event, options)
+                    if answer is not None:
+                        answers.append(answer)
+                except Exception as e:
+                    log.error("Error getting response from model: %s", e)
+            else:
+                answers = self._ask_sequentially(question, chunk_ids, stop_event)
+            _check_stopped(stop_event)
+            
+            # If no answers were generated, return an error message
+            if not answers:
+                error_msg = "I'm sorry, I couldn't generate an answer. Please check if Ollama is running and the model is downloaded."
+                log.warning("No answers were generated. Check Ollama service and model availability.")
+                return error_msg
+            
+            # Return the first non-empty answer
+            if not answers[0].strip():
+                return "I couldn't find an answer to that question in the document."
+            
+            self._store_answer(cache_key, question, answers[0])
+            return answers[0]
+    
+    @staticmethod
+    def _default_max_chunks(strategy: str) -> int:
+        return PACKED_MAX_CHUNKS if strategy == "packed" else DEFAULT_MAX_CHUNKS
+    
+    def stream_answer(self, question: str, max_chunks: Optional[int] = None,
+                      strategy: str = "sequential", stop_event: Optional[threading.Event] = None) -> Iterator[str]:
+        """
+        Answer a question, yielding the answer token by token as Ollama emits it.
+        
+        With the "sequential" strategy the answer comes from the best-ranked
+        chunk that the model responds to; with "packed" from one prompt
+        holding as many ranked chunks as fit, as in ask_question(). The delay
+        to the first token is kept in self.last_time_to_first_token.
+        
+        Args:
+            question: The question to ask
+            max_chunks: Maximum number of chunks to use, best-ranked first
+            strategy: One of STREAMING_STRATEGIES
+            stop_event: Cancels the answer when set: the model request is
+                abandoned and CancelledError is raised
+            
+        Returns:
+            Iterator over pieces of the answer text; the arguments are checked
+            before it is returned, so a ValueError is raised by this call
+        """
+        if strategy not in STREAMING_STRATEGIES:
+            raise ValueError(f"Strategy cannot be streamed: {strategy}")
+        self._check_loaded()
+        return self._stream_answer(question, max_chunks, strategy, stop_event)
+    
+    def _stream_answer(self, question: str, max_chunks: Optional[int], strategy: str,
+                       stop_event: Optional[threading.Event]) -> Iterator[str]:
+        """Generate the answer of stream_answer() once its arguments are checked."""
+        with self.metrics.span("ask", strategy=strategy, streamed=True) as span:
+            started = time.perf_counter()
+            self.last_time_to_first_token = None
+            
+            table_answer = self._table_answer(question)
+            if table_answer is not None:
+                span["source"] = "table"
+                self.last_time_to_first_token = time.perf_counter() - started
+                yield table_answer
+                return
+            
+            chunk_ids = self.retrieve(question, max_chunks or self._default_max_chunks(strategy))
+            log.debug("Streaming answer from chunks: %s", chunk_ids)
+            if not chunk_ids:
+                span["source"] = "none"
+                self.last_time_to_first_token = time.perf_counter() - started
+                yield NO_MATCH_ANSWER
+                return
+            
+            # Same answer as ask_question() with this strategy, so they share cache entries
+            cache_key, cached = self._cached_answer(question, chunk_ids, strategy)
+            if cached is not None:
+                span["source"] = "cache"
+                self.last_time_to_first_token = time.perf_counter() - started
+                yield cached
+                return
+            span["source"] = "model"
+            
+            # Prompts to try in turn until the model responds, each built only when tried
+            if strategy == "packed":
+                attempts = [self._build_packed_prompt(question, chunk_ids)]
+            else:
+                attempts = ((self._build_prompt(question, self.text_chunks[chunk_id]), None) for chunk_id in chunk_ids)
+            
+            for prompt, options in attempts:
+                _check_stopped(stop_event)
+                received = False
+                tokens = []
+                messages = [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ]
+                try:
+                    with self.metrics.span("model.generate", model=self.model_name) as generation:
+                        request_started = time.perf_counter()
+                        stream = self.client.chat(model=self.model_name, messages=messages, stream=True, options=options)
+                        try:
+                            for part in stream:
+                                _check_stopped(stop_event)
+                                generation["tokens"] = _eval_count(part) or len(tokens)
+                                token = part['message']['content']
+                                if not token:
+                                    continue
+                                if not received:
+                                    received = True
+                                    now = time.perf_counter()
+                                    self.last_time_to_first_token = now - started
+                                    self.metrics.record("model.ttft", now - request_started, model=self.model_name)
+                                    log.debug("First token after %.2fs", self.last_time_to_first_token)
+                                tokens.append(token)
+                                yield token
+                        finally:
+                            stream.close()
+                except CancelledError:
+                    raise
+                except Exception as e:
+                    # Once part of an answer was shown, switching chunks would garble it
+                    if received:
+                        raise
+                    log.error("Error getting response from model: %s", e)
+                    continue
                 
-                print("Debug: Sending request to Ollama...")
-                response = self.client.chat(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant that answers questions based on the provided document."},
-                        {"role": "user", "content": prompt}
-                    ]
-                )
+                if received:
+                    answer = "".join(tokens).strip()
+                    if answer:
+                        self._store_answer(cache_key, question, answer)
+                    return
+            
+            yield "I'm sorry, I couldn't generate an answer. Please check if Ollama is running and the model is downloaded."
+    
+    def _ask_sequentially(self, question: str, chunk_ids: List[int],
+                          stop_event: Optional[threading.Event] = None) -> List[str]:
+        """Ask about one chunk at a time, stopping at the first answer."""
+        answers = []
+        for i, chunk_id in enumerate(chunk_ids):
+            if stop_event is not None and stop_event.is_set():
+                break
+            chunk = self.text_chunks[chunk_id]
+            try:
+                log.debug("Asking about chunk %d/%d: %d characters %s", i + 1, len(chunk_ids), len(chunk),
+                          self._chunk_source(chunk_id))
+                answer = self._chat(self._build_prompt(question, chunk), stop_event)
                 
-                if response and 'message' in response and 'content' in response['message']:
-                    answer = response['message']['content'].strip()
-                    print(f"Debug: Received answer: {answer[:100]}..." if len(answer) > 100 else f"Debug: Received answer: {answer}")
+                if answer is not None:
+                    log.debug("Received answer: %.100s", answer)
                     answers.append(answer)
-                else:
-                    print(f"Debug: Unexpected response format: {response}")
                     
-            except Exception as e:
-                print(f"Error getting response from model: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                    # Only the best-ranked answer is returned, so stop asking
+                    break
+                    
+            except Exception:
+                log.exception("Error getting response from model")
                 continue
         
-        # If no answers were generated, return an error message
-        if not answers:
-            error_msg = "I'm sorry, I couldn't generate an answer. Please check if Ollama is running and the model is downloaded."
-            print(f"Debug: No answers were generated. Check Ollama service and model availability.")
-            return error_msg
-            
-        # Return the first non-empty answer
-        return answers[0] if answers[0].strip() else "I couldn't find an answer to that question in the document."
+        return answers
+
+def _print_answer(reader: PDFReaderAI, question: str, args: argparse.Namespace) -> None:
+    """Print the answer to a question, token by token when streaming applies."""
+    # Only strategies that answer with a single model call can be streamed
+    if args.stream and args.strategy in STREAMING_STRATEGIES:
+        for i, token in enumerate(reader.stream_answer(question, max_chunks=args.max_chunks,
+                                                       strategy=args.strategy)):
+            if i == 0:
+                print("\nAnswer: ", end="")
+            print(token, end="", flush=True)
+        print()
+        return
+    
+    answer = reader.ask_question(question, max_chunks=args.max_chunks, strategy=args.strategy)
+    print(f"\nAnswer: {answer}")
+
+def _print_profile(metrics: Metrics, title: str) -> None:
+    """Print the latency breakdown of the spans recorded since the last one, then start over."""
+    print(f"\nLatency breakdown ({title}):")
+    print(metrics.format_breakdown())
+    metrics.reset()
+
+def _add_ollama_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--ollama-timeout", type=float, default=DEFAULT_TIMEOUT,
+                       help=f"Seconds to wait for Ollama to connect or send data (default: {DEFAULT_TIMEOUT:g})")
+    parser.add_argument("--ollama-retries", type=int, default=DEFAULT_RETRIES,
+                       help=f"Retries of Ollama requests failing with a connection or busy error (default: {DEFAULT_RETRIES})")
+    parser.add_argument("--keep-alive", default=DEFAULT_KEEP_ALIVE,
+                       help=f"How long Ollama keeps the model loaded between questions, "
+                            f"e.g. 10m, 2h or -1 for always (default: {DEFAULT_KEEP_ALIVE})")
+
+def _transport_from_args(args: argparse.Namespace) -> OllamaTransport:
+    # Ollama reads bare numbers as seconds
+    keep_alive = args.keep_alive
+    if keep_alive.lstrip("-").isdigit():
+        keep_alive = int(keep_alive)
+    return OllamaTransport(timeout=args.ollama_timeout, retries=args.ollama_retries, keep_alive=keep_alive)
+
+def _add_extractor_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("-e", "--extractor", choices=["auto"] + list(EXTRACTORS), default="auto",
+                       help="Text extraction backend; auto picks the fastest installed one that "
+                            "extracts the first pages well (default: auto)")
+
+def serve_main(argv: List[str]) -> int:
+    """Run `pdf_reader.py serve`: answer questions over HTTP for many clients."""
+    parser = argparse.ArgumentParser(prog="pdf_reader.py serve",
+                                     description="PDF Reader AI - Question answering server")
+    parser.add_argument("pdf_paths", nargs="*", help="PDF files to load at startup")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                       help=f"Interface to listen on (default: {DEFAULT_HOST}, local clients only)")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT,
+                       help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("-m", "--model", default="tinyllama:1.1b",
+                       help="Ollama model to use (default: tinyllama:1.1b)")
+    parser.add_argument("--max-documents", type=int, default=DEFAULT_MAX_DOCUMENTS,
+                       help=f"Documents kept loaded, least recently used are dropped (default: {DEFAULT_MAX_DOCUMENTS})")
+    parser.add_argument("--threads", type=int, default=8,
+                       help="Threads running extraction and model requests (default: 8)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                       help="Number of processes used to extract pages (default: 1)")
+    _add_extractor_argument(parser)
+    parser.add_argument("--tables", action="store_true",
+                       help="Extract tables and answer questions about one table value without the model")
+    parser.add_argument("-r", "--retrieval", choices=["bm25", "embedding"], default="bm25",
+                       help="Rank chunks by keywords (bm25) or by Ollama embeddings (default: bm25)")
+    parser.add_argument("--cache-dir", help="Directory of the extraction cache")
+    
+    _add_ollama_arguments(parser)
+    add_logging_argument(parser)
+    
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level)
+    
+    # One transport for every document, so all requests share its connection pool
+    client = _transport_from_args(args)
+    # Every document records its spans in one registry, served by GET /metrics
+    metrics = Metrics()
+    # And uses the same caches, so one SQLite connection writes the answers
+    cache = ExtractionCache(args.cache_dir)
+    answer_cache = AnswerCache(args.cache_dir)
+    
+    def make_reader() -> PDFReaderAI:
+        return PDFReaderAI(model_name=args.model, workers=args.workers, retrieval=args.retrieval,
+                           client=client, extractor=args.extractor, tables=args.tables, metrics=metrics,
+                           cache=cache, answer_cache=answer_cache)
+    
+    serve(make_reader, args.host, args.port, args.max_documents, args.threads, args.pdf_paths, metrics)
+    return 0
 
 def main():
-    parser = argparse.ArgumentParser(description="PDF Reader AI - Ask questions about your PDF documents")
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        return serve_main(sys.argv[2:])
+    
+    parser = argparse.ArgumentParser(description="PDF Reader AI - Ask questions about your PDF documents",
+                                     epilog="Run 'pdf_reader.py serve --help' for the HTTP server mode.")
     parser.add_argument("pdf_path", help="Path to the PDF file")
     parser.add_argument("-q", "--question", help="Question to ask about the PDF")
+    parser.add_argument("-b", "--batch", metavar="FILE",
+                       help="Answer every question of a JSONL or CSV file (see batch.py)")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                       help="JSONL file receiving the --batch answers (default: <FILE>.answers.jsonl)")
+    parser.add_argument("--in-flight", type=int, default=4,
+                       help="Questions of a --batch answered at the same time (default: 4)")
     parser.add_argument("-m", "--model", default="tinyllama:1.1b", 
                        help="Ollama model to use (default: tinyllama:1.1b)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                       help="Number of processes used to extract pages (default: 1)")
+    parser.add_argument("-k", "--max-chunks", type=int,
+                       help=f"Number of most relevant chunks to consider per question (default: {DEFAULT_MAX_CHUNKS}, "
+                            f"or up to {PACKED_MAX_CHUNKS} for --strategy packed)")
+    parser.add_argument("-s", "--strategy", choices=STRATEGIES, default="sequential",
+                       help="Ask about chunks one at a time, all at once returning the first answer, "
+                            "all at once merging the answers, or packed together into one prompt "
+                            "that fills the model's context window (default: sequential)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4,
+                       help="Maximum model requests in flight for the concurrent and map_reduce strategies (default: 4)")
+    parser.add_argument("--reduce-inputs", type=int, default=5,
+                       help="Maximum partial answers merged by --strategy map_reduce (default: 5)")
+    parser.add_argument("--reduce-token-budget", type=int, default=1500,
+                       help="Approximate tokens of partial answers sent to the map_reduce merge call (default: 1500)")
+    parser.add_argument("--context-length", type=int,
+                       help="Context window in tokens filled by --strategy packed (default: asked from Ollama)")
+    parser.add_argument("--max-context", type=int, default=DEFAULT_MAX_CONTEXT,
+                       help=f"Upper limit on the context length reported by Ollama (default: {DEFAULT_MAX_CONTEXT})")
+    parser.add_argument("--no-stream", dest="stream", action="store_false",
+                       help="Print answers only once they are complete")
+    _add_ollama_arguments(parser)
+    _add_extractor_argument(parser)
+    parser.add_argument("--tables", action="store_true",
+                       help="Extract tables and answer questions about one table value without the model")
+    parser.add_argument("-r", "--retrieval", choices=["bm25", "embedding"], default="bm25",
+                       help="Rank chunks by keywords (bm25) or by Ollama embeddings (default: bm25)")
+    parser.add_argument("--embedding-model", default=DEFAULT_EMBEDDING_MODEL,
+                       help=f"Ollama embedding model for --retrieval embedding (default: {DEFAULT_EMBEDDING_MODEL})")
+    parser.add_argument("--chunker", choices=list(CHUNKERS), default="sentence",
+                       help="Cut the text into fixed character windows or into whole sentences, "
+                            "paragraphs or sentences up to a token count (default: sentence)")
+    parser.add_argument("--chunk-size", type=int,
+                       help="Maximum chunk size, in tokens for --chunker tokens and characters "
+                            "otherwise (default: 250 tokens or 1000 characters)")
+    parser.add_argument("--chunk-overlap", type=int, default=0,
+                       help="Text repeated between consecutive chunks, in the chunk size unit (default: 0)")
+    parser.add_argument("--cache-dir", help="Directory of the extraction cache")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Always re-extract the PDF instead of using the cache")
+    parser.add_argument("--no-answer-cache", action="store_true",
+                       help="Always ask the model instead of reusing answers to repeated questions")
+    parser.add_argument("--answer-ttl", type=float, default=DEFAULT_TTL / 3600,
+                       help=f"Hours a cached answer stays valid (default: {DEFAULT_TTL // 3600})")
+    parser.add_argument("--near-duplicates", type=float, metavar="SIMILARITY",
+                       help="Also reuse answers to questions whose embeddings have at least this "
+                            "cosine similarity, e.g. 0.95 (uses --embedding-model)")
+    parser.add_argument("--profile", action="store_true",
+                       help="Print how long each step took after loading the PDF and after every answer")
+    parser.add_argument("--trace", metavar="FILE",
+                       help="Append every timed step to FILE as a JSON line")
+    add_logging_argument(parser)
     
     args = parser.parse_args()
+    setup_logging(args.log_level)
     
+    trace = open(args.trace, "a", encoding="utf-8", buffering=1) if args.trace else None
     try:
         # Initialize the PDF Reader
-        reader = PDFReaderAI(model_name=args.model)
+        reader = PDFReaderAI(model_name=args.model, workers=args.workers,
+                             use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                             retrieval=args.retrieval, embedding_model=args.embedding_model,
+                             concurrency=args.concurrency, reduce_inputs=args.reduce_inputs,
+                             reduce_token_budget=args.reduce_token_budget,
+                             use_answer_cache=not args.no_answer_cache, answer_ttl=args.answer_ttl * 3600,
+                             near_duplicate_threshold=args.near_duplicates, chunker=args.chunker,
+                             chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+                             context_length=args.context_length, max_context=args.max_context,
+                             client=_transport_from_args(args), extractor=args.extractor,
+                             tables=args.tables, metrics=Metrics(trace))
         
         # Extract text from PDF
         print(f"Loading PDF: {args.pdf_path}")
         reader.extract_text_from_pdf(args.pdf_path)
         print("PDF loaded successfully!")
+        if args.profile:
+            _print_profile(reader.metrics, "loading")
         
+        # Answer a file of questions against the one loaded index
+        if args.batch:
+            print(f"\nAnswering questions from: {args.batch}")
+            summary = answer_file(reader, args.batch, args.output, args.in_flight,
+                                  args.strategy, args.max_chunks)
+            rate = summary["questions"] / summary["seconds"] if summary["seconds"] else 0.0
+            print(f"\nAnswered {summary['questions']} questions ({summary['errors']} errors) in "
+                  f"{summary['seconds']:.1f}s ({rate:.2f}/s), results in {summary['output']}")
+            if args.profile:
+                _print_profile(reader.metrics, "all questions")
         # If a question was provided, answer it
-        if args.question:
+        elif args.question:
             print(f"\nQuestion: {args.question}")
             print("\nSearching for answer...")
-            answer = reader.ask_question(args.question)
-            print(f"\nAnswer: {answer}")
+            _print_answer(reader, args.question, args)
+            if args.profile:
+                _print_profile(reader.metrics, "question")
         else:
             # Interactive mode
             print("\nEnter your questions about the PDF (type 'exit' to quit):")
@@ -161,12 +1438,16 @@ def main():
                     continue
                     
                 print("\nSearching for answer...")
-                answer = reader.ask_question(question)
-                print(f"\nAnswer: {answer}")
+                _print_answer(reader, question, args)
+                if args.profile:
+                    _print_profile(reader.metrics, "question")
                 
     except Exception as e:
         print(f"Error: {str(e)}")
         return 1
+    finally:
+        if trace is not None:
+            trace.close()
     
     return 0
 
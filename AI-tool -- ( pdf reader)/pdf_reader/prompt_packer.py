@@ -0,0 +1,132 @@
+import re
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+from chunking import approx_token_count
+
+log = logging.getLogger(__name__)
+
+# Used when Ollama cannot tell the model's context length
+DEFAULT_CONTEXT_LENGTH = 2048
+
+# Ollama allocates the KV cache for the whole num_ctx up front, so very large
+# windows (e.g. 128k for llama3.1) are capped unless configured explicitly
+DEFAULT_MAX_CONTEXT = 8192
+
+# Tokens kept free for the answer
+DEFAULT_ANSWER_TOKENS = 512
+
+# approx_token_count() counts words, while BPE tokenizers split long and rare
+# words further; scale estimates up so packed prompts stay inside the window
+TOKEN_SAFETY_FACTOR = 1.2
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper estimate of the number of model tokens in a text."""
+    return int(approx_token_count(text) * TOKEN_SAFETY_FACTOR) + 1
+
+
+def context_length_from_show(response) -> Optional[int]:
+    """
+    Read a model's context window from an Ollama `show` response.
+
+    A num_ctx parameter set in the Modelfile wins over the length the model
+    was trained with, since that is what Ollama runs it with.
+
+    Returns:
+        The context length in tokens, or None if the response does not say
+    """
+    parameters = response.get('parameters') or ""
+    match = re.search(r"^\s*num_ctx\s+(\d+)", parameters, re.MULTILINE)
+    if match:
+        return int(match.group(1))
+
+    model_info = response.get('modelinfo') or response.get('model_info') or {}
+    for key, value in model_info.items():
+        if key.endswith(".context_length") and value:
+            return int(value)
+    return None
+
+
+class PromptPacker:
+    def __init__(self, context_length: int, answer_tokens: int = DEFAULT_ANSWER_TOKENS,
+                 min_chunk_tokens: int = 64):
+        """
+        Fit as many ranked chunks as possible into one prompt.
+
+        Args:
+            context_length: The model's context window in tokens
+            answer_tokens: Tokens kept free for the answer
+            min_chunk_tokens: Smallest remaining budget still worth filling
+        """
+        self.context_length = context_length
+        self.answer_tokens = min(answer_tokens, context_length // 2)
+        self.min_chunk_tokens = min_chunk_tokens
+
+    def budget(self, overhead: str) -> int:
+        """Tokens left for document text once the fixed prompt parts are counted."""
+        return self.context_length - self.answer_tokens - estimate_tokens(overhead)
+
+    def pack(self, chunks: Sequence[str], overhead: str,
+             max_chunks: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        Greedily select chunks in rank order until the budget is spent.
+
+        A chunk that does not fit is skipped and smaller lower-ranked chunks
+        are still tried. If not even the best chunk fits, it is truncated.
+
+        Args:
+            chunks: Candidate chunk texts, best-ranked first
+            overhead: Every other part of the prompt (instructions, question,
+                excerpt headers) used to size the budget
+            max_chunks: Maximum number of chunks to pack
+
+        Returns:
+            (position in chunks, text) of the packed chunks, in rank order
+        """
+        remaining = self.budget(overhead)
+        packed = []
+        for position, chunk in enumerate(chunks):
+            if max_chunks is not None and len(packed) >= max_chunks:
+                break
+            if remaining < self.min_chunk_tokens:
+                break
+            tokens = estimate_tokens(chunk)
+            if tokens <= remaining:
+                packed.append((position, chunk))
+                remaining -= tokens
+            elif not packed:
+                # Cut the best chunk to the budget, keeping the same share of its characters
+                text = chunk[:max(1, len(chunk) * remaining // tokens)]
+                packed.append((position, text))
+                remaining -= estimate_tokens(text)
+        return packed
+
+
+class ContextLengths:
+    def __init__(self, client, configured: Optional[int] = None, max_context: int = DEFAULT_MAX_CONTEXT):
+        """
+        Context window of each model, queried once from Ollama.
+
+        Args:
+            client: ollama.Client used for `show` requests
+            configured: Context length to use for every model instead of asking Ollama
+            max_context: Upper limit applied to lengths reported by Ollama
+        """
+        self.client = client
+        self.configured = configured
+        self.max_context = max_context
+        self._lengths: Dict[str, int] = {}
+
+    def get(self, model: str) -> int:
+        """Return the context length to run a model with."""
+        if self.configured:
+            return self.configured
+        if model not in self._lengths:
+            try:
+                length = context_length_from_show(self.client.show(model))
+            except Exception as e:
+                log.warning("Could not read the context length of %s (%s)", model, e)
+                length = None
+            self._lengths[model] = min(length or DEFAULT_CONTEXT_LENGTH, self.max_context)
+            log.debug("Context length of %s: %d tokens", model, self._lengths[model])
+        return self._lengths[model]
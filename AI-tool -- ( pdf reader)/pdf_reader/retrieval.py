@@ -0,0 +1,88 @@
+import re
+import math
+import heapq
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Words too common to help rank chunks against a question
+STOPWORDS = frozenset("""
+a an and are as at be but by can could did do does for from had has have how i if in into
+is it its me my no not of on or our please should so than that the their them then there
+these they this those to was we were what when where which who whom why will with would
+you your about tell explain describe document pdf
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase a text and split it into words, dropping stopwords."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, chunks: Iterable[str] = (), k1: float = 1.5, b: float = 0.75):
+        """
+        In-memory BM25 index over text chunks.
+
+        Args:
+            chunks: Initial chunks; their position is their chunk id
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.chunk_lengths: List[int] = []
+        self.total_length = 0
+
+        for chunk in chunks:
+            self.add(chunk)
+
+    def __len__(self) -> int:
+        return len(self.chunk_lengths)
+
+    def add(self, text: str) -> int:
+        """
+        Index one more chunk.
+
+        Returns:
+            The chunk id assigned to it
+        """
+        chunk_id = len(self.chunk_lengths)
+        tokens = tokenize(text)
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, []).append((chunk_id, tf))
+        self.chunk_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        return chunk_id
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        """
+        Rank chunks against a query.
+
+        Args:
+            query: Free-text query, usually the user's question
+            k: Maximum number of results
+
+        Returns:
+            Up to k (chunk_id, score) pairs, best first; chunks sharing no
+            term with the query are not returned
+        """
+        num_chunks = len(self.chunk_lengths)
+        if not num_chunks or k <= 0:
+            return []
+
+        avg_length = self.total_length / num_chunks or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (num_chunks - df + 0.5) / (df + 0.5))
+            for chunk_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.chunk_lengths[chunk_id] / avg_length)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,315 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from instrumentation import Metrics
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_DOCUMENTS = 8
+
+# Largest request body accepted, requests only carry a path and a question
+_MAX_BODY = 1024 * 1024
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class QAServer:
+    def __init__(self, make_reader: Callable, max_documents: int = DEFAULT_MAX_DOCUMENTS,
+                 workers: int = 8, metrics: Optional[Metrics] = None):
+        """
+        Question answering over HTTP for many clients and documents.
+
+        Loaded documents stay in memory, ready to answer, until more than
+        max_documents are loaded; then the least recently used is dropped.
+
+        Args:
+            make_reader: Creates a PDFReaderAI; readers should share one
+                Ollama client so requests reuse its pooled connections, and
+                one extraction and answer cache
+            max_documents: Maximum number of documents kept loaded
+            workers: Threads running extraction and model calls
+            metrics: Registry the readers record their spans in, served by GET /metrics
+        """
+        self.make_reader = make_reader
+        self.metrics = metrics
+        self.max_documents = max(1, max_documents)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pdf-reader-server")
+        # Absolute path -> (size, mtime, reader) of loaded documents, least recently used first
+        self.documents: "OrderedDict[str, Tuple[int, int, object]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def get_reader(self, pdf_path: str):
+        """
+        Return the reader of a document, loading it if it is not loaded or
+        changed on disk. Concurrent requests for the same document share one load.
+        """
+        pdf_path = os.path.abspath(pdf_path)
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            raise HTTPError(404, f"PDF file not found: {pdf_path}")
+
+        entry = self.documents.get(pdf_path)
+        if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            self.documents.move_to_end(pdf_path)
+            return entry[2]
+
+        if pdf_path not in self._loading:
+            self._loading[pdf_path] = asyncio.ensure_future(self._load(pdf_path, stat))
+        try:
+            return await asyncio.shield(self._loading[pdf_path])
+        finally:
+            if self._loading.get(pdf_path) is not None and self._loading[pdf_path].done():
+                del self._loading[pdf_path]
+
+    async def _load(self, pdf_path: str, stat: os.stat_result):
+        reader = self.make_reader()
+        try:
+            await self._run(reader.extract_text_from_pdf, pdf_path)
+        except (FileNotFoundError, ValueError) as e:
+            raise HTTPError(400, str(e))
+
+        self.documents[pdf_path] = (stat.st_size, stat.st_mtime_ns, reader)
+        self.documents.move_to_end(pdf_path)
+        while len(self.documents) > self.max_documents:
+            evicted, _ = self.documents.popitem(last=False)
+            log.debug("Unloaded %s", evicted)
+        return reader
+
+    @staticmethod
+    def _describe(pdf_path: str, reader) -> Dict:
+        return {"path": pdf_path, "document": reader.document_hash,
+                "pages": len(reader.page_texts), "chunks": len(reader.text_chunks)}
+
+    async def handle_load(self, body: Dict) -> Dict:
+        pdf_path = self._require(body, "path")
+        started = time.perf_counter()
+        reader = await self.get_reader(pdf_path)
+        result = self._describe(os.path.abspath(pdf_path), reader)
+        result["seconds"] = round(time.perf_counter() - started, 4)
+        return result
+
+    async def handle_ask(self, body: Dict) -> Dict:
+        question = self._require(body, "question")
+        max_chunks, strategy = self._question_options(body)
+        reader = await self.get_reader(self._require(body, "path"))
+        started = time.perf_counter()
+        try:
+            answer = await self._run(lambda: reader.ask_question(question, max_chunks=max_chunks, strategy=strategy))
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        return {"answer": answer, "seconds": round(time.perf_counter() - started, 4)}
+
+    async def handle_stream(self, body: Dict, writer: asyncio.StreamWriter) -> None:
+        """Stream the answer as newline-delimited JSON: {"token": ...} lines, then {"done": true, ...}."""
+        question = self._require(body, "question")
+        max_chunks, strategy = self._question_options(body)
+        reader = await self.get_reader(self._require(body, "path"))
+        # Bad arguments raise here, while an error status can still be sent
+        try:
+            tokens = reader.stream_answer(question, max_chunks=max_chunks, strategy=strategy)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+        # The blocking generator runs on a worker thread and hands tokens to the event loop
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = False
+        # Measured here: the reader's last_time_to_first_token is shared by concurrent requests
+        first_token = None
+
+        def produce():
+            nonlocal first_token
+            try:
+                for token in tokens:
+                    if stopped:
+                        break
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    loop.call_soon_threadsafe(queue.put_nowait, ("token", token))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, ("error", str(e)))
+            finally:
+                tokens.close()
+                loop.call_soon_threadsafe(queue.put_nowait, ("done", None))
+
+        started = time.perf_counter()
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\n\r\n")
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == "done":
+                    line = {"done": True, "seconds": round(time.perf_counter() - started, 4),
+                            "time_to_first_token": round(first_token, 4) if first_token is not None else None}
+                else:
+                    line = {kind: value}
+                await self._write_chunk(writer, (json.dumps(line) + "\n").encode('utf-8'))
+                if kind == "done":
+                    break
+            await self._write_chunk(writer, b"")
+        finally:
+            # Client gone or done: let the worker stop and close the Ollama stream
+            stopped = True
+            await producer
+
+    @staticmethod
+    async def _write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        await writer.drain()
+
+    async def handle_documents(self) -> Dict:
+        return {"documents": [self._describe(path, reader) for path, (_, _, reader) in self.documents.items()]}
+
+    @staticmethod
+    def _question_options(body: Dict) -> Tuple[Optional[int], str]:
+        """Check the optional "max_chunks" and "strategy" fields of a question."""
+        max_chunks = body.get("max_chunks")
+        if max_chunks is not None and (isinstance(max_chunks, bool) or not isinstance(max_chunks, int)
+                                       or max_chunks < 1):
+            raise HTTPError(400, "\"max_chunks\" must be a positive integer")
+        strategy = body.get("strategy", "sequential")
+        if not isinstance(strategy, str):
+            raise HTTPError(400, "\"strategy\" must be a string")
+        return max_chunks, strategy
+
+    @staticmethod
+    def _require(body: Dict, key: str) -> str:
+        value = body.get(key)
+        if not isinstance(value, str) or not value.strip():
+            raise HTTPError(400, f"Missing \"{key}\"")
+        return value
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the HTTP/1.1 requests of one connection, keeping it open between requests."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > _MAX_BODY:
+                    await self._respond(writer, 413, {"error": "Request body too large"})
+                    break
+                data = await reader.readexactly(length) if length else b""
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._dispatch(method, path.split("?", 1)[0], data, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError:
+            await self._respond(writer, 400, {"error": "Malformed request"})
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, data: bytes, writer: asyncio.StreamWriter) -> None:
+        try:
+            if path in ("/health", "/documents", "/metrics"):
+                if method != "GET":
+                    raise HTTPError(405, "Use GET")
+                if path == "/health":
+                    result = {"status": "ok"}
+                elif path == "/metrics":
+                    result = {"spans": self.metrics.summary() if self.metrics is not None else {}}
+                else:
+                    result = await self.handle_documents()
+                await self._respond(writer, 200, result)
+                return
+
+            if path not in ("/load", "/ask", "/stream"):
+                raise HTTPError(404, f"Unknown endpoint: {path}")
+            if method != "POST":
+                raise HTTPError(405, "Use POST")
+            try:
+                body = json.loads(data or b"{}")
+            except ValueError:
+                raise HTTPError(400, "Request body must be JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "Request body must be a JSON object")
+
+            if path == "/stream":
+                await self.handle_stream(body, writer)
+                return
+            handler = self.handle_load if path == "/load" else self.handle_ask
+            await self._respond(writer, 200, await handler(body))
+        except HTTPError as e:
+            await self._respond(writer, e.status, {"error": str(e)})
+        except ConnectionError:
+            raise
+        except Exception as e:
+            log.error("Error handling %s: %s", path, e)
+            await self._respond(writer, 500, {"error": str(e)})
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, result: Dict) -> None:
+        body = json.dumps(result).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve_forever(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving on http://{host}:{port} (POST /load, /ask, /stream; GET /documents, /metrics, /health)")
+        async with server:
+            await server.serve_forever()
+
+
+def serve(make_reader: Callable, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          max_documents: int = DEFAULT_MAX_DOCUMENTS, workers: int = 8,
+          preload: Optional[list] = None, metrics: Optional[Metrics] = None) -> None:
+    """
+    Run the question answering server until interrupted.
+
+    Args:
+        make_reader: Creates a PDFReaderAI for each loaded document
+        host: Interface to listen on; the default only accepts local clients
+        port: TCP port
+        max_documents: Maximum number of documents kept loaded
+        workers: Threads running extraction and model calls
+        preload: PDFs to load before accepting requests
+        metrics: Registry the readers record their spans in, served by GET /metrics
+    """
+    app = QAServer(make_reader, max_documents, workers, metrics)
+
+    async def main():
+        for pdf_path in preload or []:
+            print(f"Loading PDF: {pdf_path}")
+            await app.get_reader(pdf_path)
+        await app.serve_forever(host, port)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.executor.shutdown(wait=False)
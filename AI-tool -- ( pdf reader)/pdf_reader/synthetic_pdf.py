@@ -0,0 +1,157 @@
+import zlib
+import random
+import argparse
+from typing import Dict, List
+
+# Vocabulary of the generated text; earlier words are drawn more often, as in real documents
+WORDS = """
+the of and to a in is for on with that by as are be this from at or it an
+system value device module sensor pressure temperature voltage current power
+supply output input signal range limit rated maximum minimum typical nominal
+operating storage ambient humidity housing cable connector flange valve pump
+motor bearing seal torque speed flow rate level accuracy tolerance calibration
+interface protocol address register command status error warning fault alarm
+installation maintenance inspection replacement warranty service manual section
+figure table page note caution procedure step check ensure connect disconnect
+mount remove tighten adjust measure record report specification requirement
+standard compliance certificate material steel aluminium copper plastic rubber
+""".split()
+
+UNITS = ("mm", "V", "A", "C", "bar", "rpm", "kg", "Hz", "%")
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 50
+# Average width of a Helvetica character, as a share of the font size
+_CHAR_WIDTH = 0.5
+
+
+def _sentence(rnd: random.Random, weights: List[float]) -> List[str]:
+    words = rnd.choices(WORDS, weights, k=rnd.randint(8, 20))
+    if rnd.random() < 0.3:
+        words.insert(rnd.randint(1, len(words)), f"{rnd.randint(1, 999)} {rnd.choice(UNITS)}")
+    words[0] = words[0].capitalize()
+    words[-1] += "."
+    return words
+
+
+def _page_paragraphs(rnd: random.Random, weights: List[float], words: int) -> List[List[str]]:
+    """Sentences of about the given number of words, grouped into paragraphs."""
+    paragraphs = []
+    count = 0
+    while count < words:
+        paragraph = []
+        for _ in range(rnd.randint(3, 6)):
+            sentence = _sentence(rnd, weights)
+            paragraph.extend(sentence)
+            count += len(sentence)
+            if count >= words:
+                break
+        paragraphs.append(paragraph)
+    return paragraphs
+
+
+def _wrap(paragraphs: List[List[str]], chars_per_line: int) -> List[str]:
+    lines = []
+    for paragraph in paragraphs:
+        line = ""
+        for word in paragraph:
+            if line and len(line) + 1 + len(word) > chars_per_line:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+        lines.append("")
+    return lines[:-1]
+
+
+def _page_stream(heading: str, paragraphs: List[List[str]], font_size: float) -> bytes:
+    """Content stream of one page, shrinking the font until the text fits."""
+    while True:
+        chars_per_line = int((PAGE_WIDTH - 2 * MARGIN) / (font_size * _CHAR_WIDTH))
+        lines = _wrap(paragraphs, chars_per_line)
+        leading = font_size * 1.2
+        if (len(lines) + 2) * leading <= PAGE_HEIGHT - 2 * MARGIN or font_size <= 3:
+            break
+        font_size *= 0.9
+    ops = [f"BT /F1 {font_size + 4:.2f} Tf {MARGIN} {PAGE_HEIGHT - MARGIN} Td {leading * 2:.2f} TL",
+           f"({heading}) Tj T*", f"/F1 {font_size:.2f} Tf {leading:.2f} TL"]
+    ops.extend(f"({line}) Tj T*" for line in lines)
+    ops.append("ET")
+    return "\n".join(ops).encode('latin-1')
+
+
+def generate_pdf(path: str, pages: int = 10, words_per_page: int = 400, seed: int = 0,
+                 font_size: float = 10) -> Dict:
+    """
+    Write a PDF of generated text, the same for the same arguments.
+
+    Every page has a heading and paragraphs of sentences drawn from a fixed
+    vocabulary, with some numbers and units, so chunkers and the keyword
+    index see text shaped like a technical manual.
+
+    Args:
+        path: File to write
+        pages: Number of pages
+        words_per_page: Approximate words on each page; the font shrinks
+            so that dense pages still fit
+        seed: Seed of the text generator
+        font_size: Font size of pages with room to spare
+
+    Returns:
+        Dict with the number of pages and words, and the file size in bytes
+    """
+    rnd = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a content stream and a page per page
+    objects = {3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    page_ids = []
+    total_words = 0
+    for page in range(pages):
+        paragraphs = _page_paragraphs(rnd, weights, words_per_page)
+        total_words += sum(len(" ".join(paragraph).split()) for paragraph in paragraphs)
+        data = zlib.compress(_page_stream(f"Section {page + 1}", paragraphs, font_size))
+        content_id, page_id = 4 + 2 * page, 5 + 2 * page
+        objects[content_id] = (b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data)
+                               + data + b"\nendstream")
+        objects[page_id] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                            b"/Resources << /Font << /F1 3 0 R >> >> >>"
+                            % (PAGE_WIDTH, PAGE_HEIGHT, content_id))
+        page_ids.append(page_id)
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for object_id in range(1, len(objects) + 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % object_id + objects[object_id] + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, 'wb') as f:
+        f.write(out)
+    return {"pages": pages, "words": total_words, "bytes": len(out)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a PDF of synthetic text for benchmarks")
+    parser.add_argument("path", help="PDF file to write")
+    parser.add_argument("-p", "--pages", type=int, default=10, help="Number of pages (default: 10)")
+    parser.add_argument("-d", "--words-per-page", type=int, default=400,
+                       help="Approximate words per page (default: 400)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the text generator (default: 0)")
+
+    args = parser.parse_args()
+    stats = generate_pdf(args.path, args.pages, args.words_per_page, args.seed)
+    print(f"Wrote {args.path}: {stats['pages']} pages, {stats['words']} words, {stats['bytes']} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
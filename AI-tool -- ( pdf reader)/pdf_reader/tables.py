@@ -0,0 +1,286 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+import numpy as np
+import pdfplumber
+from extraction_cache import atomic_write
+from extractors import split_page_ranges
+from retrieval import tokenize
+
+# Bump whenever table detection or parsing changes, so stale cache entries are ignored
+TABLES_VERSION = "1"
+
+# A cell holding one number, possibly signed and followed by a unit ("-40", "1,200 rpm", "85 °C")
+_NUMBER_CELL_RE = re.compile(r"^\s*([-+−±]?\d[\d,]*(?:\.\d+)?)(?:\s*([^\d\s][^\d]*))?$")
+
+# Question words naming a column of spec tables, mapped to one spelling
+_STAT_TERMS = {
+    "max": "max", "maximum": "max", "highest": "max", "upper": "max", "peak": "max",
+    "min": "min", "minimum": "min", "lowest": "min", "lower": "min",
+    "typ": "typ", "typical": "typ", "nominal": "typ", "nom": "typ", "average": "typ", "avg": "typ",
+}
+
+# Words that do not say which row or column is meant
+_GENERIC_TERMS = frozenset("value values number spec specs specification rating many much".split())
+
+# Share of a row label's words the question must contain
+_MIN_LABEL_COVERAGE = 0.5
+
+
+def _terms(text: str) -> List[str]:
+    return [_STAT_TERMS.get(token, token) for token in tokenize(text) if token not in _GENERIC_TERMS]
+
+
+def parse_number(cell: str) -> Tuple[float, str]:
+    """
+    Read a cell holding a single number.
+
+    Returns:
+        (value, unit), or (NaN, "") if the cell is not one number
+    """
+    match = _NUMBER_CELL_RE.match(cell)
+    if not match:
+        return float("nan"), ""
+    number = match.group(1).replace("−", "-").replace("±", "").replace(",", "")
+    try:
+        return float(number), (match.group(2) or "").strip()
+    except ValueError:
+        return float("nan"), ""
+
+
+class Table:
+    def __init__(self, page: int, header: np.ndarray, cells: np.ndarray,
+                 values: Optional[np.ndarray] = None):
+        """
+        One table of a PDF, stored column by column.
+
+        Args:
+            page: 1-based page number
+            header: Column titles, empty strings if the table has no header row
+            cells: Cell texts, one row per table row
+            values: Numbers of the cells, NaN where a cell is not a number
+                (parsed from the cells if not given)
+        """
+        self.page = page
+        self.header = header
+        self.cells = cells
+        if values is None:
+            values = np.array([[parse_number(cell)[0] for cell in row] for row in cells],
+                              dtype=np.float64).reshape(cells.shape)
+        self.values = values
+
+    @classmethod
+    def from_rows(cls, page: int, rows: Sequence[Sequence[Optional[str]]]) -> Optional["Table"]:
+        """
+        Build a table from pdfplumber rows, or return None if nothing is left
+        after dropping empty rows and columns.
+
+        The first row is taken as the header when it holds no numbers but
+        other rows do.
+        """
+        rows = [[" ".join((cell or "").split()) for cell in row] for row in rows]
+        rows = [row for row in rows if any(row)]
+        if not rows:
+            return None
+        width = max(len(row) for row in rows)
+        rows = [row + [""] * (width - len(row)) for row in rows]
+        keep = [j for j in range(width) if any(row[j] for row in rows)]
+        cells = np.array([[row[j] for j in keep] for row in rows], dtype=str)
+
+        values = np.array([[parse_number(cell)[0] for cell in row] for row in cells], dtype=np.float64)
+        numeric = ~np.isnan(values)
+        if len(rows) > 1 and not numeric[0].any() and numeric[1:].any():
+            return cls(page, cells[0], cells[1:], values[1:])
+        return cls(page, np.full(cells.shape[1], "", dtype=cells.dtype), cells, values)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.cells.shape
+
+    def column(self, name: str) -> np.ndarray:
+        """Return the numbers of the column with the given title (NaN for non-numeric cells)."""
+        matches = np.flatnonzero(self.header == name)
+        if not len(matches):
+            raise KeyError(name)
+        return self.values[:, matches[0]]
+
+    def row_label(self, row: int) -> str:
+        """The text cells of a row, which name what the row is about."""
+        unit_column = self.unit_column()
+        return " ".join(str(cell) for j, (cell, value) in enumerate(zip(self.cells[row], self.values[row]))
+                        if cell and np.isnan(value) and j != unit_column)
+
+    def unit_column(self) -> Optional[int]:
+        for j, title in enumerate(self.header):
+            if title.lower().rstrip("s") in ("unit", "uom"):
+                return j
+        return None
+
+    def to_text(self) -> str:
+        """Render the table as pipe-separated rows, which models read better than flattened text."""
+        lines = []
+        if any(self.header):
+            lines.append(" | ".join(self.header))
+        lines.extend(" | ".join(row) for row in self.cells)
+        return "\n".join(lines)
+
+
+class TableAnswer(NamedTuple):
+    text: str  # Cell text, with the unit column appended if there is one
+    value: float
+    page: int
+    row: str
+    column: str
+
+    def format(self) -> str:
+        column = f" ({self.column})" if self.column else ""
+        return f"{self.row}{column}: {self.text} (from the table on page {self.page})"
+
+
+def _extract_table_range(pdf_path: str, start: int, end: int) -> List[Table]:
+    """Find the tables of pages [start, end); runs in worker processes."""
+    return extract_tables(pdf_path, range(start, end))
+
+
+def extract_tables(pdf_path: str, page_numbers: Optional[Sequence[int]] = None, workers: int = 1) -> List[Table]:
+    """
+    Find the tables of a PDF with pdfplumber.
+
+    Args:
+        pdf_path: Path to the PDF file
+        page_numbers: 0-based indexes of the pages to search (default: all)
+        workers: Number of worker processes; 1 searches in this process
+
+    Returns:
+        Tables in page order
+    """
+    if workers > 1:
+        if page_numbers is None:
+            with pdfplumber.open(pdf_path) as pdf:
+                page_numbers = range(len(pdf.pages))
+        page_numbers = sorted(page_numbers)
+        if len(page_numbers) > 1:
+            # Results are collected in submission order, so tables stay in page order
+            ranges = split_page_ranges(page_numbers, workers)
+            with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+                futures = [executor.submit(_extract_table_range, pdf_path, start, end) for start, end in ranges]
+                return [table for future in futures for table in future.result()]
+
+    tables = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_number in range(len(pdf.pages)) if page_numbers is None else page_numbers:
+            page = pdf.pages[page_number]
+            try:
+                for rows in page.extract_tables():
+                    table = Table.from_rows(page_number + 1, rows)
+                    if table is not None:
+                        tables.append(table)
+            finally:
+                page.close()
+    return tables
+
+
+class TableIndex:
+    def __init__(self, tables: Sequence[Table]):
+        """
+        Index of table rows, to answer questions about one value of a table
+        without asking the model.
+
+        Args:
+            tables: Tables of the document
+        """
+        self.tables = list(tables)
+        # Word -> (table, row) of the rows whose label contains it
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._labels: Dict[Tuple[int, int], Set[str]] = {}
+        self._headers = [[set(_terms(title)) for title in table.header] for table in self.tables]
+        for t, table in enumerate(self.tables):
+            for row in range(table.shape[0]):
+                label = set(_terms(table.row_label(row)))
+                self._labels[(t, row)] = label
+                for term in label:
+                    self.postings.setdefault(term, []).append((t, row))
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def lookup(self, question: str) -> Optional[TableAnswer]:
+        """
+        Answer a question with a single table cell, if one clearly matches.
+
+        A row matches when the question names most of its label; the column
+        is the numeric column named by the question (e.g. "max"), or the
+        row's only number. Every other word of the question must be part of
+        the row label, the column title or the row's unit; a question that
+        says more ("what happens above the max temperature?") is left to the
+        model, as is one where two cells match equally.
+
+        Returns:
+            The matching cell, or None if the question needs the model
+        """
+        question_terms = set(_terms(question))
+        if not question_terms:
+            return None
+        # Stat words may go unmatched when the row has a single number
+        required = question_terms - set(_STAT_TERMS.values())
+
+        best_score = None
+        best = []
+        candidates = {key for term in question_terms for key in self.postings.get(term, ())}
+        for t, row in candidates:
+            table = self.tables[t]
+            label = self._labels[(t, row)]
+            matched = question_terms & label
+            if not matched - set(_STAT_TERMS.values()) or len(matched) / len(label) < _MIN_LABEL_COVERAGE:
+                continue
+
+            columns = [j for j in range(table.shape[1]) if not np.isnan(table.values[row, j])]
+            named = [j for j in columns if (question_terms - matched) & self._headers[t][j]]
+            if named:
+                columns = named
+            elif len(columns) != 1:
+                continue
+
+            unit_column = table.unit_column()
+            unit = set(_terms(table.cells[row, unit_column])) if unit_column is not None else set()
+            for j in columns:
+                described = self._headers[t][j] | unit | set(_terms(parse_number(table.cells[row, j])[1]))
+                explained = matched | (question_terms & described)
+                if not required <= explained:
+                    continue
+                score = (len(explained), len(matched) / len(label))
+                if best_score is None or score > best_score:
+                    best_score, best = score, [(t, row, j)]
+                elif score == best_score:
+                    best.append((t, row, j))
+
+        if len(best) != 1:
+            return None
+        t, row, j = best[0]
+        table = self.tables[t]
+        text = str(table.cells[row, j])
+        unit_column = table.unit_column()
+        if unit_column is not None and table.cells[row, unit_column] and not parse_number(text)[1]:
+            text = f"{text} {table.cells[row, unit_column]}"
+        return TableAnswer(text, float(table.values[row, j]), table.page, table.row_label(row), str(table.header[j]))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TableIndex"]:
+        """Load tables previously written by save(), or return None if missing."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                pages = data["pages"]
+                return cls([Table(int(page), data[f"header_{t}"], data[f"cells_{t}"], data[f"values_{t}"])
+                            for t, page in enumerate(pages)])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, path: str) -> None:
+        """Write the tables as NumPy arrays, atomically replacing any existing file."""
+        arrays = {"pages": np.array([table.page for table in self.tables], dtype=np.int32)}
+        for t, table in enumerate(self.tables):
+            arrays[f"header_{t}"] = table.header
+            arrays[f"cells_{t}"] = table.cells
+            arrays[f"values_{t}"] = table.values
+        with atomic_write(path) as f:
+            np.savez_compressed(f, **arrays)
@@ -0,0 +1,50 @@
+import json
+from batch import answer_file, read_questions
+
+
+class EchoReader:
+    """Answers every question with the question itself."""
+
+    def __init__(self):
+        self.asked = []
+
+    def ask_question(self, question, max_chunks=None, strategy="sequential"):
+        self.asked.append(question)
+        return f"answer to {question}"
+
+
+def test_malformed_line_does_not_stop_the_batch(tmp_path):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text('{"id": "a", "question": "First?"}\n'
+                         '{"question": "Broken?"\n'
+                         '\n'
+                         '[1, 2]\n'
+                         '"Third?"\n'
+                         '{"id": "d", "question": "Fourth?"}\n', encoding='utf-8')
+    output = tmp_path / "answers.jsonl"
+    reader = EchoReader()
+
+    summary = answer_file(reader, str(questions), str(output), in_flight=2)
+
+    results = {result["id"]: result for result in map(json.loads, output.read_text(encoding='utf-8').splitlines())}
+    assert summary["questions"] == 5
+    assert summary["errors"] == 2
+    assert sorted(reader.asked) == ["First?", "Fourth?", "Third?"]
+    assert results["a"]["answer"] == "answer to First?"
+    assert results[2]["line"] == 2 and "invalid JSON" in results[2]["error"]
+    assert results[3]["line"] == 4 and "answer" not in results[3]
+    assert results["d"]["answer"] == "answer to Fourth?"
+
+
+def test_csv_questions(tmp_path):
+    questions = tmp_path / "questions.csv"
+    questions.write_text("id,question\nx,What is it?\ny,\n", encoding='utf-8')
+    assert list(read_questions(str(questions))) == [{"id": "x", "question": "What is it?"}]
+
+
+def test_falsy_ids_are_kept(tmp_path):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text('{"id": 0, "question": "Zero?"}\n'
+                         '{"id": "", "question": "Empty?"}\n'
+                         '{"question": "None?"}\n', encoding='utf-8')
+    assert [record["id"] for record in read_questions(str(questions))] == [0, "", 3]
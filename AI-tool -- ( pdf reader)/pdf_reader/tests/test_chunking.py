@@ -0,0 +1,56 @@
+import random
+import numpy as np
+import pytest
+from chunking import CHUNKERS, make_chunker
+from embeddings import EmbeddingIndex
+from synthetic_pdf import WORDS
+
+
+class CountingClient:
+    """Embeds texts as word counts and remembers how many texts were sent."""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed(self, model, input):
+        self.embedded += len(input)
+        return {"embeddings": [[text.count(word) + 1 for word in WORDS[:16]] for text in input]}
+
+
+def _pages(count, seed=0):
+    rnd = random.Random(seed)
+    pages = []
+    for _ in range(count):
+        sentences = [" ".join(rnd.choices(WORDS, k=rnd.randint(8, 20))).capitalize() + "."
+                     for _ in range(rnd.randint(15, 30))]
+        pages.append(" ".join(sentences))
+    return pages
+
+
+@pytest.mark.parametrize("name", list(CHUNKERS))
+def test_chunks_do_not_cross_pages(name):
+    chunks = list(make_chunker(name, overlap=50 if name != "tokens" else 10).iter_chunks(_pages(5)))
+    assert {chunk.page_start for chunk in chunks} == {1, 2, 3, 4, 5}
+    assert all(chunk.page_start == chunk.page_end for chunk in chunks)
+
+
+@pytest.mark.parametrize("name", list(CHUNKERS))
+def test_editing_a_page_only_re_embeds_its_chunks(name):
+    chunker = make_chunker(name)
+    pages = _pages(30)
+    edited = list(pages)
+    edited[4] = "A new sentence was added to this page. " + edited[4]
+
+    before = [chunk.text for chunk in chunker.iter_chunks(pages)]
+    after = list(chunker.iter_chunks(edited))
+    page_5 = [chunk.text for chunk in after if chunk.page_start == 5]
+
+    client = CountingClient()
+    previous = EmbeddingIndex.build(client, "model", before)
+    client.embedded = 0
+    index = EmbeddingIndex.update(client, "model", [chunk.text for chunk in after], previous, before)
+
+    assert 0 < client.embedded <= len(page_5)
+    assert len(index) == len(after)
+    assert np.allclose(index.matrix, EmbeddingIndex.build(CountingClient(), "model",
+                                                          [chunk.text for chunk in after]).matrix)
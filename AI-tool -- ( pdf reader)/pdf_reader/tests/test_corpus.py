@@ -0,0 +1,27 @@
+import pytest
+from corpus import Corpus, CorpusReader
+from pdf_reader import NO_MATCH_ANSWER
+from synthetic_pdf import generate_pdf
+
+
+class FailingClient:
+    """Ollama stand-in that fails the test if the model is asked anything."""
+
+    def chat(self, *args, **kwargs):
+        raise AssertionError("the model was asked")
+
+
+@pytest.fixture
+def reader(tmp_path):
+    paths = [str(tmp_path / f"doc{i}.pdf") for i in range(2)]
+    for i, path in enumerate(paths):
+        generate_pdf(path, 2, 100, i)
+    corpus = Corpus(str(tmp_path / "index"))
+    corpus.add(paths)
+    return CorpusReader(corpus, client=FailingClient(), use_answer_cache=False, warm_up=False)
+
+
+@pytest.mark.parametrize("strategy", ["sequential", "packed"])
+def test_question_matching_no_document_is_not_sent_to_the_model(reader, strategy):
+    assert reader.ask_question("zzzzqqq", strategy=strategy) == NO_MATCH_ANSWER
+    assert "".join(reader.stream_answer("zzzzqqq", strategy=strategy)) == NO_MATCH_ANSWER
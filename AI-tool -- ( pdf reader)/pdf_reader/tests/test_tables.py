@@ -0,0 +1,33 @@
+import pytest
+from tables import Table, TableIndex
+
+
+@pytest.fixture
+def index():
+    table = Table.from_rows(3, [["Parameter", "Min", "Typ", "Max", "Unit"],
+                                ["Operating temperature", "-40", "25", "85", "°C"],
+                                ["Supply voltage", "3.0", "3.3", "3.6", "V"]])
+    return TableIndex([table])
+
+
+@pytest.mark.parametrize("question, text", [
+    ("What is the max operating temperature?", "85 °C"),
+    ("What is the minimum operating temperature in °C?", "-40 °C"),
+    ("Typical supply voltage?", "3.3 V"),
+])
+def test_lookup_answers_single_cell_questions(index, question, text):
+    answer = index.lookup(question)
+
+    assert answer is not None
+    assert answer.text == text
+    assert answer.page == 3
+
+
+@pytest.mark.parametrize("question", [
+    "What happens above the max operating temperature?",
+    "Is the max operating temperature above 100?",
+    "Why is the supply voltage limited?",
+    "What is the operating temperature?",
+])
+def test_lookup_leaves_other_questions_to_the_model(index, question):
+    assert index.lookup(question) is None